@@ -0,0 +1,215 @@
+"""Query result cache for the PDF multifile searcher.
+
+`QueryCache` remembers the matches of every file searched for a query, keyed
+by the query (patterns and the options that change a file's matches) and the
+file path, and validated by the file's size and modification time. Running
+the same query again only searches files that changed since.
+
+A query also narrows the next one: when every new literal pattern contains
+one of a cached query's patterns, a page can only match the new query if it
+matched the old one, so only the pages that matched before are searched
+("refine within results"). Files that had no matches are skipped entirely.
+
+Copies found to have the same content as another file are cached with that
+file, so a rerun still reports them as duplicates while neither changed.
+
+The cache is an LRU bounded by the approximate size of the stored matches and
+can be saved to and loaded from a file between sessions.
+"""
+import os
+import pickle
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+try:
+    # When used as a package
+    from .pdf_models import MatchList, SearchOptions
+    from .pdf_patterns import normalize_pattern
+except Exception:
+    # When executed as a standalone module
+    from pdf_models import MatchList, SearchOptions
+    from pdf_patterns import normalize_pattern
+
+# (size, modification time in ns) of a file
+Fingerprint = Tuple[int, int]
+
+CACHE_FORMAT_VERSION = 3
+# Bookkeeping cost counted for every entry on top of the matches themselves
+_ENTRY_OVERHEAD = 200
+
+
+def file_fingerprint(pdf_file_path: str) -> Optional[Fingerprint]:
+    try:
+        stat = os.stat(pdf_file_path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def query_key(patterns: Sequence[str], options: SearchOptions) -> tuple:
+    """The part of a search that determines each file's matches."""
+    query_mode = options.query_scope if options.query else None
+    return (tuple(patterns), options.regex, options.case_sensitive, options.whole_word,
+            options.per_file_limit(), query_mode)
+
+
+def _contains(new_pattern: str, old_pattern: str, case_sensitive: bool, whole_word: bool) -> bool:
+    """True if every hit of `new_pattern` contains a hit of `old_pattern`."""
+    if case_sensitive:
+        new_pattern, old_pattern = " ".join(new_pattern.split()), " ".join(old_pattern.split())
+    else:
+        new_pattern, old_pattern = normalize_pattern(new_pattern), normalize_pattern(old_pattern)
+    if not old_pattern:
+        return False
+    if whole_word:
+        # "foo" only matches inside "foo bar", not inside "xfoo"
+        return re.search(rf"(?<!\w){re.escape(old_pattern)}(?!\w)", new_pattern) is not None
+    return old_pattern in new_pattern
+
+
+def refines(new_query: tuple, old_query: tuple) -> bool:
+    """True if every page matching `new_query` also matches `old_query`."""
+    new_patterns, regex, case_sensitive, whole_word, _, query_mode = new_query
+    old_patterns, old_regex, old_case_sensitive, old_whole_word, _, old_query_mode = old_query
+    if regex or old_regex or query_mode or old_query_mode or new_query == old_query:
+        return False
+    if (case_sensitive, whole_word) != (old_case_sensitive, old_whole_word):
+        return False
+    return all(any(_contains(new_pattern, old_pattern, case_sensitive, whole_word) for old_pattern in old_patterns)
+               for new_pattern in new_patterns)
+
+
+class QueryCache:
+    """LRU cache of per-file search results, bounded by the size of the matches."""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        # (query, path) -> (fingerprint, matches, complete, (original path, its fingerprint) or None)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        # query -> number of entries, most recently used last
+        self._queries: "OrderedDict[tuple, int]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _entry_size(matches: MatchList) -> int:
+        return matches.nbytes() + _ENTRY_OVERHEAD
+
+    def get(self, query: tuple, pdf_file_path: str, fingerprint: Optional[Fingerprint]) -> Optional[MatchList]:
+        """Return a copy of the cached matches, or None if missing or the file changed."""
+        if fingerprint is None:
+            return None
+        with self._lock:
+            entry = self._entries.get((query, pdf_file_path))
+            if entry is None or entry[0] != fingerprint:
+                return None
+            self._entries.move_to_end((query, pdf_file_path))
+            self._queries.move_to_end(query)
+            return entry[1].copy()
+
+    def duplicate_of(self, query: tuple, pdf_file_path: str, fingerprint: Optional[Fingerprint],
+                     original_fingerprints: Dict[str, Optional[Fingerprint]]) -> str:
+        """The file a cached copy duplicates, or "" if it is no copy or either file changed.
+
+        `original_fingerprints` holds the current fingerprints of the files
+        the original may be among.
+        """
+        if fingerprint is None:
+            return ""
+        with self._lock:
+            entry = self._entries.get((query, pdf_file_path))
+        if entry is None or entry[0] != fingerprint or entry[3] is None:
+            return ""
+        original, original_fingerprint = entry[3]
+        if original_fingerprints.get(original) != original_fingerprint:
+            return ""
+        return original
+
+    def put(self, query: tuple, pdf_file_path: str, fingerprint: Optional[Fingerprint], matches: MatchList,
+            complete: bool = True, duplicate_of: Optional[Tuple[str, Fingerprint]] = None):
+        """Store a copy of `matches`; `complete` is False if the file hit a match limit.
+
+        `duplicate_of` is the (path, fingerprint) of the file whose content
+        this one was found to repeat.
+        """
+        if fingerprint is None:
+            return
+        matches = matches.copy()
+        size = self._entry_size(matches)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._remove((query, pdf_file_path))
+            self._entries[(query, pdf_file_path)] = (fingerprint, matches, complete, duplicate_of)
+            self._queries[query] = self._queries.get(query, 0) + 1
+            self._queries.move_to_end(query)
+            self._size += size
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._size -= self._entry_size(entry[1])
+        query = key[0]
+        self._queries[query] -= 1
+        if not self._queries[query]:
+            del self._queries[query]
+
+    def refine(self, query: tuple, fingerprints: Dict[str, Optional[Fingerprint]]) -> Dict[str, List[int]]:
+        """Return the pages worth searching for `query`, per file, from a query it refines.
+
+        Uses the most recently used cached query that `query` refines. Only
+        files whose cached result is complete and current are listed; an empty
+        list means the file cannot match. Other files must be searched in full.
+        """
+        with self._lock:
+            previous = next((cached for cached in reversed(self._queries) if refines(query, cached)), None)
+            if previous is None:
+                return {}
+            pages: Dict[str, List[int]] = {}
+            for pdf_file_path, fingerprint in fingerprints.items():
+                entry = self._entries.get((previous, pdf_file_path))
+                if entry is None or fingerprint is None or entry[0] != fingerprint or not entry[2]:
+                    continue
+                pages[pdf_file_path] = sorted(set(entry[1].page_numbers()))
+            return pages
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._queries.clear()
+            self._size = 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def save(self, cache_path: str):
+        """Write the cache to `cache_path`, replacing the file atomically."""
+        with self._lock:
+            state = (CACHE_FORMAT_VERSION, list(self._entries.items()))
+            temporary_path = cache_path + ".tmp"
+            with open(temporary_path, "wb") as cache_file:
+                pickle.dump(state, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, cache_path)
+
+    @classmethod
+    def load(cls, cache_path: str, max_bytes: int = 64 * 1024 * 1024) -> "QueryCache":
+        """Read a cache written by `save`; returns an empty cache if there is none or it is unusable."""
+        cache = cls(max_bytes)
+        try:
+            with open(cache_path, "rb") as cache_file:
+                version, entries = pickle.load(cache_file)
+        except FileNotFoundError:
+            return cache
+        except Exception as e:
+            print(f"Could not load the query cache {cache_path}: {e}")
+            return cache
+        if version != CACHE_FORMAT_VERSION:
+            return cache
+        for (query, pdf_file_path), (fingerprint, matches, complete, duplicate_of) in entries:
+            cache.put(query, pdf_file_path, fingerprint, matches, complete, duplicate_of)
+        return cache
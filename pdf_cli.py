@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""Headless command-line search for the PDF multifile searcher.
+
+Runs `pdf_search` directly, without tkinter, and streams the matches to stdout
+as JSON Lines or TSV while the search runs, so the output can be piped into
+other tools. For example:
+
+    python3 pdf_cli.py -f ~/docs -p invoice -p receipt --format tsv
+
+Exit status follows grep: 0 if anything matched, 1 if nothing matched, 2 on
+errors, 130 when interrupted. Folders that cannot be listed and files that
+cannot be searched are reported on stderr and count as errors.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+try:
+    # When used as a package
+    from .pdf_models import SearchOptions, SearchStats
+    from .pdf_search import ENGINES, iter_search_pdfs
+    from .pdf_index import PDFIndex
+    from .pdf_corpus import TextCorpus
+    from .pdf_cache import QueryCache
+    from .pdf_query import QUERY_SCOPES
+    from .pdf_schedule import SCHEDULES
+except Exception:
+    # When executed as a script (no package context)
+    from pdf_models import SearchOptions, SearchStats
+    from pdf_search import ENGINES, iter_search_pdfs
+    from pdf_index import PDFIndex
+    from pdf_corpus import TextCorpus
+    from pdf_cache import QueryCache
+    from pdf_query import QUERY_SCOPES
+    from pdf_schedule import SCHEDULES
+
+EXIT_MATCH = 0
+EXIT_NO_MATCH = 1
+EXIT_ERROR = 2
+EXIT_INTERRUPTED = 130
+
+
+def _tsv_field(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def format_match(file_path: str, match, output_format: str) -> str:
+    """Format one match as a JSON Lines record or a TSV row (without newline)."""
+    if output_format == 'jsonl':
+        record = {'file': file_path}
+        record.update(match.to_dict())
+        return json.dumps(record, ensure_ascii=False)
+    location = ','.join(f"{value:.2f}" for value in match.location)
+    return '\t'.join(_tsv_field(value) for value in
+                     (file_path, match.page_number, match.match_id, match.pattern, location, match.context))
+
+
+def print_stats(stats):
+    print(stats.summary(), file=sys.stderr)
+    for file_stats in stats.slowest:
+        print(f"  {file_stats.wall_time:8.3f}s  {file_stats.pages:5d} pages  {file_stats.path}", file=sys.stderr)
+
+
+def report_errors(stats) -> bool:
+    """Print the folders and files that could not be searched to stderr; True if there were any."""
+    for folder, reason in stats.unreadable_folders:
+        print(f"Could not list {folder}: {reason}", file=sys.stderr)
+    for file_path, reason in stats.failures:
+        print(f"Could not search {file_path}: {reason}", file=sys.stderr)
+    return bool(stats.unreadable_folders or stats.failures)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='PDF multifile search - headless search with streaming output')
+    parser.add_argument('-f', '--folder', action='append', required=True, help='The folder to search')
+    parser.add_argument('-p', '--pattern', action='append', required=True,
+                        help='The pattern to search for; repeat to search for several patterns in one pass')
+    parser.add_argument('--format', choices=('jsonl', 'tsv'), default='jsonl', help='Output format')
+    parser.add_argument('--index', help='Full-text index to consult (see pdf_index.py)')
+    parser.add_argument('--corpus', help='Memory-mapped page-text corpus to scan (see pdf_index.py --corpus)')
+    parser.add_argument('--cache', help='Query result cache file; reused and updated by every run')
+    parser.add_argument('--engine', choices=ENGINES, default='auto', help='Search backend')
+    parser.add_argument('--workers', type=int, help='Maximum number of search workers')
+    parser.add_argument('--shard-pages', type=int, default=SearchOptions.shard_pages,
+                        help='Split documents longer than this many pages across workers (0 disables)')
+    parser.add_argument('--max-in-flight', type=int,
+                        help='Most files or page ranges queued or being searched at once '
+                             '(default: twice the number of workers)')
+    parser.add_argument('--schedule', choices=SCHEDULES, default=SearchOptions.schedule,
+                        help='Order to search files in (default: %(default)s)')
+    parser.add_argument('--priority', action='append', default=[],
+                        help='Folder or file to search before all others; repeatable')
+    parser.add_argument('--max-results', type=int, help='Stop after this many matches')
+    parser.add_argument('--max-matches-per-file', type=int, help='Report at most this many matches per file')
+    parser.add_argument('--files-only', action='store_true', help='Report only the first match of each file')
+    parser.add_argument('--regex', action='store_true', help='Treat patterns as regular expressions')
+    parser.add_argument('--case-sensitive', action='store_true', help='Match case')
+    parser.add_argument('--whole-word', action='store_true', help='Only match whole words')
+    parser.add_argument('--query', action='store_true',
+                        help='Treat patterns as boolean/proximity queries, e.g. "invoice AND paid NOT draft" '
+                             'or "contract NEAR/20 termination"')
+    parser.add_argument('--scope', choices=QUERY_SCOPES, default='page',
+                        help='Whether a page or the whole document must satisfy a --query')
+    parser.add_argument('--include', action='append', default=[], help='Glob of file names to search')
+    parser.add_argument('--exclude', action='append', default=[], help='Glob of files or folders to skip')
+    parser.add_argument('--max-depth', type=int, help='Folder levels to descend below each folder')
+    parser.add_argument('--no-dedupe', action='store_true',
+                        help='Search files with identical content separately instead of once')
+    parser.add_argument('--stats', action='store_true',
+                        help='Print search statistics and the slowest files to stderr')
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    options = SearchOptions(engine=args.engine, max_workers=args.workers, max_results=args.max_results,
+                            max_matches_per_file=args.max_matches_per_file, files_only=args.files_only,
+                            regex=args.regex, case_sensitive=args.case_sensitive, whole_word=args.whole_word,
+                            include=tuple(args.include) or SearchOptions.include,
+                            exclude=tuple(args.exclude), max_depth=args.max_depth,
+                            query=args.query, query_scope=args.scope, shard_pages=args.shard_pages or None,
+                            max_in_flight=args.max_in_flight, dedupe=not args.no_dedupe,
+                            schedule=args.schedule, priority_paths=tuple(args.priority))
+    cancel = threading.Event()
+    stats = SearchStats()
+    index = None
+    corpus = None
+    cache = QueryCache.load(args.cache) if args.cache else None
+    found = False
+    try:
+        if args.index:
+            index = PDFIndex(args.index)
+        if args.corpus:
+            corpus = TextCorpus(args.corpus)
+        for file_path, matches in iter_search_pdfs(args.folder, args.pattern, index=index,
+                                                   options=options, cancel=cancel, stats=stats, cache=cache,
+                                                   corpus=corpus):
+            for match in matches:
+                sys.stdout.write(format_match(file_path, match, args.format) + '\n')
+                found = True
+            if matches:
+                # Emit each file's matches as soon as they are known
+                sys.stdout.flush()
+    except KeyboardInterrupt:
+        cancel.set()
+        return EXIT_INTERRUPTED
+    except BrokenPipeError:
+        # The reader went away (e.g. `| head`); stop quietly
+        cancel.set()
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return EXIT_MATCH if found else EXIT_NO_MATCH
+    except Exception as e:
+        print(f"Error during search: {e}", file=sys.stderr)
+        return EXIT_ERROR
+    finally:
+        if index is not None:
+            index.close()
+        if corpus is not None:
+            corpus.close()
+        if cache is not None:
+            try:
+                cache.save(args.cache)
+            except OSError as e:
+                print(f"Could not save the query cache: {e}", file=sys.stderr)
+        if args.stats:
+            print_stats(stats)
+    if report_errors(stats):
+        return EXIT_ERROR
+    return EXIT_MATCH if found else EXIT_NO_MATCH
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,337 @@
+"""Memory-mapped page-text corpus for the PDF multifile searcher.
+
+`TextCorpus.build` writes the page text stored in a `PDFIndex` into a single
+file: all pages as UTF-8, one page per line (the index text has no line
+breaks), followed by a table of page start offsets, the list of files, a
+trigram index and a fixed-size footer. `TextCorpus` maps that file with `mmap`
+and finds candidate pages for literal, case-sensitive, whole-word and regex
+searches without parsing any PDF. Unlike the SQLite index it supports every
+search mode, and arbitrary substrings are found like `page.search_for` finds
+them.
+
+The trigram index maps every lower-cased three-character string to the sorted
+array of pages containing it. The literals that every match must contain
+(`required_literals`, which also understands simple regular expressions) are
+looked up there, so only pages holding all their trigrams are checked with
+the search regular expression. Patterns without usable literals fall back to
+a scan that decodes large runs of consecutive pages at once and runs the
+regular expression over the whole run first, so runs without a hit cost one
+regex pass.
+
+Only files whose size and mtime still match the corpus are answered, so the
+candidate pages can be passed to the search like the index's, which then
+opens just those pages to compute exact rectangles.
+
+Build a corpus next to an index with
+
+    python3 pdf_index.py INDEX_FILE -f FOLDER --corpus CORPUS_FILE
+"""
+import bisect
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+from array import array
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+try:
+    # When used as a package
+    from .pdf_models import SearchOptions
+    from .pdf_patterns import compile_search_regex, required_literals
+except Exception:
+    # When executed as a standalone module
+    from pdf_models import SearchOptions
+    from pdf_patterns import compile_search_regex, required_literals
+
+CORPUS_MAGIC = b"PDFTXT02"
+# text length, files JSON length, page count, trigram keys JSON length, trigram count, magic
+_FOOTER = struct.Struct("<QQQQQ8s")
+# Bytes of page text decoded and scanned at once
+SCAN_CHUNK_BYTES = 16 * 1024 * 1024
+# Regex syntax that depends on line breaks or whitespace runs, which the corpus text does not keep
+_LINE_SENSITIVE = re.compile(r"[$^\t\n\r\f\v]|\\[nrtfvAZ]|(?:\s|\\s)(?:\s|\\s|\{)")
+
+
+def page_trigrams(text: str) -> Set[str]:
+    """The distinct lower-cased trigrams of a page's text."""
+    text = text.lower()
+    return {text[position:position + 3] for position in range(len(text) - 2)}
+
+
+def _sorted_contains(values: Sequence[int], value: int) -> bool:
+    position = bisect.bisect_left(values, value)
+    return position < len(values) and values[position] == value
+
+
+class TextCorpus:
+    """Read-only view of a corpus file written by `TextCorpus.build`.
+
+    A corpus replaced by a rebuilt one while searches still use it is
+    `retire`d: it closes once every search that `acquire`d it has released it.
+    """
+
+    def __init__(self, corpus_path: str):
+        self.corpus_path = corpus_path
+        self._users = 0
+        self._retired = False
+        self._users_lock = threading.Lock()
+        self._file = open(corpus_path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            text_length, files_length, page_count, keys_length, trigram_count, magic = \
+                _FOOTER.unpack(self._map[-_FOOTER.size:])
+            if magic != CORPUS_MAGIC or self._map[:len(CORPUS_MAGIC)] != CORPUS_MAGIC:
+                raise ValueError(f"{corpus_path} is not a text corpus (rebuild it with pdf_index.py --corpus)")
+            self._text_start = len(CORPUS_MAGIC)
+            position = self._text_start + text_length
+            # Start of every page relative to the text, plus the end of the text
+            self._page_starts = array("q")
+            self._page_starts.frombytes(self._map[position:position + (page_count + 1) * 8])
+            position += (page_count + 1) * 8
+            # [path, size, mtime, first page, page count]
+            self._files: List[list] = json.loads(self._map[position:position + files_length].decode("utf-8"))
+            position += files_length
+            # Trigram -> number; its pages are postings[starts[number]:starts[number + 1]]
+            keys = json.loads(self._map[position:position + keys_length].decode("utf-8"))
+            self._trigrams = {trigram: number for number, trigram in enumerate(keys)}
+            position += keys_length
+            self._posting_starts = array("q")
+            self._posting_starts.frombytes(self._map[position:position + (trigram_count + 1) * 8])
+            self._postings_start = position + (trigram_count + 1) * 8
+        except Exception:
+            self.close()
+            raise
+        self._file_by_path = {entry[0]: entry for entry in self._files}
+
+    def close(self):
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def acquire(self) -> "TextCorpus":
+        """Keep the corpus open for a search until `release`."""
+        with self._users_lock:
+            self._users += 1
+        return self
+
+    def release(self):
+        with self._users_lock:
+            self._users -= 1
+            close = self._retired and not self._users
+        if close:
+            self.close()
+
+    def retire(self):
+        """Close the corpus now, or when the last search using it releases it."""
+        with self._users_lock:
+            self._retired = True
+            close = not self._users
+        if close:
+            self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def page_count(self) -> int:
+        return len(self._page_starts) - 1
+
+    @property
+    def text_bytes(self) -> int:
+        return self._page_starts[-1]
+
+    @property
+    def trigram_count(self) -> int:
+        return len(self._trigrams)
+
+    def page_counts(self, pdf_files: Sequence[str]) -> Dict[str, int]:
+        """Page count of every file of `pdf_files` in the corpus, current or not."""
+        return {pdf_file_path: self._file_by_path[pdf_file_path][4]
+                for pdf_file_path in pdf_files if pdf_file_path in self._file_by_path}
+
+    @staticmethod
+    def build(index, corpus_path: str) -> "TextCorpus":
+        """Write the page text of `index` (a `PDFIndex`) to `corpus_path` and open it.
+
+        The file is written next to its final name and moved into place, so a
+        corpus that is being read stays valid while a new one is built. The
+        trigram postings are collected in memory, at 4 bytes per distinct
+        trigram of every page.
+        """
+        temporary_path = corpus_path + ".tmp"
+        page_starts = array("q", [0])
+        files = []
+        postings: Dict[str, array] = {}
+        with open(temporary_path, "wb") as corpus_file:
+            corpus_file.write(CORPUS_MAGIC)
+            for pdf_file_path, size, mtime, texts in index.iter_files():
+                files.append([pdf_file_path, size, mtime, len(page_starts) - 1, len(texts)])
+                for text in texts:
+                    text = text.replace("\n", " ")
+                    page_number = len(page_starts) - 1
+                    for trigram in page_trigrams(text):
+                        pages = postings.get(trigram)
+                        if pages is None:
+                            pages = postings[trigram] = array("I")
+                        pages.append(page_number)
+                    data = text.encode("utf-8") + b"\n"
+                    corpus_file.write(data)
+                    page_starts.append(page_starts[-1] + len(data))
+            files_json = json.dumps(files).encode("utf-8")
+            keys = sorted(postings)
+            keys_json = json.dumps(keys).encode("utf-8")
+            posting_starts = array("q", [0])
+            for trigram in keys:
+                posting_starts.append(posting_starts[-1] + len(postings[trigram]))
+            corpus_file.write(page_starts.tobytes())
+            corpus_file.write(files_json)
+            corpus_file.write(keys_json)
+            corpus_file.write(posting_starts.tobytes())
+            for trigram in keys:
+                corpus_file.write(postings.pop(trigram).tobytes())
+            corpus_file.write(_FOOTER.pack(page_starts[-1], len(files_json), len(page_starts) - 1,
+                                           len(keys_json), len(keys), CORPUS_MAGIC))
+        os.replace(temporary_path, corpus_path)
+        return TextCorpus(corpus_path)
+
+    def _current_files(self, pdf_files: Sequence[str]) -> List[list]:
+        current = []
+        for pdf_file_path in pdf_files:
+            entry = self._file_by_path.get(pdf_file_path)
+            if entry is None:
+                continue
+            try:
+                stat = os.stat(pdf_file_path)
+            except OSError:
+                continue
+            if entry[1] == stat.st_size and entry[2] == stat.st_mtime:
+                current.append(entry)
+        return current
+
+    def _page_runs(self, entries: List[list]) -> List[Tuple[int, int]]:
+        """Group the files' pages into runs of neighbouring pages of about SCAN_CHUNK_BYTES."""
+        ranges = sorted((entry[3], entry[3] + entry[4]) for entry in entries if entry[4])
+        merged: List[List[int]] = []
+        for first_page, end_page in ranges:
+            if merged and merged[-1][1] == first_page:
+                merged[-1][1] = end_page
+            else:
+                merged.append([first_page, end_page])
+        runs = []
+        for first_page, end_page in merged:
+            start = first_page
+            while start < end_page:
+                end = start + 1
+                limit = self._page_starts[start] + SCAN_CHUNK_BYTES
+                while end < end_page and self._page_starts[end + 1] <= limit:
+                    end += 1
+                runs.append((start, end))
+                start = end
+        return runs
+
+    def _postings(self, trigram: str) -> array:
+        pages = array("I")
+        number = self._trigrams.get(trigram)
+        if number is not None:
+            start = self._postings_start + self._posting_starts[number] * pages.itemsize
+            pages.frombytes(self._map[start:start + (self._posting_starts[number + 1] -
+                                                     self._posting_starts[number]) * pages.itemsize])
+        return pages
+
+    def _literal_pages(self, literal: str) -> Set[int]:
+        """Pages containing every trigram of `literal`, which must be 3 characters or longer."""
+        trigrams = sorted({literal[position:position + 3] for position in range(len(literal) - 2)},
+                          key=lambda trigram: self._posting_length(trigram))
+        pages: Optional[Set[int]] = None
+        for trigram in trigrams:
+            postings = self._postings(trigram)
+            if pages is None:
+                pages = set(postings)
+            elif len(pages) * 16 < len(postings):
+                # Few candidates left: binary-search them in the long posting array
+                pages = {page for page in pages if _sorted_contains(postings, page)}
+            else:
+                pages.intersection_update(postings)
+            if not pages:
+                break
+        return pages or set()
+
+    def _posting_length(self, trigram: str) -> int:
+        number = self._trigrams.get(trigram)
+        return 0 if number is None else self._posting_starts[number + 1] - self._posting_starts[number]
+
+    def _trigram_pages(self, patterns: Sequence[str], regex: bool) -> Optional[Set[int]]:
+        """Corpus pages that may match any of `patterns`, or None if the trigrams cannot tell."""
+        pages: Set[int] = set()
+        for pattern in patterns:
+            clauses = [clause for clause in required_literals(pattern, regex)
+                       if all(len(literal) >= 3 for literal in clause)]
+            if not clauses:
+                return None
+            # Most selective clause first
+            clauses.sort(key=lambda clause: sum(self._posting_length(literal[:3]) for literal in clause))
+            pattern_pages: Optional[Set[int]] = None
+            for clause in clauses:
+                clause_pages: Set[int] = set()
+                for literal in clause:
+                    clause_pages |= self._literal_pages(literal)
+                pattern_pages = clause_pages if pattern_pages is None else pattern_pages & clause_pages
+                if not pattern_pages:
+                    break
+            pages |= pattern_pages
+        return pages
+
+    def _page_text(self, page_number: int) -> str:
+        return self._map[self._text_start + self._page_starts[page_number]:
+                         self._text_start + self._page_starts[page_number + 1] - 1].decode("utf-8", "replace")
+
+    def candidate_pages(self, search_pattern, pdf_files: Sequence[str],
+                        options: Optional[SearchOptions] = None) -> Dict[str, List[int]]:
+        """Look up the pages that contain `search_pattern`, like `PDFIndex.candidate_pages`.
+
+        Honours the regex, case-sensitive and whole-word modes of `options`.
+        Files in `pdf_files` that are in the corpus and unchanged map to a
+        (possibly empty) sorted list of page numbers; files missing from the
+        result must be searched without the corpus. Raises `re.error` for an
+        invalid regular expression.
+        """
+        options = options or SearchOptions()
+        if isinstance(search_pattern, str):
+            search_pattern = [search_pattern]
+        patterns = [pattern for pattern in search_pattern if pattern.strip()]
+        entries = self._current_files(pdf_files)
+        candidates: Dict[str, List[int]] = {entry[0]: [] for entry in entries}
+        if not patterns:
+            return candidates
+        if options.regex and any(_LINE_SENSITIVE.search(pattern) for pattern in patterns):
+            # The corpus text has no line breaks; let the search look at these pages itself
+            return {}
+        text_regex = compile_search_regex(patterns, options.regex, options.case_sensitive, options.whole_word)
+        entries.sort(key=lambda entry: entry[3])
+        first_pages = [entry[3] for entry in entries]
+        trigram_pages = self._trigram_pages(patterns, options.regex)
+        if trigram_pages is not None:
+            for page_number in sorted(trigram_pages):
+                position = bisect.bisect_right(first_pages, page_number) - 1
+                if position < 0 or page_number >= entries[position][3] + entries[position][4]:
+                    # A page of a file that is not searched or not current
+                    continue
+                entry = entries[position]
+                if text_regex.search(self._page_text(page_number)) is not None:
+                    candidates[entry[0]].append(page_number - entry[3])
+            return candidates
+        for start, end in self._page_runs(entries):
+            chunk = self._map[self._text_start + self._page_starts[start]:
+                              self._text_start + self._page_starts[end]].decode("utf-8", "replace")
+            if text_regex.search(chunk) is None:
+                continue
+            for offset, text in enumerate(chunk.split("\n")[:end - start]):
+                if text_regex.search(text) is not None:
+                    entry = entries[bisect.bisect_right(first_pages, start + offset) - 1]
+                    candidates[entry[0]].append(start + offset - entry[3])
+        return candidates
@@ -0,0 +1,198 @@
+"""File discovery for the PDF multifile searcher.
+
+`discover_pdf_files` walks any number of search roots at once. Directories are
+listed with `os.scandir` in a thread pool, which overlaps the latency of slow
+network shares. Files are deduplicated by (device, inode), so overlapping
+roots, symlinks and hard links yield each document once, and directory
+symlink loops are not followed twice.
+
+Filtering:
+- `include` globs are matched against the file name (case-insensitive);
+  the default only accepts PDF files.
+- `exclude` globs are matched against the name and the path relative to its
+  root, for files and directories; an excluded directory is not entered.
+- `max_depth` limits how many directory levels below a root are entered
+  (0 = the root only).
+- `min_size` / `max_size` bound the file size in bytes.
+
+Roots and folders that cannot be listed are skipped and reported through
+`on_error`.
+
+`find_duplicates` finds byte-identical copies among the discovered files, so
+each distinct content is searched once.
+"""
+import fnmatch
+import hashlib
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_INCLUDE = ("*.pdf",)
+# Bytes read from each end of a file for the partial content hash
+PARTIAL_HASH_BYTES = 64 * 1024
+
+
+def _matches_any(value: str, globs: Sequence[str]) -> bool:
+    value = value.lower()
+    return any(fnmatch.fnmatchcase(value, glob.lower()) for glob in globs)
+
+
+def _identity(path: str, stat: os.stat_result) -> Tuple:
+    """Key that is the same for every path of one file or directory.
+
+    `DirEntry.stat()` leaves the inode at 0 on Windows; `os.stat` fills it
+    in, and the resolved path stands in where no inode is available.
+    """
+    if not stat.st_ino:
+        stat = os.stat(path)
+    if not stat.st_ino:
+        return ("path", os.path.normcase(os.path.realpath(path)))
+    return stat.st_dev, stat.st_ino
+
+
+def _scan_directory(root: str, directory: str, depth: int, include: Sequence[str], exclude: Sequence[str],
+                    min_size: Optional[int], max_size: Optional[int]):
+    """List one directory; return (files, subdirectories) that pass the filters.
+
+    Files are (path, identity), subdirectories (path, depth, identity); see
+    `_identity`. Raises OSError if the directory cannot be listed.
+    """
+    files: List[Tuple[str, Tuple]] = []
+    subdirectories: List[Tuple[str, int, Tuple]] = []
+    entries = list(os.scandir(directory))
+    for entry in entries:
+        if exclude:
+            relative_path = os.path.relpath(entry.path, root)
+            if _matches_any(entry.name, exclude) or _matches_any(relative_path, exclude):
+                continue
+        try:
+            if entry.is_dir():
+                subdirectories.append((entry.path, depth + 1, _identity(entry.path, entry.stat())))
+            elif entry.is_file() and _matches_any(entry.name, include):
+                stat = entry.stat()
+                if min_size is not None and stat.st_size < min_size:
+                    continue
+                if max_size is not None and stat.st_size > max_size:
+                    continue
+                files.append((entry.path, _identity(entry.path, stat)))
+        except OSError:
+            continue
+    return files, subdirectories
+
+
+def discover_pdf_files(roots: Iterable[str], include: Sequence[str] = DEFAULT_INCLUDE,
+                       exclude: Sequence[str] = (), max_depth: Optional[int] = None,
+                       min_size: Optional[int] = None, max_size: Optional[int] = None,
+                       max_workers: int = 8,
+                       on_error: Optional[Callable[[str, str], None]] = None) -> List[str]:
+    """Return the absolute paths of all unique PDF files under `roots`, sorted.
+
+    When the same file is reachable through several paths, the smallest path
+    is kept so the result does not depend on walk order. `on_error(path,
+    reason)` is called for every root or folder that cannot be listed.
+    """
+    import concurrent.futures
+    include = tuple(include) or DEFAULT_INCLUDE
+    exclude = tuple(exclude)
+    found: Dict[Tuple, str] = {}
+    seen_directories = set()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = set()
+        futures_root: Dict[concurrent.futures.Future, Tuple[str, str, int]] = {}
+
+        def submit(root, directory, depth, key):
+            if key in seen_directories:
+                return
+            seen_directories.add(key)
+            future = executor.submit(_scan_directory, root, directory, depth, include, exclude, min_size, max_size)
+            futures_root[future] = (root, directory, depth)
+            pending.add(future)
+
+        for root in roots:
+            root = os.path.abspath(root)
+            try:
+                stat = os.stat(root)
+            except OSError as e:
+                if on_error is not None:
+                    on_error(root, e.strerror or str(e))
+                continue
+            submit(root, root, 0, _identity(root, stat))
+
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                root, directory, depth = futures_root.pop(future)
+                try:
+                    files, subdirectories = future.result()
+                except OSError as e:
+                    if on_error is not None:
+                        on_error(directory, e.strerror or str(e))
+                    continue
+                for path, key in files:
+                    if key not in found or path < found[key]:
+                        found[key] = path
+                if max_depth is not None and depth >= max_depth:
+                    continue
+                for path, sub_depth, key in subdirectories:
+                    submit(root, path, sub_depth, key)
+
+    return sorted(found.values())
+
+
+def _content_hash(path: str, size: int, partial: bool) -> Optional[str]:
+    """SHA-256 of a file, or of its first and last PARTIAL_HASH_BYTES; None if unreadable."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            if partial:
+                digest.update(f.read(PARTIAL_HASH_BYTES))
+                if size > 2 * PARTIAL_HASH_BYTES:
+                    f.seek(size - PARTIAL_HASH_BYTES)
+                digest.update(f.read(PARTIAL_HASH_BYTES))
+            else:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def find_duplicates(paths: Sequence[str]) -> Dict[str, str]:
+    """Map every file whose content equals an earlier file in `paths` to that file.
+
+    Files are compared by size first, then by a hash of both ends, and only
+    files that still collide are hashed in full, so unique files are never
+    read. Unreadable files are never duplicates.
+    """
+    by_size: Dict[int, List[str]] = {}
+    for path in paths:
+        try:
+            by_size.setdefault(os.path.getsize(path), []).append(path)
+        except OSError:
+            continue
+    duplicates: Dict[str, str] = {}
+    for size, same_size in by_size.items():
+        if len(same_size) < 2:
+            continue
+        by_partial: Dict[str, List[str]] = {}
+        for path in same_size:
+            partial_hash = _content_hash(path, size, partial=True)
+            if partial_hash is not None:
+                by_partial.setdefault(partial_hash, []).append(path)
+        for candidates in by_partial.values():
+            if len(candidates) < 2:
+                continue
+            if size <= 2 * PARTIAL_HASH_BYTES:
+                # The partial hash already covered the whole file
+                groups = [candidates]
+            else:
+                by_content: Dict[str, List[str]] = {}
+                for path in candidates:
+                    content_hash = _content_hash(path, size, partial=False)
+                    if content_hash is not None:
+                        by_content.setdefault(content_hash, []).append(path)
+                groups = list(by_content.values())
+            for group in groups:
+                for path in group[1:]:
+                    duplicates[path] = group[0]
+    return duplicates
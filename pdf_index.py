@@ -0,0 +1,426 @@
+"""Persistent full-text index for the PDF multifile searcher.
+
+The index stores the extracted text of every page in a SQLite database,
+keyed by file path, size and modification time. `search_pdfs` uses it to find
+the candidate pages for a pattern without parsing any PDF, and only re-opens
+the files with candidate pages to compute exact match rectangles.
+
+Updates are incremental: the stored size and mtime (and optionally a content
+hash) act as a manifest, so only new or changed files are re-extracted and
+deleted files are dropped. `IndexWatcher` repeats the update in a background
+thread to keep the index current while the GUI runs.
+
+Build or refresh an index from the command line with:
+
+    python3 pdf_index.py INDEX_FILE -f FOLDER [-f FOLDER ...] [--hash] [--watch SECONDS] [--corpus FILE]
+
+`--corpus` also writes the indexed page text to a memory-mapped `TextCorpus`
+(see `pdf_corpus`) after every update.
+"""
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+import pymupdf as fitz
+try:
+    # When used as a package
+    from .pdf_discovery import discover_pdf_files
+    from .pdf_corpus import TextCorpus
+except Exception:
+    # When executed as a standalone module
+    from pdf_discovery import discover_pdf_files
+    from pdf_corpus import TextCorpus
+
+SCHEMA_VERSION = 3
+
+
+def normalize_text(text: str) -> str:
+    """Collapse all whitespace runs to single spaces.
+
+    Both the stored page text and the query are normalized the same way so a
+    pattern matches across line breaks, like `page.search_for` does.
+    """
+    return " ".join(text.split())
+
+
+def file_hash(pdf_file_path: str) -> Optional[str]:
+    """Return the SHA-256 hex digest of a file, or None if it cannot be read."""
+    digest = hashlib.sha256()
+    try:
+        with open(pdf_file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+@dataclass
+class IndexUpdate:
+    """Summary of one incremental index update."""
+    added: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    failed: List[str] = field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def modified(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+
+
+def extract_pdf(pdf_file_path: str) -> Optional[List[str]]:
+    """Extract the normalized text of every page of a PDF.
+
+    Returns None if the file cannot be opened.
+    """
+    try:
+        pdf_document = fitz.open(pdf_file_path)
+    except Exception:
+        return None
+    pages = []
+    try:
+        for page in pdf_document:
+            try:
+                text = normalize_text(page.get_text("text"))
+            except Exception:
+                text = ""
+            pages.append(text)
+    finally:
+        pdf_document.close()
+    return pages
+
+
+class PDFIndex:
+    """SQLite backed index of page text.
+
+    The connection is shared between threads and guarded by a lock, so one
+    index object can be used from the GUI and from search worker threads.
+    """
+
+    def __init__(self, index_path: str):
+        self.index_path = index_path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(index_path, check_same_thread=False)
+        self._create_schema()
+
+    def _create_schema(self):
+        with self._lock, self._connection as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                " id INTEGER PRIMARY KEY,"
+                " path TEXT UNIQUE NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " mtime REAL NOT NULL,"
+                " page_count INTEGER NOT NULL,"
+                " content_hash TEXT)")
+            columns = [row[1] for row in connection.execute("PRAGMA table_info(files)")]
+            if 'content_hash' not in columns:
+                # Index created by schema version 1
+                connection.execute("ALTER TABLE files ADD COLUMN content_hash TEXT")
+            if 'words' in [row[1] for row in connection.execute("PRAGMA table_info(pages)")]:
+                # Index created by schema version 2 or older, with unused word boxes; re-extract everything
+                connection.execute("DROP TABLE pages")
+                connection.execute("DROP TABLE IF EXISTS page_text")
+                connection.execute("DELETE FROM files")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                " id INTEGER PRIMARY KEY,"
+                " file_id INTEGER NOT NULL,"
+                " page_number INTEGER NOT NULL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS pages_file_id ON pages (file_id, page_number)")
+            # The trigram tokenizer gives the arbitrary-substring semantics of
+            # page.search_for. Older SQLite builds lack it; fall back to a
+            # plain table that is scanned with instr().
+            try:
+                connection.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS page_text USING fts5(text, tokenize='trigram')")
+            except sqlite3.OperationalError:
+                connection.execute("CREATE TABLE IF NOT EXISTS page_text (text TEXT NOT NULL)")
+            connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        row = self._connection.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'page_text'").fetchone()
+        self._has_trigram = bool(row) and 'trigram' in row[0]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _fingerprints(self) -> Dict[str, Tuple[int, int, float, Optional[str]]]:
+        """Return {path: (file_id, size, mtime, content_hash)} for every indexed file."""
+        with self._lock:
+            rows = self._connection.execute("SELECT path, id, size, mtime, content_hash FROM files").fetchall()
+        return {row[0]: tuple(row[1:]) for row in rows}
+
+    def is_current(self, pdf_file_path: str) -> bool:
+        """True if the file is indexed and unchanged since it was indexed."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT size, mtime FROM files WHERE path = ?", (pdf_file_path,)).fetchone()
+        if row is None:
+            return False
+        try:
+            stat = os.stat(pdf_file_path)
+        except OSError:
+            return False
+        return row[0] == stat.st_size and row[1] == stat.st_mtime
+
+    def _delete_file_rows(self, connection, file_id: int):
+        connection.execute(
+            "DELETE FROM page_text WHERE rowid IN (SELECT id FROM pages WHERE file_id = ?)", (file_id,))
+        connection.execute("DELETE FROM pages WHERE file_id = ?", (file_id,))
+        connection.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def store(self, pdf_file_path: str, size: int, mtime: float,
+              pages: List[str], content_hash: Optional[str] = None):
+        """Replace the stored pages of `pdf_file_path` with `pages`."""
+        with self._lock, self._connection as connection:
+            row = connection.execute("SELECT id FROM files WHERE path = ?", (pdf_file_path,)).fetchone()
+            if row is not None:
+                self._delete_file_rows(connection, row[0])
+            cursor = connection.execute(
+                "INSERT INTO files (path, size, mtime, page_count, content_hash) VALUES (?, ?, ?, ?, ?)",
+                (pdf_file_path, size, mtime, len(pages), content_hash))
+            file_id = cursor.lastrowid
+            for page_number, text in enumerate(pages):
+                cursor = connection.execute(
+                    "INSERT INTO pages (file_id, page_number) VALUES (?, ?)", (file_id, page_number))
+                connection.execute(
+                    "INSERT INTO page_text (rowid, text) VALUES (?, ?)", (cursor.lastrowid, text))
+
+    def touch(self, pdf_file_path: str, size: int, mtime: float):
+        """Record a new size/mtime for a file whose content is unchanged."""
+        with self._lock, self._connection as connection:
+            connection.execute("UPDATE files SET size = ?, mtime = ? WHERE path = ?",
+                               (size, mtime, pdf_file_path))
+
+    def remove(self, pdf_file_path: str):
+        """Drop a file from the index."""
+        with self._lock, self._connection as connection:
+            row = connection.execute("SELECT id FROM files WHERE path = ?", (pdf_file_path,)).fetchone()
+            if row is not None:
+                self._delete_file_rows(connection, row[0])
+
+    def add_file(self, pdf_file_path: str) -> bool:
+        """Extract and store a single file. Returns False if it could not be read."""
+        try:
+            stat = os.stat(pdf_file_path)
+        except OSError:
+            return False
+        pages = extract_pdf(pdf_file_path)
+        if pages is None:
+            return False
+        self.store(pdf_file_path, stat.st_size, stat.st_mtime, pages)
+        return True
+
+    def update(self, directories: Iterable[str], use_hash: bool = False) -> IndexUpdate:
+        """Bring the index up to date with the PDFs under `directories`.
+
+        Files whose size and mtime match the manifest are skipped without being
+        opened. With `use_hash`, files whose size or mtime changed but whose
+        content hash did not are only re-stamped instead of re-extracted.
+        Indexed files under `directories` that no longer exist are dropped.
+        Extraction runs in a thread pool; the results are written from the
+        calling thread.
+        """
+        import concurrent.futures
+        directories = [os.path.abspath(directory) for directory in directories]
+        fingerprints = self._fingerprints()
+        summary = IndexUpdate()
+        seen = set()
+        to_index = []
+        for pdf_file_path in discover_pdf_files(directories):
+            seen.add(pdf_file_path)
+            try:
+                stat = os.stat(pdf_file_path)
+            except OSError:
+                continue
+            known = fingerprints.get(pdf_file_path)
+            if known is not None and known[1] == stat.st_size and known[2] == stat.st_mtime:
+                summary.unchanged += 1
+                continue
+            to_index.append((pdf_file_path, stat.st_size, stat.st_mtime, known))
+
+        def extract(path, known):
+            content_hash = file_hash(path) if use_hash else None
+            if content_hash is not None and known is not None and known[3] == content_hash:
+                return content_hash, None
+            return content_hash, extract_pdf(path)
+
+        with concurrent.futures.ThreadPoolExecutor() as executor:
+            future_to_pdf = {executor.submit(extract, path, known): (path, size, mtime, known)
+                             for path, size, mtime, known in to_index}
+            for future in concurrent.futures.as_completed(future_to_pdf):
+                path, size, mtime, known = future_to_pdf[future]
+                content_hash, pages = future.result()
+                if pages is None and content_hash is not None and known is not None \
+                        and known[3] == content_hash:
+                    self.touch(path, size, mtime)
+                    summary.unchanged += 1
+                elif pages is None:
+                    summary.failed.append(path)
+                else:
+                    self.store(path, size, mtime, pages, content_hash)
+                    (summary.added if known is None else summary.changed).append(path)
+
+        roots = tuple(os.path.join(directory, '') for directory in directories)
+        for path in fingerprints:
+            if path not in seen and path.startswith(roots) and not os.path.exists(path):
+                self.remove(path)
+                summary.removed.append(path)
+        return summary
+
+    def candidate_pages(self, search_pattern: Union[str, Sequence[str]],
+                        pdf_files: Iterable[str]) -> Dict[str, List[int]]:
+        """Look up the pages that may contain `search_pattern`.
+
+        `search_pattern` may be a list, in which case pages containing any of
+        the patterns are returned. Only files in `pdf_files` whose indexed
+        size and mtime still match the file on disk are answered; they map to
+        a (possibly empty) sorted list of page numbers. Files that are missing
+        from the result must be searched without the index.
+        """
+        if isinstance(search_pattern, str):
+            search_pattern = [search_pattern]
+        patterns = [normalize_text(pattern) for pattern in search_pattern]
+        patterns = [pattern for pattern in patterns if pattern]
+        fingerprints = self._fingerprints()
+        current = set()
+        for pdf_file_path in pdf_files:
+            known = fingerprints.get(pdf_file_path)
+            if known is None:
+                continue
+            try:
+                stat = os.stat(pdf_file_path)
+            except OSError:
+                continue
+            if known[1] == stat.st_size and known[2] == stat.st_mtime:
+                current.add(pdf_file_path)
+
+        candidates: Dict[str, set] = {path: set() for path in current}
+        if not patterns or not current:
+            return {path: [] for path in candidates}
+        query = ("SELECT f.path, p.page_number FROM page_text t"
+                 " JOIN pages p ON p.id = t.rowid JOIN files f ON f.id = p.file_id")
+        for pattern in patterns:
+            if self._has_trigram and len(pattern) >= 3:
+                # Quote the pattern as a single FTS phrase
+                rows = self._execute(query + " WHERE page_text MATCH ?",
+                                     ('"' + pattern.replace('"', '""') + '"',))
+            else:
+                rows = self._execute(query + " WHERE instr(lower(t.text), lower(?)) > 0", (pattern,))
+            for path, page_number in rows:
+                if path in candidates:
+                    candidates[path].add(page_number)
+        return {path: sorted(pages) for path, pages in candidates.items()}
+
+    def page_counts(self, pdf_files: Iterable[str]) -> Dict[str, int]:
+        """Page count of every indexed file of `pdf_files`, as of its last indexing."""
+        wanted = set(pdf_files)
+        return {path: page_count for path, page_count in self._execute("SELECT path, page_count FROM files", ())
+                if path in wanted}
+
+    def iter_files(self) -> Iterator[Tuple[str, int, float, List[str]]]:
+        """Yield (path, size, mtime, page texts) for every indexed file, in path order."""
+        files = self._execute("SELECT id, path, size, mtime FROM files ORDER BY path", ())
+        for file_id, pdf_file_path, size, mtime in files:
+            rows = self._execute(
+                "SELECT t.text FROM pages p JOIN page_text t ON t.rowid = p.id"
+                " WHERE p.file_id = ? ORDER BY p.page_number", (file_id,))
+            yield pdf_file_path, size, mtime, [row[0] for row in rows]
+
+    def _execute(self, query: str, parameters: tuple) -> list:
+        with self._lock:
+            return self._connection.execute(query, parameters).fetchall()
+
+
+class IndexWatcher:
+    """Poll a set of folders and keep a `PDFIndex` up to date in the background.
+
+    Every `interval` seconds the watcher runs an incremental `PDFIndex.update`
+    over its current directories. `on_update` is called from the watcher
+    thread with the `IndexUpdate` of every pass that changed the index.
+    """
+
+    def __init__(self, index: PDFIndex, directories: Iterable[str], interval: float = 300.0,
+                 use_hash: bool = False, on_update: Optional[Callable[[IndexUpdate], None]] = None):
+        self.index = index
+        self.interval = interval
+        self.use_hash = use_hash
+        self.on_update = on_update
+        self._directories = list(directories)
+        self._directories_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def set_directories(self, directories: Iterable[str]):
+        with self._directories_lock:
+            self._directories = list(directories)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="IndexWatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            with self._directories_lock:
+                directories = list(self._directories)
+            try:
+                summary = self.index.update(directories, use_hash=self.use_hash)
+                if summary.modified and self.on_update is not None:
+                    self.on_update(summary)
+            except Exception as e:
+                print(f"Error while updating search index: {e}")
+            self._stop_event.wait(self.interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build or refresh the PDF multifile search index')
+    parser.add_argument('index', help='The index file to create or update')
+    parser.add_argument('-f', '--folder', action='append', required=True, help='The folder to index')
+    parser.add_argument('--hash', action='store_true',
+                        help='Compare content hashes before re-extracting files whose size or mtime changed')
+    parser.add_argument('--watch', type=float, metavar='SECONDS',
+                        help='Keep running and update the index every SECONDS')
+    parser.add_argument('--corpus', metavar='FILE',
+                        help='Also write the page text to this memory-mapped corpus file')
+    args = parser.parse_args()
+
+    def report(summary):
+        print(f"{args.index}: {len(summary.added)} added, {len(summary.changed)} changed, "
+              f"{len(summary.removed)} removed, {len(summary.failed)} failed, {summary.unchanged} unchanged")
+        if args.corpus and (summary.modified or not os.path.exists(args.corpus)):
+            with TextCorpus.build(pdf_index, args.corpus) as corpus:
+                print(f"{args.corpus}: {corpus.page_count} pages, {corpus.text_bytes} bytes of text, "
+                      f"{corpus.trigram_count} trigrams")
+
+    with PDFIndex(args.index) as pdf_index:
+        if args.watch:
+            watcher = IndexWatcher(pdf_index, args.folder, interval=args.watch,
+                                   use_hash=args.hash, on_update=report)
+            watcher.start()
+            try:
+                while True:
+                    time.sleep(1.0)
+            except KeyboardInterrupt:
+                watcher.stop()
+        else:
+            report(pdf_index.update(args.folder, use_hash=args.hash))
@@ -4,7 +4,11 @@ This module contains lightweight dataclasses used across the project so
 they can be imported from multiple places without creating circular
 dependencies with the GUI code.
 """
-from dataclasses import dataclass
+import threading
+from array import array
+from collections.abc import Sequence
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
 import pymupdf as fitz
 
 
@@ -15,3 +19,331 @@ class Match:
     location: fitz.Rect
     context_location: fitz.Rect
     context: str = ""
+    # The search pattern that produced this match
+    pattern: str = ""
+
+    def to_dict(self) -> dict:
+        """Return the match as JSON-serialisable plain values."""
+        return {
+            'match_id': self.match_id,
+            'page_number': self.page_number,
+            'location': [self.location.x0, self.location.y0, self.location.x1, self.location.y1],
+            'context_location': [self.context_location.x0, self.context_location.y0,
+                                 self.context_location.x1, self.context_location.y1],
+            'context': self.context,
+            'pattern': self.pattern,
+        }
+
+
+class MatchList(Sequence):
+    """Compact, column-oriented storage for the matches of one file.
+
+    Page numbers, rectangle coordinates and pattern indexes live in `array`
+    columns and identical context strings are stored once, which takes a small
+    fraction of the memory of a list of `Match` objects and pickles cheaply
+    between worker processes. Match IDs are contiguous within a file, so only
+    `first_match_id` is stored.
+
+    Indexing or iterating returns `Match` views built on demand; changing a
+    view does not change the list.
+    """
+    __slots__ = ('first_match_id', 'patterns', '_pages', '_rects', '_contexts', '_pattern_indexes',
+                 '_strings', '_string_ids')
+
+    def __init__(self, patterns: Sequence = ("",), first_match_id: int = 0):
+        self.first_match_id = first_match_id
+        self.patterns = list(patterns)
+        self._pages = array('i')
+        # location and context_location, 8 coordinates per match
+        self._rects = array('d')
+        self._contexts = array('I')
+        self._pattern_indexes = array('I')
+        self._strings: List[str] = []
+        self._string_ids: Dict[str, int] = {}
+
+    def append(self, page_number: int, location, context_location, context: str = "", pattern_index: int = 0):
+        """Add a match; rectangles may be `fitz.Rect` objects or (x0, y0, x1, y1) tuples."""
+        string_id = self._string_ids.get(context)
+        if string_id is None:
+            string_id = len(self._strings)
+            self._strings.append(context)
+            self._string_ids[context] = string_id
+        self._pages.append(page_number)
+        self._rects.extend(tuple(location))
+        self._rects.extend(tuple(context_location))
+        self._contexts.append(string_id)
+        self._pattern_indexes.append(pattern_index)
+
+    def extend(self, other: "MatchList"):
+        """Append the matches of another list over the same patterns, e.g. of a later page range."""
+        for position in range(len(other)):
+            rects = other._rects[position * 8:position * 8 + 8]
+            self.append(other._pages[position], rects[0:4], rects[4:8],
+                        other._strings[other._contexts[position]], other._pattern_indexes[position])
+
+    def truncate(self, count: int):
+        """Keep only the first `count` matches."""
+        if count >= len(self._pages):
+            return
+        del self._pages[count:]
+        del self._rects[count * 8:]
+        del self._contexts[count:]
+        del self._pattern_indexes[count:]
+
+    def copy(self) -> "MatchList":
+        """Return an independent copy, e.g. of a cached list that is about to be truncated."""
+        copied = MatchList(self.patterns, self.first_match_id)
+        copied._pages = array(self._pages.typecode, self._pages)
+        copied._rects = array(self._rects.typecode, self._rects)
+        copied._contexts = array(self._contexts.typecode, self._contexts)
+        copied._pattern_indexes = array(self._pattern_indexes.typecode, self._pattern_indexes)
+        copied._strings = list(self._strings)
+        copied._string_ids = dict(self._string_ids)
+        return copied
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("match index out of range")
+        rects = self._rects[position * 8:position * 8 + 8]
+        return Match(self.first_match_id + position, self._pages[position],
+                     fitz.Rect(*rects[0:4]), fitz.Rect(*rects[4:8]),
+                     self._strings[self._contexts[position]],
+                     self.patterns[self._pattern_indexes[position]])
+
+    def page_numbers(self) -> array:
+        """The page number column, e.g. for grouping matches without building views."""
+        return self._pages
+
+    def on_page(self, page_number: int) -> List[Match]:
+        """Views of the matches on one page only."""
+        return [self[position] for position, page in enumerate(self._pages) if page == page_number]
+
+    def nbytes(self) -> int:
+        """Approximate memory used by the columns and the distinct context strings."""
+        columns = (self._pages, self._rects, self._contexts, self._pattern_indexes)
+        return sum(column.itemsize * len(column) for column in columns) + \
+            sum(len(string) for string in self._strings)
+
+    def __getstate__(self):
+        # The string lookup dict is rebuilt on demand instead of being pickled
+        return (self.first_match_id, self.patterns, self._pages, self._rects, self._contexts,
+                self._pattern_indexes, self._strings)
+
+    def __setstate__(self, state):
+        (self.first_match_id, self.patterns, self._pages, self._rects, self._contexts,
+         self._pattern_indexes, self._strings) = state
+        self._string_ids = {string: string_id for string_id, string in enumerate(self._strings)}
+
+    def __repr__(self) -> str:
+        return f"MatchList({len(self)} matches, first_match_id={self.first_match_id})"
+
+
+@dataclass
+class SearchOptions:
+    """Options controlling how `pdf_search.search_pdfs` runs; limits of None mean unlimited."""
+    engine: str = "threads"
+    max_workers: Optional[int] = None
+    max_results: Optional[int] = None
+    max_matches_per_file: Optional[int] = None
+    # Stop at the first hit in each document, enough to list the matching files
+    files_only: bool = False
+    # The regex, case-sensitive and whole-word modes match the extracted page text
+    regex: bool = False
+    case_sensitive: bool = False
+    whole_word: bool = False
+    # File filters, see pdf_discovery
+    include: Tuple[str, ...] = ("*.pdf",)
+    exclude: Tuple[str, ...] = ()
+    max_depth: Optional[int] = None
+    min_file_size: Optional[int] = None
+    max_file_size: Optional[int] = None
+    # The pattern is a boolean/proximity query (see pdf_query), per "page" or "document"
+    query: bool = False
+    query_scope: str = "page"
+    # Search byte-identical files once and report the matches for every copy
+    dedupe: bool = True
+    # Longer documents are split into page ranges of this size; None keeps them whole
+    shard_pages: Optional[int] = 250
+    # Files or page ranges queued or being searched at once; None allows twice the workers
+    max_in_flight: Optional[int] = None
+    # Order files are searched in (see pdf_schedule), after those under priority_paths
+    schedule: str = "largest"
+    priority_paths: Tuple[str, ...] = ()
+
+    def uses_text_layout(self) -> bool:
+        """True if matches must be found in the extracted text instead of with search_for."""
+        return not self.query and (self.regex or self.case_sensitive or self.whole_word)
+
+    def per_file_limit(self) -> Optional[int]:
+        """Most matches worth collecting from a single file."""
+        limits = [limit for limit in (self.max_results, self.max_matches_per_file) if limit is not None]
+        if self.files_only:
+            limits.append(1)
+        return min(limits) if limits else None
+
+
+@dataclass
+class FileStats:
+    """Outcome and timings of searching one file.
+
+    `status` is "scanned", "cached", "duplicate", "skipped" or "failed";
+    `reason` says why a file was skipped or failed, or describes the first
+    page that could not be searched. A "duplicate" has the same content as
+    `duplicate_of`, whose matches it reports without being searched.
+    `page_count` is the length of the document and `pages` the number of
+    pages searched.
+    `phases` maps a phase name to [wall seconds, CPU seconds].
+    """
+    path: str
+    status: str = "scanned"
+    reason: str = ""
+    page_count: int = 0
+    pages: int = 0
+    matches: int = 0
+    bytes_read: int = 0
+    page_errors: int = 0
+    duplicate_of: str = ""
+    phases: Dict[str, List[float]] = field(default_factory=dict)
+
+    def add_phase(self, name: str, wall: float, cpu: float):
+        totals = self.phases.setdefault(name, [0.0, 0.0])
+        totals[0] += wall
+        totals[1] += cpu
+
+    def merge(self, other: "FileStats"):
+        """Add the counters and timings of another page range of the same file."""
+        self.pages += other.pages
+        self.matches += other.matches
+        # A page range whose document could not be opened counts as a page error
+        self.page_errors += other.page_errors + (other.status == "failed")
+        self.reason = self.reason or other.reason
+        for name, (wall, cpu) in other.phases.items():
+            self.add_phase(name, wall, cpu)
+
+    @property
+    def wall_time(self) -> float:
+        return sum(wall for wall, _ in self.phases.values())
+
+    @property
+    def cpu_time(self) -> float:
+        return sum(cpu for _, cpu in self.phases.values())
+
+
+@dataclass
+class SearchStats:
+    """Counters and timings of one search, filled in by `pdf_search.iter_search_pdfs`.
+
+    Phase times of the workers are summed, so with several workers their CPU
+    (and wall) totals can exceed the search's `wall_time`. The `slowest_count`
+    files with the longest wall time are kept in `slowest`. `schedule` is the
+    order the files were searched in (see `pdf_schedule`). The methods may
+    be called from several threads, e.g. `summary` while a search adds files.
+    """
+    slowest_count: int = 10
+    schedule: str = ""
+    files_scanned: int = 0
+    files_cached: int = 0
+    files_duplicate: int = 0
+    files_skipped: int = 0
+    files_failed: int = 0
+    pages: int = 0
+    matches: int = 0
+    bytes_read: int = 0
+    page_errors: int = 0
+    wall_time: float = 0.0
+    skip_reasons: Dict[str, int] = field(default_factory=dict)
+    # (path, reason) of every file that could not be searched
+    failures: List[Tuple[str, str]] = field(default_factory=list)
+    # (path, reason) of every search root or folder that could not be listed
+    unreadable_folders: List[Tuple[str, str]] = field(default_factory=list)
+    phases: Dict[str, List[float]] = field(default_factory=dict)
+    slowest: List[FileStats] = field(default_factory=list)
+
+    def __post_init__(self):
+        self._lock = threading.RLock()
+
+    def add_phase(self, name: str, wall: float, cpu: float):
+        with self._lock:
+            totals = self.phases.setdefault(name, [0.0, 0.0])
+            totals[0] += wall
+            totals[1] += cpu
+
+    def skip(self, reason: str, count: int = 1):
+        """Count `count` files that were not searched for `reason`."""
+        with self._lock:
+            self.files_skipped += count
+            self.skip_reasons[reason] = self.skip_reasons.get(reason, 0) + count
+
+    def add_unreadable_folder(self, path: str, reason: str):
+        with self._lock:
+            self.unreadable_folders.append((path, reason))
+
+    def add_file(self, file_stats: FileStats):
+        with self._lock:
+            self._add_file(file_stats)
+
+    def _add_file(self, file_stats: FileStats):
+        if file_stats.status == "failed":
+            self.files_failed += 1
+            self.failures.append((file_stats.path, file_stats.reason))
+        elif file_stats.status == "skipped":
+            self.skip(file_stats.reason)
+            return
+        elif file_stats.status == "cached":
+            self.files_cached += 1
+            self.matches += file_stats.matches
+            return
+        elif file_stats.status == "duplicate":
+            self.files_duplicate += 1
+            self.matches += file_stats.matches
+            return
+        else:
+            self.files_scanned += 1
+        self.pages += file_stats.pages
+        self.matches += file_stats.matches
+        self.bytes_read += file_stats.bytes_read
+        self.page_errors += file_stats.page_errors
+        for name, (wall, cpu) in file_stats.phases.items():
+            self.add_phase(name, wall, cpu)
+        if self.slowest_count:
+            self.slowest.append(file_stats)
+            self.slowest.sort(key=lambda stats: stats.wall_time, reverse=True)
+            del self.slowest[self.slowest_count:]
+
+    def summary(self) -> str:
+        """One line with the counters and the wall time of every phase."""
+        with self._lock:
+            return self._summary()
+
+    def _summary(self) -> str:
+        files = f"{self.files_scanned} files"
+        if self.files_cached:
+            files += f" + {self.files_cached} cached"
+        if self.files_duplicate:
+            files += f" + {self.files_duplicate} duplicates"
+        if self.files_skipped or self.files_failed:
+            files += f" ({self.files_skipped} skipped, {self.files_failed} failed)"
+        if self.unreadable_folders:
+            files += f", {len(self.unreadable_folders)} unreadable folders"
+        phases = ", ".join(f"{name} {wall:.2f}s" for name, (wall, _) in self.phases.items())
+        text = (f"{files}, {self.pages} pages, {self.matches} matches, "
+                f"{self.bytes_read / (1024 * 1024):.1f} MB in {self.wall_time:.2f}s")
+        if self.schedule:
+            text += f", schedule {self.schedule}"
+        return f"{text}; {phases}" if phases else text
+
+    def to_dict(self) -> dict:
+        """Return the statistics as JSON-serialisable plain values."""
+        with self._lock:
+            record = asdict(self)
+            record["slowest"] = [{"path": stats.path, "wall_time": stats.wall_time, "cpu_time": stats.cpu_time,
+                                  "pages": stats.pages, "matches": stats.matches}
+                                 for stats in self.slowest]
+        return record
@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
 
 import argparse
+import bisect
 from __hello__ import initialized
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 import pymupdf as fitz
 from pprint import pprint  # for easily printing results
 import tkinter as tk
@@ -10,18 +11,53 @@ from tkinter import filedialog
 from tkinter import ttk
 import os
 import configparser
+import queue
+import re
+import sys
+import threading
+import time
 from tkinterdnd2 import DND_FILES, TkinterDnD
 #from PIL.ImageOps import expand
 CONFIG_FILE = os.path.join(os.path.expanduser('~'), '.pdf_multifile_searcher_config.ini')
+# Separates several search terms in the pattern entry, e.g. "invoice; receipt"
+PATTERN_SEPARATOR = ';'
+# Match rows inserted per file node at a time; more are loaded on demand
+RESULT_PAGE_SIZE = 500
+# Milliseconds without resize or sash events before the page is re-rendered
+RENDER_DEBOUNCE_MS = 150
+# Milliseconds between checks for a full-resolution page from the render worker
+RENDER_POLL_MS = 30
+# Default location of the full-text index, used unless [Index] path is configured
+INDEX_FILE = os.path.join(os.path.expanduser('~'), '.pdf_multifile_searcher_index.sqlite')
+# Default location of the saved query result cache, used unless [Cache] path is configured
+QUERY_CACHE_FILE = os.path.join(os.path.expanduser('~'), '.pdf_multifile_searcher_cache.pickle')
 
 try:
     # When used as a package
-    from .pdf_models import Match
-    from .pdf_search import search_pdfs
+    from .pdf_models import Match, SearchOptions, SearchStats
+    from .pdf_search import iter_search_pdfs
+    from .pdf_index import PDFIndex, IndexWatcher
+    from .pdf_corpus import TextCorpus
+    from .pdf_patterns import compile_search_regex
+    from .pdf_render import (PREVIEW_ZOOM, DocumentPool, RenderCache, RenderWorker, fit_scale, render_key,
+                             render_page)
+    from .pdf_cache import QueryCache
+    from .pdf_query import QuerySyntaxError, parse_query
+    from .pdf_schedule import SCHEDULES
+    from .pdf_server import SearchClient
 except Exception:
     # When executed as a script (no package context)
-    from pdf_models import Match
-    from pdf_search import search_pdfs
+    from pdf_models import Match, SearchOptions, SearchStats
+    from pdf_search import iter_search_pdfs
+    from pdf_index import PDFIndex, IndexWatcher
+    from pdf_corpus import TextCorpus
+    from pdf_patterns import compile_search_regex
+    from pdf_render import (PREVIEW_ZOOM, DocumentPool, RenderCache, RenderWorker, fit_scale, render_key,
+                            render_page)
+    from pdf_cache import QueryCache
+    from pdf_query import QuerySyntaxError, parse_query
+    from pdf_schedule import SCHEDULES
+    from pdf_server import SearchClient
 
 
 class PDFMultifileSearch:
@@ -35,13 +71,49 @@ class PDFMultifileSearch:
         initial_sash_position = 400
         self.tk_root.geometry(f"{window_width}x{window_height}+{window_x_position}+{window_y_position}")
 
-        # todo: introduce command line mode that does not store search directories 
-        # and search pattern in the configuration file
-        self.search_directories = directories
         # dictionary with one entry per PDF file
         # each entry is a dictionary, whose key is the page number of the match and the
         # value is a list of rectangles of the match locations
         self.search_results = dict()
+        # Full-text index consulted by the search; opened once it exists
+        self.index_path = INDEX_FILE
+        self.search_index = None
+        # Background refresh of the index; 0 disables it
+        self.index_watch_interval = 300.0
+        self.index_use_hash = False
+        self.index_watcher = None
+        # Memory-mapped page text written from the index; an empty path disables it
+        self.corpus_path = ""
+        self.text_corpus = None
+        # Search backend and result limits, stored in the [Search] config section
+        self.search_options = SearchOptions(engine="auto", max_results=100000)
+        # Each search gets a new generation; queued results of older searches are dropped
+        self._search_generation = 0
+        self._search_cancel = threading.Event()
+        # Results of earlier searches, reused by repeated and narrowing searches
+        self.query_cache = QueryCache()
+        self.query_cache_path = QUERY_CACHE_FILE
+        self.query_cache_persist = True
+        # Search server (see pdf_server.py); searches run locally when no URL is set
+        self.server_url = ''
+        self.server_token = ''
+        # Statistics of the running or last search, shown in the status bar
+        self.search_stats = SearchStats()
+        # Rendered pages, keyed by (file, page, scale)
+        self.render_cache = RenderCache()
+        # Open documents shared by the viewer and the folder tree
+        self.document_pool = DocumentPool()
+        # Renders the shown page at full resolution and prefetches its neighbours
+        # in the background; rendered cache keys come back through render_queue
+        self.render_queue = queue.Queue()
+        self.render_worker = RenderWorker(self.render_cache, on_rendered=self.render_queue.put)
+        # Cache key of the full-resolution page to swap in for the preview shown
+        self._awaited_render = None
+        self._render_poll_id = None
+        self.loaded_pdf_path = None
+        # Match highlights drawn over the page: (x0, y0, x1, y1, color, width, kind)
+        self._overlay_rects = []
+        self._render_after_id = None
 
         menu_bar = tk.Menu(self.tk_root)
 
@@ -50,6 +122,8 @@ class PDFMultifileSearch:
         file_menu.add_command(label="Open", command=self.open_pdf)
         file_menu.add_command(label="Add search folder", command=self.add_search_folder)
         file_menu.add_command(label="Clear search folders", command=self.clear_search_folders)
+        file_menu.add_command(label="Update search index", command=self.update_search_index)
+        file_menu.add_command(label="Clear search cache", command=self.clear_query_cache)
         file_menu.add_separator()
         file_menu.add_command(label="Exit", command=exit_app)
 
@@ -59,6 +133,10 @@ class PDFMultifileSearch:
         # Configure the window to use the menu bar
         self.tk_root.config(menu=menu_bar)
 
+        # Status bar with the statistics of the last search
+        self.status_bar = tk.Label(self.tk_root, text="", anchor="w", relief=tk.SUNKEN)
+        self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+
         # Create the paned window
         self.paned_window = tk.PanedWindow(self.tk_root, orient=tk.HORIZONTAL, sashrelief=tk.RAISED)
         self.paned_window.pack(expand=True, fill=tk.BOTH)
@@ -136,17 +214,48 @@ class PDFMultifileSearch:
         self.pattern_entry.bind("<Return>", self._on_pattern_entry_return)
         self.pattern_entry.bind("<KP_Enter>", self._on_pattern_entry_return)
 
-        search_button = tk.Button(self.search_pane, text="Search", command=self.search_pdfs)
-        search_button.pack(side=tk.TOP, fill=tk.X, expand=False)
+        # Search modes; they are copied into self.search_options when a search starts
+        self.search_mode_frame = tk.Frame(self.search_pane, background="lightblue")
+        self.search_mode_frame.pack(side=tk.TOP, fill=tk.X, expand=False)
+        self.regex_var = tk.BooleanVar(value=False)
+        self.case_sensitive_var = tk.BooleanVar(value=False)
+        self.whole_word_var = tk.BooleanVar(value=False)
+        # Boolean/proximity query, e.g. "invoice AND paid NOT draft", per page or per document
+        self.query_var = tk.BooleanVar(value=False)
+        self.query_document_scope_var = tk.BooleanVar(value=False)
+        for text, variable in (("Regex", self.regex_var),
+                               ("Match case", self.case_sensitive_var),
+                               ("Whole word", self.whole_word_var),
+                               ("Query", self.query_var),
+                               ("Whole document", self.query_document_scope_var)):
+            tk.Checkbutton(self.search_mode_frame, text=text, variable=variable,
+                           background="lightblue").pack(side=tk.LEFT)
+
+        self.search_button_frame = tk.Frame(self.search_pane)
+        self.search_button_frame.pack(side=tk.TOP, fill=tk.X, expand=False)
+        search_button = tk.Button(self.search_button_frame, text="Search", command=self.search_pdfs)
+        search_button.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.cancel_button = tk.Button(self.search_button_frame, text="Cancel", command=self.cancel_search,
+                                       state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT, fill=tk.X, expand=False)
+
+        # Search progress
+        self.search_progress = ttk.Progressbar(self.search_pane, mode="determinate")
+        self.search_progress.pack(side=tk.TOP, fill=tk.X, expand=False)
+        self.search_status_label = tk.Label(self.search_pane, text="", anchor="w")
+        self.search_status_label.pack(side=tk.TOP, fill=tk.X, expand=False)
 
         # Search results
-        self.search_result_tree = ttk.Treeview(self.search_pane, columns=("context", "page_number", "match_id"))
+        self.search_result_tree = ttk.Treeview(self.search_pane, columns=("context", "page_number", "match_id", "pattern"))
         self.search_result_tree.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
         self.search_result_tree.heading("#0", text="File")
         self.search_result_tree.heading("context", text="Context")
         self.search_result_tree.heading("page_number", text="Page")
         self.search_result_tree.heading("match_id", text="ID")
+        self.search_result_tree.heading("pattern", text="Term")
         self.search_result_tree.bind("<<TreeviewSelect>>", self.on_treeview_select)
+        # Match rows are only inserted once their file node is expanded
+        self.search_result_tree.bind("<<TreeviewOpen>>", self._on_result_tree_open)
         # Set the result tree's columns' widths
         column_weights = [20, 20]
         column_weights_sum = sum(column_weights)
@@ -156,14 +265,23 @@ class PDFMultifileSearch:
                                        width=int(initial_sash_position * (column_weights[1] / column_weights_sum)))
         self.search_result_tree.column("page_number", width=40, stretch=False)
         self.search_result_tree.column("match_id", width=40, stretch=False)
-        # Store full paths mapping for search results (display_text -> full_path)
+        self.search_result_tree.column("pattern", width=80, stretch=False)
+        # Store full paths mapping for search results (file item id -> full_path)
         self.search_result_paths = {}
+        # Number of match rows inserted so far per file item
+        self._result_rows_loaded = {}
+        # Files with identical content are grouped under the first one found:
+        # full path -> file item, file item -> copy paths, copy row -> copy path
+        self._result_items_by_path = {}
+        self._result_copies = {}
+        self._copy_row_paths = {}
+        # Shortened display paths per path length limit: {max_chars: {full_path: text}}
+        self._display_path_cache = {}
         # Track last column width to detect changes
         self._last_file_column_width = self.search_result_tree.column("#0", "width")
-        # Bind column resize event
+        # Column resizes (header drags) and tree size changes update the shortened paths
         self.search_result_tree.bind("<ButtonRelease-1>", self._on_column_resize)
-        # Schedule periodic check for column width changes
-        self._schedule_column_width_check()
+        self.search_result_tree.bind("<Configure>", self._on_column_resize)
         # Fill content to the viewer pane
         self.canvas = tk.Canvas(self.viewer_pane, bg="grey")
         self.canvas.pack(fill=tk.BOTH, expand=True)
@@ -178,6 +296,19 @@ class PDFMultifileSearch:
 
         self.paned_window.sash_place(index=0, x=initial_sash_position, y=0)
         self.load_configuration()
+        # Folders given with -f are added to the saved ones
+        saved_directories = self._search_directories()
+        for directory in directories or ():
+            directory = os.path.abspath(directory)
+            if directory in saved_directories or not os.path.isdir(directory):
+                continue
+            top_node = self.folder_tree.insert("", "end", text=directory, open=False, image=self._folder_icon, values=(directory,))
+            try:
+                self._populate_folder_tree(top_node, directory)
+            except Exception:
+                pass
+        if directories:
+            self._on_search_folders_changed()
 
     def save_configuration(self):
         """Save the current configuration to a file."""
@@ -193,7 +324,35 @@ class PDFMultifileSearch:
         config['Folders'] = {'folders': ','.join(folders)}
 
         # Save the search pattern
-        config['Search'] = {'pattern': self.pattern_entry.get()}
+        config['Search'] = {
+            'pattern': self.pattern_entry.get(),
+            'engine': self.search_options.engine,
+            'workers': str(self.search_options.max_workers or 0),
+            'max_results': str(self.search_options.max_results or 0),
+            'max_matches_per_file': str(self.search_options.max_matches_per_file or 0),
+            'files_only': str(self.search_options.files_only),
+            'regex': str(self.regex_var.get()),
+            'case_sensitive': str(self.case_sensitive_var.get()),
+            'whole_word': str(self.whole_word_var.get()),
+            'query': str(self.query_var.get()),
+            'query_scope': 'document' if self.query_document_scope_var.get() else 'page',
+            'include': ','.join(self.search_options.include),
+            'exclude': ','.join(self.search_options.exclude),
+            'max_depth': '' if self.search_options.max_depth is None else str(self.search_options.max_depth),
+            'max_file_size_mb': str((self.search_options.max_file_size or 0) // (1024 * 1024)),
+            'shard_pages': str(self.search_options.shard_pages or 0),
+            'max_in_flight': str(self.search_options.max_in_flight or 0),
+            'dedupe': str(self.search_options.dedupe),
+            'schedule': self.search_options.schedule
+            }
+
+        # Save the index location
+        config['Index'] = {
+            'path': self.index_path,
+            'watch_interval': str(self.index_watch_interval),
+            'use_hash': str(self.index_use_hash),
+            'corpus': self.corpus_path
+            }
 
         # Save the window dimensions and position
         config['Window'] = {
@@ -214,6 +373,19 @@ class PDFMultifileSearch:
         if sash_position:
             config['Sash'] = {'position': str(sash_position[0])}
 
+        # Save the viewer's render cache size
+        config['Viewer'] = {'render_cache_mb': str(self.render_cache.max_bytes // (1024 * 1024))}
+
+        # Save the query cache settings
+        config['Cache'] = {
+            'path': self.query_cache_path,
+            'size_mb': str(self.query_cache.max_bytes // (1024 * 1024)),
+            'persist': str(self.query_cache_persist)
+            }
+
+        # Save the search server
+        config['Server'] = {'url': self.server_url, 'token': self.server_token}
+
         # Write the configuration to the file
         with open(CONFIG_FILE, 'w') as configfile:
             config.write(configfile)
@@ -241,6 +413,53 @@ class PDFMultifileSearch:
         if 'Search' in config and 'pattern' in config['Search']:
             self.pattern_entry.delete(0, tk.END)
             self.pattern_entry.insert(0, config['Search']['pattern'])
+        if 'Search' in config:
+            # A limit or worker count of 0 means "no limit" / "adaptive"
+            section = config['Search']
+            options = self.search_options
+            options.engine = section.get('engine', options.engine)
+            options.max_workers = section.getint('workers', options.max_workers or 0) or None
+            options.max_results = section.getint('max_results', options.max_results or 0) or None
+            options.max_matches_per_file = section.getint('max_matches_per_file',
+                                                          options.max_matches_per_file or 0) or None
+            options.files_only = section.getboolean('files_only', options.files_only)
+            self.regex_var.set(section.getboolean('regex', False))
+            self.case_sensitive_var.set(section.getboolean('case_sensitive', False))
+            self.whole_word_var.set(section.getboolean('whole_word', False))
+            self.query_var.set(section.getboolean('query', False))
+            self.query_document_scope_var.set(section.get('query_scope', 'page') == 'document')
+            # File filters: comma separated globs, an empty max_depth means unlimited
+            if 'include' in section:
+                options.include = tuple(glob.strip() for glob in section['include'].split(',') if glob.strip())
+            if 'exclude' in section:
+                options.exclude = tuple(glob.strip() for glob in section['exclude'].split(',') if glob.strip())
+            if section.get('max_depth'):
+                options.max_depth = section.getint('max_depth')
+            max_file_size_mb = section.getint('max_file_size_mb', 0)
+            options.max_file_size = max_file_size_mb * 1024 * 1024 or None
+            options.shard_pages = section.getint('shard_pages', options.shard_pages or 0) or None
+            options.max_in_flight = section.getint('max_in_flight', options.max_in_flight or 0) or None
+            options.dedupe = section.getboolean('dedupe', options.dedupe)
+            if section.get('schedule') in SCHEDULES:
+                options.schedule = section['schedule']
+
+        # Load the index location and open the index if it has been built
+        if 'Index' in config:
+            self.index_path = config['Index'].get('path') or self.index_path
+            self.index_watch_interval = config['Index'].getfloat('watch_interval', self.index_watch_interval)
+            self.index_use_hash = config['Index'].getboolean('use_hash', self.index_use_hash)
+            self.corpus_path = config['Index'].get('corpus', self.corpus_path)
+        if os.path.exists(self.index_path):
+            try:
+                self.search_index = PDFIndex(self.index_path)
+            except Exception as e:
+                print(f"Failed to open search index '{self.index_path}': {e}")
+        if self.corpus_path and os.path.exists(self.corpus_path):
+            try:
+                self.text_corpus = TextCorpus(self.corpus_path)
+            except Exception as e:
+                print(f"Failed to open text corpus '{self.corpus_path}': {e}")
+        self._on_search_folders_changed()
 
         # Load the window dimensions and position
         if 'Window' in config:
@@ -262,19 +481,36 @@ class PDFMultifileSearch:
             initial_sash_position = int(config['Sash']['position'])
             self.paned_window.sash_place(index=0, x=initial_sash_position, y=0)
 
-    def _schedule_column_width_check(self):
-        """Schedule periodic check for column width changes."""
-        self._check_column_width_change()
-        # Schedule next check in 100ms
-        self.tk_root.after(100, self._schedule_column_width_check)
+        # Load the viewer's render cache size
+        if 'Viewer' in config and 'render_cache_mb' in config['Viewer']:
+            self.render_cache.max_bytes = config['Viewer'].getint('render_cache_mb') * 1024 * 1024
+
+        # Load the query cache settings and the results saved by the last session
+        cache_size = self.query_cache.max_bytes
+        if 'Cache' in config:
+            self.query_cache_path = config['Cache'].get('path') or self.query_cache_path
+            cache_size = config['Cache'].getint('size_mb', cache_size // (1024 * 1024)) * 1024 * 1024
+            self.query_cache_persist = config['Cache'].getboolean('persist', self.query_cache_persist)
+        if self.query_cache_persist:
+            self.query_cache = QueryCache.load(self.query_cache_path, cache_size)
+        else:
+            self.query_cache.max_bytes = cache_size
+
+        # Load the search server
+        if 'Server' in config:
+            self.server_url = config['Server'].get('url', '')
+            self.server_token = config['Server'].get('token', '')
 
     def _check_column_width_change(self):
         """Check if the file column width has changed and update display if needed."""
         try:
             current_width = self.search_result_tree.column("#0", "width")
             if current_width != self._last_file_column_width:
+                previous_max_chars = self._max_path_chars(self._last_file_column_width)
                 self._last_file_column_width = current_width
-                self._update_file_path_displays()
+                # Widths that fit the same number of characters show the same text
+                if self._max_path_chars(current_width) != previous_max_chars:
+                    self._update_file_path_displays()
         except Exception:
             # Ignore errors (e.g., if widget is destroyed)
             pass
@@ -291,6 +527,7 @@ class PDFMultifileSearch:
             # Only remove top-level nodes (parent is root)
             if not parent:
                 self.folder_tree.delete(node)
+        self._on_search_folders_changed()
     
     def _on_folder_tree_drop(self, event):
         # Called when a file or folder is dropped onto the folder_tree Treeview.
@@ -325,6 +562,7 @@ class PDFMultifileSearch:
                 
                 # Insert the PDF file under its parent directory node
                 self.folder_tree.insert(existing_parent_node, "end", text=os.path.basename(path), values=(path,), image=self._pdf_icon)
+        self._on_search_folders_changed()
         return 'break'
 
     def _update_file_path_displays(self):
@@ -335,13 +573,35 @@ class PDFMultifileSearch:
         file_column_width = self.search_result_tree.column("#0", "width")
         
         # Iterate through all top-level items (file paths)
-        for item in self.search_result_tree.get_children():
-            item_values = self.search_result_tree.item(item, "values")
-            if item_values and len(item_values) > 0:
-                full_path = item_values[0]
-                # Update the displayed text with newly shortened path
-                display_path = self.shorten_path_for_width(full_path, file_column_width)
-                self.search_result_tree.item(item, text=display_path)
+        for item, full_path in self.search_result_paths.items():
+            # Update the displayed text with newly shortened path
+            self.search_result_tree.item(item, text=self._result_node_text(item, file_column_width))
+
+    def _result_node_text(self, main_item, column_width):
+        """Shortened path of a file node, with the number of identical copies grouped under it."""
+        text = self._display_path(self.search_result_paths[main_item], column_width)
+        copy_count = len(self._result_copies.get(main_item, ()))
+        if copy_count:
+            text += f" (+{copy_count} {'copy' if copy_count == 1 else 'copies'})"
+        return text
+
+    @staticmethod
+    def _max_path_chars(column_width):
+        # Estimate character width (rough approximation: column_width / 7 pixels per char)
+        return max(10, column_width // 7)
+
+    def _display_path(self, file_path, column_width):
+        """Cached `shorten_path_for_width`."""
+        max_chars = self._max_path_chars(column_width)
+        cache = self._display_path_cache.get(max_chars)
+        if cache is None:
+            if len(self._display_path_cache) >= 8:
+                self._display_path_cache.clear()
+            cache = self._display_path_cache[max_chars] = {}
+        display_path = cache.get(file_path)
+        if display_path is None:
+            display_path = cache[file_path] = self.shorten_path_for_width(file_path, column_width)
+        return display_path
 
     def shorten_path_for_width(self, file_path, column_width):
         """Shorten a file path to fit within the given column width.
@@ -349,9 +609,8 @@ class PDFMultifileSearch:
         The path is shortened in the middle with '...' to show both the 
         beginning and end of the path.
         """
-        # Estimate character width (rough approximation: column_width / 7 pixels per char)
         # This is a rough estimate and may need adjustment based on font
-        max_chars = max(10, column_width // 7)
+        max_chars = self._max_path_chars(column_width)
         
         if len(file_path) <= max_chars:
             return file_path
@@ -367,10 +626,19 @@ class PDFMultifileSearch:
     def on_treeview_select(self, event):
         selected_item = self.search_result_tree.selection()
         if selected_item:
+            tags = self.search_result_tree.item(selected_item, "tags")
+            if "more" in tags:
+                self._load_result_rows(self.search_result_tree.parent(selected_item))
+                return
+            if "placeholder" in tags:
+                return
             page_number = None
             match_id = None
             parent_item = self.search_result_tree.parent(selected_item)
-            if parent_item:
+            if "copy" in tags:
+                # A file with the same content as its parent node; open it at the first page
+                file_path = self._copy_row_paths[selected_item[0]]
+            elif parent_item:
                 # Get the full file path from the parent item's values
                 parent_item_values = self.search_result_tree.item(parent_item, "values")
                 if parent_item_values and len(parent_item_values) > 0:
@@ -398,31 +666,60 @@ class PDFMultifileSearch:
             else:
                 self.current_page = 0
             page = self.loaded_pdf_document.load_page(self.current_page)
-            self.show_page(page)
             self.tk_root.title(f"PDF Viewer - Page {self.current_page + 1}/{self.loaded_pdf_document.page_count}")
-
-            highlight_rectangles = []
-            # Prepare overlay rectangles to draw on the Tk canvas so they match
-            # the rendered pixmap scaling exactly. Each entry is a tuple
-            # (x0, y0, x1, y1, color, width).
-            self._overlay_rects = []
-            for match in self.search_results[file_path]:
-                if match.page_number == self.current_page:
-                    highlight_rectangles.append(match.location)
-                    # add a highlight annotation to the PDF document (keeps data persistent)
-                    annotation = page.add_highlight_annot(match.location)
-                    if match.match_id == match_id:
-                        annotation.set_colors(stroke=fitz.pdfcolor["green"])
-                        color = "green"
-                        line_width = 2
-                    else:
-                        annotation.set_colors(stroke=fitz.pdfcolor["yellow"])
-                        color = "yellow"
-                        line_width = 1
-                    annotation.update()
-                    rect = match.context_location
-                    self._overlay_rects.append((rect.x0, rect.y0, rect.x1, rect.y1, color, line_width))
+            self._set_page_overlays(match_id)
             self.show_page(page)
+            self._prefetch_neighbours(parent_item or selected_item)
+
+    def _set_page_overlays(self, selected_match_id=None):
+        """Highlight the matches on the current page, the selected one with its context."""
+        # Overlay rectangles are drawn on the Tk canvas so they match the
+        # rendered pixmap scaling exactly. The PDF itself is never modified,
+        # so the cached rendering of the page stays valid.
+        self._overlay_rects = []
+        matches = self.search_results.get(self.loaded_pdf_path)
+        if not matches:
+            return
+        for match in matches.on_page(self.current_page):
+            if match.match_id == selected_match_id:
+                color = "green"
+                line_width = 2
+                rect = match.context_location
+                self._overlay_rects.append((rect.x0, rect.y0, rect.x1, rect.y1, color, 1, "context"))
+            else:
+                color = "yellow"
+                line_width = 1
+            rect = match.location
+            self._overlay_rects.append((rect.x0, rect.y0, rect.x1, rect.y1, color, line_width, "match"))
+
+    def _prefetch_neighbours(self, file_item=None):
+        """Render the pages of the neighbouring matches and the adjacent pages in the background.
+
+        `file_item` is the result tree node of the shown file; the first
+        match of the next file in the tree is prefetched as well.
+        """
+        file_path, current_page = self.loaded_pdf_path, self.current_page
+        if file_path is None:
+            return
+        next_matches, previous_matches = [], []
+        matches = self.search_results.get(file_path)
+        if matches:
+            match_pages = sorted(set(matches.page_numbers()))
+            position = bisect.bisect_right(match_pages, current_page)
+            next_matches = match_pages[position:position + 2]
+            previous_matches = [page for page in match_pages[max(0, position - 2):position] if page != current_page]
+        wanted = [(file_path, page) for page in next_matches[:1]]
+        wanted += [(file_path, current_page + 1), (file_path, current_page - 1)]
+        wanted += [(file_path, page) for page in next_matches[1:] + previous_matches[::-1]]
+        if file_item:
+            next_file = self.search_result_tree.next(file_item)
+            values = self.search_result_tree.item(next_file, "values") if next_file else ()
+            next_file_matches = self.search_results.get(values[0]) if values else None
+            if next_file_matches:
+                wanted.append((values[0], min(next_file_matches.page_numbers())))
+        wanted = [(path, page) for path, page in dict.fromkeys(wanted)
+                  if page >= 0 and (path, page) != (file_path, current_page)]
+        self.render_worker.prefetch(wanted, self.viewer_pane.winfo_width(), self.viewer_pane.winfo_height())
 
     def set_sash_position_percentage(self, ratio):
         @dataclass
@@ -442,8 +739,7 @@ class PDFMultifileSearch:
             delta = event.x - current_sash_position[0]
             new_sash_position = current_sash_position[0] + delta
             self.paned_window.sash_place(0, new_sash_position, 0)
-        if hasattr(self, 'loaded_pdf_document'):
-            self.show_page(self.loaded_pdf_document.load_page(self.current_page))
+        self._schedule_render()
         # Check if column width changed after sash drag
         self.tk_root.after(100, self._check_column_width_change)
 
@@ -457,6 +753,7 @@ class PDFMultifileSearch:
             except Exception:
                 pass
             # keep a fixed visible height; scrollbar will be used if needed
+        self._on_search_folders_changed()
         self.show_working_directory()
 
     def clear_search_folders(self):
@@ -464,6 +761,7 @@ class PDFMultifileSearch:
         # Clear existing items
         for item in self.folder_tree.get_children():
             self.folder_tree.delete(item)
+        self._on_search_folders_changed()
         self.show_working_directory()
 
     def show_working_directory(self):
@@ -535,53 +833,303 @@ class PDFMultifileSearch:
             self.show_page(self.loaded_pdf_document.load_page(self.current_page))
 
     def on_resize(self, event):
+        self._schedule_render()
+
+    def _schedule_render(self):
+        """Re-render the current page once resize/sash events stop arriving."""
+        if self._render_after_id is not None:
+            self.tk_root.after_cancel(self._render_after_id)
+        self._render_after_id = self.tk_root.after(RENDER_DEBOUNCE_MS, self._render_current_page)
+
+    def _render_current_page(self):
+        self._render_after_id = None
         if hasattr(self, 'loaded_pdf_document'):
             self.show_page(self.loaded_pdf_document.load_page(self.current_page))
 
-    def search_pdfs(self):
-        # Delegate the heavy-lifting search to the standalone function so the
-        # GUI class remains focused on presentation. Keep the same public
-        # behaviour: populate `self.search_results` and the result tree.
-        self.search_result_tree.delete(*self.search_result_tree.get_children())
-        self.search_results.clear()
-        self.search_result_paths.clear()
-
-        search_pattern = self.pattern_entry.get()
+    def _search_directories(self):
+        """Return the top-level folders of the folder tree."""
         directories = []
         for item in self.folder_tree.get_children():
             values = self.folder_tree.item(item, 'values')
             if values and len(values) > 0:
                 directories.append(values[0])
+        return directories
+
+    def _selected_search_paths(self):
+        """Return the folders and files selected in the folder tree; they are searched first."""
+        paths = []
+        for item in self.folder_tree.selection():
+            values = self.folder_tree.item(item, 'values')
+            if values and len(values) > 0:
+                paths.append(values[0])
+        return tuple(paths)
+
+    def update_search_index(self):
+        """Index new and changed PDFs in the search folders."""
+        directories = self._search_directories()
         if not directories:
             return
-        found = {}
-        for directory in directories:
-            try:
-                partial_found = search_pdfs(directory, search_pattern)
-                found.update(partial_found)
-            except Exception as e:
-                print(f"Error during search in {directory}: {e}")
+        try:
+            if self.search_index is None:
+                self.search_index = PDFIndex(self.index_path)
+            summary = self.search_index.update(directories, use_hash=self.index_use_hash)
+            self._report_index_update(summary)
+            if self.corpus_path and (summary.modified or self.text_corpus is None):
+                previous, self.text_corpus = self.text_corpus, TextCorpus.build(self.search_index, self.corpus_path)
+                if previous is not None:
+                    # A search still scanning the old corpus keeps its mapping until it finishes
+                    previous.retire()
+        except Exception as e:
+            print(f"Error while updating search index: {e}")
+        self._on_search_folders_changed()
 
-        # Copy results into the instance's search_results and populate tree
-        self.search_results = found
+    def _report_index_update(self, summary):
+        print(f"Search index: {len(summary.added)} added, {len(summary.changed)} changed, "
+              f"{len(summary.removed)} removed, {len(summary.failed)} failed")
 
-        # Get the current column width for the File column
+    def _on_search_folders_changed(self):
+        """Point the background index watcher at the current search folders.
+
+        The watcher only runs once an index exists; the folder list is copied
+        here on the Tk thread so the watcher never touches the widgets.
+        """
+        if self.search_index is None or self.index_watch_interval <= 0:
+            return
+        directories = self._search_directories()
+        if self.index_watcher is None:
+            self.index_watcher = IndexWatcher(self.search_index, directories,
+                                              interval=self.index_watch_interval,
+                                              use_hash=self.index_use_hash,
+                                              on_update=self._report_index_update)
+            self.index_watcher.start()
+        else:
+            self.index_watcher.set_directories(directories)
+
+    def search_pdfs(self):
+        # Delegate the heavy-lifting search to the standalone function so the
+        # GUI class remains focused on presentation. The search runs in a
+        # worker thread that streams each file's matches through a queue; the
+        # queue is drained on the Tk thread, so results appear as files finish
+        # and the window stays responsive.
+        self.search_result_tree.delete(*self.search_result_tree.get_children())
+        self.search_results = {}
+        self.search_result_paths.clear()
+        self._result_rows_loaded.clear()
+        self._result_items_by_path.clear()
+        self._result_copies.clear()
+        self._copy_row_paths.clear()
+        self._search_generation += 1
+        # Stop a search that is still running
+        self._search_cancel.set()
+        self._search_cancel = threading.Event()
+
+        search_pattern = [pattern.strip() for pattern in self.pattern_entry.get().split(PATTERN_SEPARATOR)]
+        directories = self._search_directories()
+        if not directories:
+            return
+        options = self.search_options
+        options.regex = self.regex_var.get()
+        options.case_sensitive = self.case_sensitive_var.get()
+        options.whole_word = self.whole_word_var.get()
+        options.query = self.query_var.get()
+        options.query_scope = 'document' if self.query_document_scope_var.get() else 'page'
+        options.priority_paths = self._selected_search_paths()
+        if options.query:
+            # The whole entry is one query; ';' has no special meaning there
+            search_pattern = [self.pattern_entry.get().strip()]
+            try:
+                parse_query(search_pattern[0])
+            except QuerySyntaxError as e:
+                self.search_status_label.configure(text=f"Invalid query: {e}")
+                return
+        elif options.regex:
+            try:
+                compile_search_regex([p for p in search_pattern if p], regex=True)
+            except re.error as e:
+                self.search_status_label.configure(text=f"Invalid regular expression: {e}")
+                return
+        search_queue = queue.Queue()
+        self.search_stats = SearchStats()
+        self.search_progress.configure(value=0, maximum=1)
+        self.search_status_label.configure(text="Searching...")
+        self.cancel_button.configure(state=tk.NORMAL)
+        # Held until the search ends, even if the index update replaces it meanwhile
+        corpus = self.text_corpus.acquire() if self.text_corpus is not None else None
+        worker = threading.Thread(target=self._run_search,
+                                  args=(search_queue, directories, search_pattern,
+                                        replace(self.search_options), self._search_cancel,
+                                        self.search_stats, corpus),
+                                  name="PDFSearch", daemon=True)
+        worker.start()
+        self.tk_root.after(50, self._drain_search_queue, self._search_generation, search_queue)
+
+    def clear_query_cache(self):
+        """Forget cached search results, e.g. to time a full search."""
+        self.query_cache.clear()
+        self.status_bar.configure(text="Search cache cleared")
+
+    def cancel_search(self):
+        """Stop the running search; results found so far stay in the tree."""
+        self._search_cancel.set()
+
+    def _run_search(self, search_queue, directories, search_pattern, options, cancel, stats, corpus):
+        """Worker thread body: search all folders and queue the results.
+
+        Must not touch any Tk widget; everything goes through `search_queue`
+        as ("progress", ...), ("matches", ...) or ("done", reason) messages.
+        """
+        def progress(done, total):
+            search_queue.put(("progress", (done, total)))
+
+        # All folders are discovered together and share one worker pool, so
+        # overlapping folders are searched once and match IDs are unique.
+        # Copy of a file with the same content -> that file
+        duplicate_of = {}
+
+        def on_file(file_stats):
+            if file_stats.duplicate_of:
+                duplicate_of[file_stats.path] = file_stats.duplicate_of
+
+        match_count = 0
+        reason = "done"
+        if self.server_url:
+            # A search server keeps documents, index and cache warm between searches
+            results = SearchClient(self.server_url, self.server_token or None).search(
+                directories, search_pattern, options, progress=progress, cancel=cancel, stats=stats,
+                on_file=on_file)
+        else:
+            results = iter_search_pdfs(directories, search_pattern, index=self.search_index, options=options,
+                                       progress=progress, cancel=cancel, stats=stats, on_file=on_file,
+                                       cache=self.query_cache, corpus=corpus)
+        try:
+            for file_path, matches in results:
+                match_count += len(matches)
+                if matches:
+                    search_queue.put(("matches", (file_path, matches, duplicate_of.get(file_path, ""))))
+        except Exception as e:
+            print(f"Error during search: {e}")
+        finally:
+            if corpus is not None:
+                corpus.release()
+        if cancel.is_set():
+            reason = "cancelled"
+        elif options.max_results is not None and match_count >= options.max_results:
+            reason = "limit"
+        search_queue.put(("done", reason))
+
+    def _drain_search_queue(self, generation, search_queue, max_items=200):
+        """Move queued search results into the result tree (runs on the Tk thread)."""
+        if generation != self._search_generation:
+            # A newer search has started; abandon this one's results
+            return
+        finished = None
+        for _ in range(max_items):
+            try:
+                kind, payload = search_queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "done":
+                finished = payload
+                break
+            try:
+                if kind == "matches":
+                    wall_start, cpu_start = time.perf_counter(), time.thread_time()
+                    self._insert_search_result(*payload)
+                    self.search_stats.add_phase("gui", time.perf_counter() - wall_start,
+                                                time.thread_time() - cpu_start)
+                elif kind == "progress":
+                    done, total = payload
+                    self.search_progress.configure(value=done, maximum=max(total, 1))
+                    self.search_status_label.configure(
+                        text=f"{done}/{total} files, {len(self.search_results)} with matches")
+                    self.status_bar.configure(text=self.search_stats.summary())
+            except Exception as e:
+                # Keep draining; one bad message must not stop the results display
+                print(f"Error while showing search results: {e}")
+        if finished:
+            match_count = sum(len(matches) for matches in self.search_results.values())
+            status = {"done": "Done", "cancelled": "Cancelled", "limit": "Result limit reached"}[finished]
+            self.search_status_label.configure(
+                text=f"{status}: {match_count} matches in {len(self.search_results)} files")
+            self.cancel_button.configure(state=tk.DISABLED)
+            self._report_search_stats(self.search_stats)
+        else:
+            self.tk_root.after(50, self._drain_search_queue, generation, search_queue)
+
+    def _report_search_stats(self, stats):
+        """Show the search statistics in the status bar and print problem files."""
+        text = stats.summary()
+        if stats.slowest:
+            slowest = stats.slowest[0]
+            text += f"; slowest: {os.path.basename(slowest.path)} ({slowest.wall_time:.2f}s)"
+        self.status_bar.configure(text=text)
+        for folder, reason in stats.unreadable_folders:
+            print(f"Could not list {folder}: {reason}")
+        for file_path, reason in stats.failures:
+            print(f"Could not search {file_path}: {reason}")
+
+    def _insert_search_result(self, file_path, matches, duplicate_of=""):
+        self.search_results[file_path] = matches
+        # Shorten the path for display based on column width
         file_column_width = self.search_result_tree.column("#0", "width")
-        
-        for file_path, matches in self.search_results.items():
-            # Shorten the path for display based on column width
-            display_path = self.shorten_path_for_width(file_path, file_column_width)
-            # Store full path in values tuple, display shortened path as text
-            main_item = self.search_result_tree.insert("", "end", text=display_path, values=(file_path,))
-            for match in matches:
-                self.search_result_tree.insert(main_item, "end", text="", values=(match.context
-                                                                                  , match.page_number
-                                                                                  , match.match_id
-                                                                                  ))
+        original_item = self._result_items_by_path.get(duplicate_of)
+        if original_item is not None:
+            # Same content as a file already listed: add a row for the copy under it
+            self._result_copies.setdefault(original_item, []).append(file_path)
+            copy_row = self.search_result_tree.insert(original_item, len(self._result_copies[original_item]) - 1,
+                                                      text="", values=(f"Same content: {file_path}",),
+                                                      tags=("copy",))
+            self._copy_row_paths[copy_row] = file_path
+            self.search_result_tree.item(original_item,
+                                         text=self._result_node_text(original_item, file_column_width))
+            return
+        display_path = self._display_path(file_path, file_column_width)
+        # Store full path in values tuple, display shortened path as text
+        main_item = self.search_result_tree.insert("", "end", text=display_path, values=(file_path,))
+        self.search_result_paths[main_item] = file_path
+        self._result_items_by_path[file_path] = main_item
+        # A placeholder child makes the node expandable; the match rows are
+        # inserted by _load_result_rows when the node is opened
+        self._result_rows_loaded[main_item] = 0
+        self.search_result_tree.insert(main_item, "end", text="", values=(f"{len(matches)} matches",),
+                                       tags=("placeholder",))
+
+    def _on_result_tree_open(self, event):
+        main_item = self.search_result_tree.focus()
+        if self._result_rows_loaded.get(main_item) == 0:
+            self._load_result_rows(main_item)
+
+    def _load_result_rows(self, main_item):
+        """Insert the next RESULT_PAGE_SIZE match rows under a file node."""
+        matches = self.search_results[self.search_result_paths[main_item]]
+        start = self._result_rows_loaded[main_item]
+        for child in self.search_result_tree.get_children(main_item):
+            tags = self.search_result_tree.item(child, "tags")
+            if "placeholder" in tags or "more" in tags:
+                self.search_result_tree.delete(child)
+        window = matches[start:start + RESULT_PAGE_SIZE]
+        for match in window:
+            self.search_result_tree.insert(main_item, "end", text="", values=(match.context
+                                                                              , match.page_number
+                                                                              , match.match_id
+                                                                              , match.pattern
+                                                                              ))
+        loaded = start + len(window)
+        self._result_rows_loaded[main_item] = loaded
+        if loaded < len(matches):
+            self.search_result_tree.insert(main_item, "end", text="",
+                                           values=(f"Show {len(matches) - loaded} more matches...",),
+                                           tags=("more",))
 
     def load_pdf(self, file_path):
-        self.loaded_pdf_document = fitz.open(file_path)
+        document = self.document_pool.get(file_path)
+        if getattr(self, 'loaded_pdf_document', None) is not document and file_path == self.loaded_pdf_path:
+            # The pool reopened the file because it changed on disk
+            self.render_cache.discard_file(file_path)
+        self.loaded_pdf_document = document
+        self.loaded_pdf_path = file_path
         self.current_page = 0
+        self._overlay_rects = []
 
     def show_page(self, page):
         canvas_width, canvas_height = self.viewer_pane.winfo_width(), self.viewer_pane.winfo_height()
@@ -589,24 +1137,43 @@ class PDFMultifileSearch:
         if hasattr(self, 'loaded_pdf_document'):
             pdf_width, pdf_height = page.rect.width, page.rect.height
 
-            # Calculate the scaling factors for width and height
-            scale_x = canvas_width / pdf_width
-            scale_y = canvas_height / pdf_height
-
             # Choose the smaller scaling factor to maintain the aspect ratio
-            scale_factor = min(scale_x, scale_y)
-
-            # Calculate the new dimensions of the PDF after scaling
-            new_width = pdf_width * scale_factor
-            new_height = pdf_height * scale_factor
-
-            pixel_map = page.get_pixmap(matrix=fitz.Matrix(scale_factor, scale_factor))
+            scale_factor = fit_scale(page.rect, canvas_width, canvas_height)
+
+            if scale_factor <= 0:
+                # The viewer pane has not been laid out yet
+                return
+
+            # Reuse an earlier rendering at the same size if there is one
+            cache_key = render_key(self.loaded_pdf_path, page.number, scale_factor)
+            pixel_map = self.render_cache.get(cache_key)
+            zoom = 1
+            self._awaited_render = None
+            if pixel_map is None:
+                # Show a quick low-resolution preview until the render worker
+                # has the full page; previews are cached like full pages
+                preview_key = render_key(self.loaded_pdf_path, page.number, scale_factor / PREVIEW_ZOOM)
+                pixel_map = self.render_cache.get(preview_key)
+                if pixel_map is None:
+                    pixel_map = render_page(page, scale_factor / PREVIEW_ZOOM)
+                    self.render_cache.put(preview_key, pixel_map)
+                zoom = PREVIEW_ZOOM
+                self._awaited_render = cache_key
+                self.render_worker.request(self.loaded_pdf_path, page.number, canvas_width, canvas_height)
+                if self._render_poll_id is None:
+                    self._render_poll_id = self.tk_root.after(RENDER_POLL_MS, self._drain_render_queue)
             # Use the pixmap's actual pixel size to create the Tk image so we don't
-            # stretch the image. This keeps overlay coordinates aligned.
-            pixel_image = tk.PhotoImage(data=pixel_map.tobytes(), width=pixel_map.width, height=pixel_map.height)
-
-            self.canvas.config(scrollregion=(0, 0, pixel_map.width, pixel_map.height))
-            self.canvas.create_image(0, 0, anchor=tk.NW, image=pixel_image)
+            # stretch the image. This keeps overlay coordinates aligned. PPM data
+            # is loaded by Tk without any decompression.
+            pixel_image = tk.PhotoImage(data=pixel_map.data, format="ppm")
+            if zoom > 1:
+                pixel_image = pixel_image.zoom(zoom)
+            image_width, image_height = pixel_map.width * zoom, pixel_map.height * zoom
+
+            self.canvas.config(scrollregion=(0, 0, image_width, image_height))
+            if hasattr(self.canvas, 'image_id'):
+                self.canvas.delete(self.canvas.image_id)
+            self.canvas.image_id = self.canvas.create_image(0, 0, anchor=tk.NW, image=pixel_image)
 
             # Cleanup previous image reference
             self.canvas.img = pixel_image
@@ -620,16 +1187,23 @@ class PDFMultifileSearch:
             self.canvas.overlay_ids = []
 
             # Draw overlay rectangles stored in self._overlay_rects (PDF coords)
-            if hasattr(self, '_overlay_rects') and self._overlay_rects:
+            if self._overlay_rects:
                 # compute actual scale in case integer rounding occurred
-                actual_scale_x = pixel_map.width / pdf_width
-                actual_scale_y = pixel_map.height / pdf_height
-                for (x0, y0, x1, y1, color, lw) in self._overlay_rects:
+                actual_scale_x = image_width / pdf_width
+                actual_scale_y = image_height / pdf_height
+                for (x0, y0, x1, y1, color, lw, kind) in self._overlay_rects:
                     # scale PDF coords to canvas pixels
                     cx0 = x0 * actual_scale_x
                     cy0 = y0 * actual_scale_y
                     cx1 = x1 * actual_scale_x
                     cy1 = y1 * actual_scale_y
+                    if kind == "match":
+                        # Match highlights: outline plus a stippled fill so the
+                        # text underneath stays readable
+                        oid = self.canvas.create_rectangle(cx0, cy0, cx1, cy1, outline=color, width=lw,
+                                                           fill=color, stipple="gray25")
+                        self.canvas.overlay_ids.append(oid)
+                        continue
                     # Draw context rectangles with a dashed/dotted outline to
                     # indicate they are context areas. Dash pattern is small to
                     # keep it visually subtle.
@@ -641,29 +1215,70 @@ class PDFMultifileSearch:
                         oid = self.canvas.create_rectangle(cx0, cy0, cx1, cy1, outline=color, width=lw)
                     self.canvas.overlay_ids.append(oid)
 
+    def _drain_render_queue(self):
+        """Swap the full-resolution page in for its preview once rendered (runs on the Tk thread)."""
+        self._render_poll_id = None
+        rendered = set()
+        while True:
+            try:
+                rendered.add(self.render_queue.get_nowait())
+            except queue.Empty:
+                break
+        if self._awaited_render is None:
+            return
+        if self._awaited_render in rendered:
+            self.show_page(self.loaded_pdf_document.load_page(self.current_page))
+        else:
+            self._render_poll_id = self.tk_root.after(RENDER_POLL_MS, self._drain_render_queue)
+
+    def _show_current_page(self):
+        """Show the current page of the loaded file after paging with next/prev."""
+        self._set_page_overlays()
+        self.show_page(self.loaded_pdf_document.load_page(self.current_page))
+        self.tk_root.title(f"PDF Viewer - Page {self.current_page + 1}/{self.loaded_pdf_document.page_count}")
+        self._prefetch_neighbours()
+
     def next_page(self):
-        if self.current_page < self.page_count - 1:
+        if getattr(self, 'loaded_pdf_document', None) is None:
+            return
+        if self.current_page < self.loaded_pdf_document.page_count - 1:
             self.current_page += 1
-            page = self.loaded_pdf_document.load_page(self.current_page)
-            self.show_page(page)
-            self.tk_root.title(f"PDF Viewer - Page {self.current_page + 1}/{self.loaded_pdf_document.page_count}")
+            self._show_current_page()
 
     def prev_page(self):
+        if getattr(self, 'loaded_pdf_document', None) is None:
+            return
         if self.current_page > 0:
             self.current_page -= 1
-            page = self.loaded_pdf_document.load_page(self.current_page)
-            self.show_page(page)
-            self.tk_root.title(f"PDF Viewer - Page {self.current_page + 1}/{self.loaded_pdf_document.page_count}")
+            self._show_current_page()
 
 def exit_app():
     pdf_viewer.save_configuration()
+    if pdf_viewer.index_watcher is not None:
+        pdf_viewer.index_watcher.stop()
+    pdf_viewer.render_worker.stop(timeout=5)
+    pdf_viewer.document_pool.close_all()
+    if pdf_viewer.text_corpus is not None:
+        pdf_viewer.text_corpus.retire()
+    if pdf_viewer.query_cache_persist:
+        try:
+            pdf_viewer.query_cache.save(pdf_viewer.query_cache_path)
+        except Exception as e:
+            print(f"Failed to save the query cache: {e}")
     tk_root.destroy()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='PDF multifile search - search text in multiple PDF files')
     parser.add_argument('-f', '--folder', action='append', help='The folder to process')
-    parser.add_argument('-p', '--pattern', help='The pattern to search for')
-    args = parser.parse_args()
+    parser.add_argument('-p', '--pattern',
+                        help='Search for this pattern in the -f folders without opening a window (see pdf_cli.py)')
+    # The other options of pdf_cli.py are passed on with -p
+    args, cli_options = parser.parse_known_args()
+    if args.pattern is not None:
+        import pdf_cli
+        sys.exit(pdf_cli.main(sys.argv[1:]))
+    if cli_options:
+        parser.error(f"unrecognized arguments: {' '.join(cli_options)}")
 
     tk_root = TkinterDnD.Tk()
     pdf_viewer = PDFMultifileSearch(tk_root, args.folder, args.pattern)
@@ -0,0 +1,241 @@
+"""Multi-pattern matching for the PDF multifile searcher.
+
+`PatternMatcher` is an Aho-Corasick automaton over a list of literal patterns.
+It finds every pattern that occurs in a page's text in a single pass, so a
+search for many terms extracts and scans each page once instead of once per
+term. Matching is case-insensitive and treats all whitespace runs as a single
+space, like `page.search_for`.
+
+`compile_search_regex` turns the same pattern list into one regular expression
+for the regex, case-sensitive and whole-word search modes.
+
+`required_literals` lists the literal strings every match of a pattern must
+contain, so a trigram index can rule out pages before any regex runs.
+"""
+import re
+from collections import deque
+from typing import Dict, Iterator, List, Sequence, Set, Tuple
+try:
+    # Python 3.11 and later
+    from re import _parser as _regex_parser
+except ImportError:
+    import sre_parse as _regex_parser
+
+_REPEATS = ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT")
+# Name of the group wrapping each pattern of a combined expression, plus its index
+_GROUP_PREFIX = "_p"
+_GROUP_NAME = re.compile(rf"{_GROUP_PREFIX}\d+")
+# Group references: \1 to \99 outside character classes (three octal digits are a character)
+_GROUP_REFERENCE = re.compile(r"[1-9][0-9]?")
+_OCTAL_ESCAPE = re.compile(r"[0-7]{3}")
+_CONDITIONAL = re.compile(r"\(\?\((\d+)\)")
+
+
+def normalize_pattern(pattern: str) -> str:
+    """Lower-case a pattern and collapse its whitespace runs to single spaces."""
+    return " ".join(pattern.split()).lower()
+
+
+def compile_search_regex(patterns: Sequence[str], regex: bool = False, case_sensitive: bool = False,
+                         whole_word: bool = False) -> "re.Pattern":
+    """Combine `patterns` into one compiled regular expression.
+
+    Each pattern is wrapped in a group, so `matched_pattern(match)` tells
+    which pattern hit; numbered group references inside the patterns are
+    renumbered to match. Unless `regex` is set the patterns are literals,
+    with any whitespace run matching any whitespace (including line breaks).
+    Raises `re.error` for an invalid regular expression, or for a group name
+    used by more than one pattern.
+    """
+    alternatives = []
+    group_names: Set[str] = set()
+    # Groups of the combined expression before the current pattern's wrapper
+    group_count = 0
+    for pattern_index, pattern in enumerate(patterns):
+        groups = 0
+        if not regex:
+            pattern = r"\s+".join(re.escape(part) for part in pattern.split())
+        else:
+            compiled = re.compile(pattern)
+            for name in compiled.groupindex:
+                if _GROUP_NAME.fullmatch(name):
+                    raise re.error(f"The group name '{name}' is reserved")
+                if name in group_names:
+                    raise re.error(f"The group name '{name}' is used in more than one pattern")
+                group_names.add(name)
+            groups = compiled.groups
+            pattern = _shift_group_references(pattern, group_count + 1)
+        if whole_word:
+            pattern = rf"(?<!\w)(?:{pattern})(?!\w)"
+        alternatives.append(f"(?P<{_GROUP_PREFIX}{pattern_index}>{pattern})")
+        group_count += groups + 1
+    flags = re.MULTILINE
+    if not case_sensitive:
+        flags |= re.IGNORECASE
+    return re.compile("|".join(alternatives), flags)
+
+
+def matched_pattern(found: "re.Match") -> int:
+    """Index of the pattern behind a match of `compile_search_regex`."""
+    return int(found.lastgroup[len(_GROUP_PREFIX):])
+
+
+def _shift_group_references(pattern: str, offset: int) -> str:
+    """Add `offset` to the numbered group references of a regular expression."""
+    parts = []
+    position = 0
+    in_class = False
+    while position < len(pattern):
+        char = pattern[position]
+        if char == "\\":
+            reference = None
+            if not in_class and not _OCTAL_ESCAPE.match(pattern, position + 1):
+                reference = _GROUP_REFERENCE.match(pattern, position + 1)
+            if reference is None:
+                parts.append(pattern[position:position + 2])
+                position += 2
+                continue
+            number = int(reference.group()) + offset
+            if number > 99:
+                raise re.error("Too many groups to refer to by number in a combined search")
+            # Grouped so that a digit after the reference is not read as part of it
+            parts.append(f"(?:\\{number})")
+            position = reference.end()
+            continue
+        if in_class:
+            in_class = char != "]"
+        elif char == "[":
+            # A "]" right after "[" or "[^" is a literal
+            end = position + 1
+            if pattern.startswith("^", end):
+                end += 1
+            if pattern.startswith("]", end):
+                end += 1
+            parts.append(pattern[position:end])
+            position = end
+            in_class = True
+            continue
+        elif char == "(":
+            conditional = _CONDITIONAL.match(pattern, position)
+            if conditional:
+                parts.append(f"(?({int(conditional.group(1)) + offset})")
+                position = conditional.end()
+                continue
+        parts.append(char)
+        position += 1
+    return "".join(parts)
+
+
+def required_literals(pattern: str, regex: bool = False) -> List[List[str]]:
+    """Lower-cased literals that occur in every match of `pattern`, as clauses.
+
+    Each clause lists alternatives of which at least one occurs in any match
+    (as for `a(bcd|efg)h`), and all clauses hold at once. Literals never
+    contain whitespace, so they survive whitespace normalization. An empty
+    result means nothing is known. Raises `re.error` for an invalid regex.
+    """
+    if not regex:
+        return [[word] for word in normalize_pattern(pattern).split()]
+    return _sequence_literals(_regex_parser.parse(pattern))
+
+
+def _sequence_literals(items) -> List[List[str]]:
+    clauses: List[List[str]] = []
+    run: List[str] = []
+    for op, argument in items:
+        name = str(op)
+        if name == "LITERAL" and not chr(argument).isspace():
+            run.append(chr(argument).lower())
+            continue
+        if run:
+            clauses.append(["".join(run)])
+            run = []
+        if name == "SUBPATTERN":
+            clauses.extend(_sequence_literals(argument[-1]))
+        elif name == "ATOMIC_GROUP":
+            clauses.extend(_sequence_literals(argument))
+        elif name in _REPEATS and argument[0] >= 1:
+            clauses.extend(_sequence_literals(argument[2]))
+        elif name == "BRANCH":
+            clause: List[str] = []
+            for alternative in argument[1]:
+                alternative_clauses = _sequence_literals(alternative)
+                if not alternative_clauses:
+                    # This alternative can match without any literal
+                    break
+                # Its most selective clause stands for the alternative
+                clause.extend(max(alternative_clauses, key=lambda literals: min(map(len, literals))))
+            else:
+                clauses.append(clause)
+    if run:
+        clauses.append(["".join(run)])
+    return clauses
+
+
+class PatternMatcher:
+    """Aho-Corasick automaton for a fixed list of literal patterns.
+
+    Pattern indexes refer to positions in the list passed to the constructor.
+    Instances hold only plain dicts and lists, so they pickle cheaply for
+    process-pool workers.
+    """
+
+    def __init__(self, patterns: Sequence[str]):
+        self.patterns = list(patterns)
+        # Trie as one transition dict per state; state 0 is the root
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Pattern indexes and lengths recognised on reaching a state
+        self._output: List[List[Tuple[int, int]]] = [[]]
+        for pattern_index, pattern in enumerate(self.patterns):
+            normalized = normalize_pattern(pattern)
+            if not normalized:
+                continue
+            state = 0
+            for char in normalized:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append((pattern_index, len(normalized)))
+        self._build_failure_links()
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                if self._fail[next_state] == next_state:
+                    self._fail[next_state] = 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """Yield (start, end, pattern_index) for every occurrence in `text`.
+
+        `text` must already be normalized with `normalize_pattern`.
+        """
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for pattern_index, length in self._output[state]:
+                yield position + 1 - length, position + 1, pattern_index
+
+    def present(self, text: str) -> Set[int]:
+        """Return the indexes of the patterns that occur in `text`."""
+        found: Set[int] = set()
+        for _, _, pattern_index in self.iter_matches(normalize_pattern(text)):
+            found.add(pattern_index)
+            if len(found) == len(self.patterns):
+                break
+        return found
@@ -0,0 +1,359 @@
+"""Boolean and proximity queries for the PDF multifile searcher.
+
+Query syntax (operators are case-insensitive):
+
+    invoice AND paid NOT draft
+    "purchase order" OR receipt
+    (invoice OR receipt) 2024          adjacent terms are ANDed
+    contract NEAR/20 termination       at most 20 words apart (NEAR alone: 10)
+
+NOT binds tightest, then NEAR, AND and OR. Terms are literals matched like
+`page.search_for`: case-insensitive substrings with whitespace runs collapsed.
+A query is evaluated per page (a page must satisfy it) or per document.
+
+Evaluation works on posting lists: the set of pages containing each term.
+AND intersects its operands cheapest first and stops as soon as the
+intersection is empty, NOT only subtracts from what is left, and NEAR checks
+word distances only on pages that contain both terms. With a `PDFIndex` the
+same evaluation over the index's posting lists bounds the candidate pages of
+every file before it is opened (`query_candidate_pages`).
+"""
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+try:
+    # When used as a package
+    from .pdf_patterns import normalize_pattern
+except Exception:
+    # When executed as a standalone module
+    from pdf_patterns import normalize_pattern
+
+QUERY_SCOPES = ("page", "document")
+DEFAULT_NEAR_DISTANCE = 10
+
+
+class QuerySyntaxError(ValueError):
+    """Raised by `parse_query` for malformed queries."""
+
+
+@dataclass(frozen=True)
+class Term:
+    text: str
+
+
+@dataclass(frozen=True)
+class And:
+    children: tuple
+
+
+@dataclass(frozen=True)
+class Or:
+    children: tuple
+
+
+@dataclass(frozen=True)
+class Not:
+    child: "QueryNode"
+
+
+@dataclass(frozen=True)
+class Near:
+    left: Term
+    right: Term
+    distance: int = DEFAULT_NEAR_DISTANCE
+
+
+QueryNode = Union[Term, And, Or, Not, Near]
+
+_TOKEN = re.compile(r'\s*(?:(?P<open>\()|(?P<close>\))|"(?P<phrase>[^"]*)"|(?P<word>[^\s()"]+))')
+_NEAR = re.compile(r"near(?:/(\d+))?$", re.IGNORECASE)
+
+
+def _tokenize(text: str) -> List[Tuple[str, object]]:
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        found = _TOKEN.match(text, position)
+        if found is None:
+            raise QuerySyntaxError(f"Unbalanced quote at position {position}")
+        position = found.end()
+        if found.group("open"):
+            tokens.append(("(", None))
+        elif found.group("close"):
+            tokens.append((")", None))
+        elif found.group("phrase") is not None:
+            if not found.group("phrase").strip():
+                raise QuerySyntaxError("Empty phrase")
+            tokens.append(("term", found.group("phrase")))
+        else:
+            word = found.group("word")
+            near = _NEAR.match(word)
+            if word.upper() in ("AND", "OR", "NOT"):
+                tokens.append((word.upper(), None))
+            elif near:
+                tokens.append(("NEAR", int(near.group(1) or DEFAULT_NEAR_DISTANCE)))
+            else:
+                tokens.append(("term", word))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position][0] if self.position < len(self.tokens) else None
+
+    def take(self):
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def parse_or(self) -> QueryNode:
+        children = [self.parse_and()]
+        while self.peek() == "OR":
+            self.take()
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else Or(tuple(children))
+
+    def parse_and(self) -> QueryNode:
+        children = [self.parse_near()]
+        while self.peek() in ("AND", "NOT", "term", "("):
+            if self.peek() == "AND":
+                self.take()
+            children.append(self.parse_near())
+        return children[0] if len(children) == 1 else And(tuple(children))
+
+    def parse_near(self) -> QueryNode:
+        left = self.parse_not()
+        while self.peek() == "NEAR":
+            _, distance = self.take()
+            right = self.parse_not()
+            if not isinstance(left, Term) or not isinstance(right, Term):
+                raise QuerySyntaxError("NEAR can only join two terms or phrases")
+            left = Near(left, right, distance)
+        return left
+
+    def parse_not(self) -> QueryNode:
+        kind = self.peek()
+        if kind == "NOT":
+            self.take()
+            return Not(self.parse_not())
+        if kind == "(":
+            self.take()
+            node = self.parse_or()
+            if self.peek() != ")":
+                raise QuerySyntaxError("Missing closing parenthesis")
+            self.take()
+            return node
+        if kind == "term":
+            return Term(self.take()[1])
+        raise QuerySyntaxError("Expected a term" + (f" but found {kind}" if kind else " at the end of the query"))
+
+
+def parse_query(text: str) -> QueryNode:
+    """Parse a query string into a tree of `Term`, `And`, `Or`, `Not` and `Near` nodes.
+
+    Raises `QuerySyntaxError` if the query is malformed or has no term that
+    is not negated, since only such terms produce matches.
+    """
+    parser = _Parser(_tokenize(text))
+    if not parser.tokens:
+        raise QuerySyntaxError("Empty query")
+    node = parser.parse_or()
+    if parser.position != len(parser.tokens):
+        raise QuerySyntaxError(f"Unexpected {parser.peek()}")
+    if not positive_terms(node):
+        raise QuerySyntaxError("The query needs at least one term that is not negated")
+    return node
+
+
+def query_terms(node: QueryNode) -> List[str]:
+    """All distinct terms of the query, in order of appearance."""
+    terms: List[str] = []
+
+    def visit(node):
+        if isinstance(node, Term):
+            if node.text not in terms:
+                terms.append(node.text)
+        elif isinstance(node, Near):
+            visit(node.left)
+            visit(node.right)
+        elif isinstance(node, Not):
+            visit(node.child)
+        else:
+            for child in node.children:
+                visit(child)
+    visit(node)
+    return terms
+
+
+def positive_terms(node: QueryNode) -> List[str]:
+    """The terms that are not negated; their hits are reported as matches."""
+    terms: List[str] = []
+
+    def visit(node):
+        if isinstance(node, Term):
+            if node.text not in terms:
+                terms.append(node.text)
+        elif isinstance(node, Near):
+            visit(node.left)
+            visit(node.right)
+        elif not isinstance(node, Not):
+            for child in node.children:
+                visit(child)
+    visit(node)
+    return terms
+
+
+Postings = Dict[str, Set[int]]
+# Returns the pages among the given ones where a NEAR node holds
+NearCheck = Callable[[Near, Set[int]], Set[int]]
+
+
+def _estimate(node: QueryNode, postings: Postings, universe: Set[int]) -> int:
+    """Rough size of a node's result, to evaluate the cheapest AND operands first."""
+    if isinstance(node, Term):
+        return len(postings.get(node.text, ()))
+    if isinstance(node, Near):
+        return min(len(postings.get(node.left.text, ())), len(postings.get(node.right.text, ())))
+    if isinstance(node, And):
+        return min(_estimate(child, postings, universe) for child in node.children)
+    if isinstance(node, Or):
+        return sum(_estimate(child, postings, universe) for child in node.children)
+    return len(universe)
+
+
+def evaluate(node: QueryNode, postings: Postings, universe: Set[int], near: NearCheck) -> Set[int]:
+    """Return the pages of `universe` that satisfy `node`.
+
+    `postings` maps each term to the pages containing it. Work shrinks as
+    evaluation goes: every operand of an AND only looks at the pages the
+    previous operands left.
+    """
+    if isinstance(node, Term):
+        return postings.get(node.text, set()) & universe
+    if isinstance(node, Near):
+        both = postings.get(node.left.text, set()) & postings.get(node.right.text, set()) & universe
+        return near(node, both) if both else set()
+    if isinstance(node, Not):
+        return universe - evaluate(node.child, postings, universe, near)
+    if isinstance(node, Or):
+        result: Set[int] = set()
+        for child in node.children:
+            result |= evaluate(child, postings, universe - result, near)
+            if result == universe:
+                break
+        return result
+    # AND: positive operands cheapest first, then subtract the negated ones
+    positives = sorted((child for child in node.children if not isinstance(child, Not)),
+                       key=lambda child: _estimate(child, postings, universe))
+    result = universe
+    for child in positives:
+        result = evaluate(child, postings, result, near)
+        if not result:
+            return result
+    for child in node.children:
+        if isinstance(child, Not):
+            result = result - evaluate(child.child, postings, result, near)
+            if not result:
+                return result
+    return set(result)
+
+
+def upper_bound(node: QueryNode, postings: Postings) -> Optional[Set[int]]:
+    """Pages that may satisfy `node` given candidate `postings`, or None for "any page".
+
+    Used with index posting lists, which may over-report, so NOT and NEAR
+    cannot exclude anything here.
+    """
+    if isinstance(node, Term):
+        return set(postings.get(node.text, ()))
+    if isinstance(node, Near):
+        return set(postings.get(node.left.text, ())) & set(postings.get(node.right.text, ()))
+    if isinstance(node, Not):
+        return None
+    bounds = [upper_bound(child, postings) for child in node.children]
+    if isinstance(node, Or):
+        if any(bound is None for bound in bounds):
+            return None
+        return set().union(*bounds)
+    known = [bound for bound in bounds if bound is not None]
+    if not known:
+        return None
+    return set.intersection(*known)
+
+
+def query_candidate_pages(node: QueryNode, index, pdf_files: Sequence[str],
+                          scope: str = "page") -> Dict[str, List[int]]:
+    """Look up the pages worth opening for a query, like `PDFIndex.candidate_pages`.
+
+    Indexed files map to the pages to search (an empty list skips the file);
+    files missing from the result must be searched in full. In page scope
+    only pages that may satisfy the query and contain a reported term are
+    listed; in document scope every page containing any term is listed, so
+    negated terms are seen as well.
+    """
+    terms = query_terms(node)
+    per_term = {term: index.candidate_pages(term, pdf_files) for term in terms}
+    indexed = set(pdf_files)
+    for candidates in per_term.values():
+        indexed &= candidates.keys()
+    reported = positive_terms(node)
+    result: Dict[str, List[int]] = {}
+    for pdf_file_path in indexed:
+        postings = {term: set(per_term[term][pdf_file_path]) for term in terms}
+        if scope == "document":
+            document_postings = {term: {0} if pages else set() for term, pages in postings.items()}
+            bound = upper_bound(node, document_postings)
+            pages = set().union(*postings.values()) if bound is None or bound else set()
+        else:
+            pages = set().union(*(postings[term] for term in reported))
+            bound = upper_bound(node, postings)
+            if bound is not None:
+                pages &= bound
+        result[pdf_file_path] = sorted(pages)
+    return result
+
+
+def _phrase_spans(words: Sequence[str], phrase: Sequence[str]) -> List[Tuple[int, int]]:
+    """Word spans [start, end) whose text, joined by spaces, contains the phrase.
+
+    A single token may occur anywhere in a word. In a longer phrase the
+    first token must end a word, the last must start one and those between
+    must be whole words, so "cat dog" matches "tomcat doghouse" but not
+    "concatenate dogma".
+    """
+    if len(phrase) == 1:
+        return [(start, start + 1) for start, word in enumerate(words) if phrase[0] in word]
+    first, middle, last = phrase[0], phrase[1:-1], phrase[-1]
+    spans = []
+    for start in range(len(words) - len(phrase) + 1):
+        end = start + len(phrase)
+        if words[start].endswith(first) and words[end - 1].startswith(last) and \
+                list(words[start + 1:end - 1]) == list(middle):
+            spans.append((start, end))
+    return spans
+
+
+def near_in_words(node: Near, words: Sequence[str]) -> bool:
+    """True if the two terms of `node` occur within `node.distance` words in `words`.
+
+    `words` must be normalized with `normalize_pattern`.
+    """
+    left = _phrase_spans(words, normalize_pattern(node.left.text).split())
+    if not left:
+        return False
+    right = _phrase_spans(words, normalize_pattern(node.right.text).split())
+    for left_start, left_end in left:
+        for right_start, right_end in right:
+            if max(right_start - left_end, left_start - right_end, 0) <= node.distance:
+                return True
+    return False
+
+
+def normalized_words(words: Iterable[tuple]) -> List[str]:
+    """Normalize the words of `page.get_text("words")` for `near_in_words`."""
+    return [normalize_pattern(word[4]) for word in words]
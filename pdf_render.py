@@ -0,0 +1,215 @@
+"""Page rendering helpers for the PDF viewer pane.
+
+Rendering a page is the slowest part of showing it, so rendered pages are kept
+in a size-bounded LRU cache keyed by (file, page, scale). Match highlights are
+drawn as canvas overlays, so the rendered page never depends on the selection.
+Pages are stored as PPM data: Tk decodes raw pixels directly, which skips the
+PNG encode in `pixmap.tobytes()` and the matching decode in `tk.PhotoImage`.
+
+Open documents are shared through a `DocumentPool`, so moving between matches
+in one file reuses the parsed document.
+
+`RenderWorker` renders pages into the cache on a background thread: the page
+about to be shown at full resolution first, then prefetched pages such as the
+neighbouring matches, so the viewer only shows a quick low-resolution preview
+while the full page is being rendered, or nothing at all once prefetched.
+
+This module does not import tkinter so it can be used and tested headless.
+"""
+import os
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Callable, Hashable, Iterable, Optional, Tuple
+import pymupdf as fitz
+
+# A preview is rendered at 1/PREVIEW_ZOOM of the size and enlarged for display
+PREVIEW_ZOOM = 4
+
+
+@dataclass
+class RenderedPage:
+    """A rendered page as PPM image data."""
+    width: int
+    height: int
+    data: bytes
+
+
+def render_page(page, scale: float) -> RenderedPage:
+    """Render `page` at `scale` to PPM data."""
+    pixel_map = page.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
+    return RenderedPage(pixel_map.width, pixel_map.height, pixel_map.tobytes("ppm"))
+
+
+def fit_scale(page_rect, width: int, height: int) -> float:
+    """Scale that fits a page into a `width` x `height` pane keeping its aspect ratio."""
+    return min(width / page_rect.width, height / page_rect.height)
+
+
+def render_key(file_path: str, page_number: int, scale: float) -> tuple:
+    """`RenderCache` key of a page rendered at `scale`."""
+    return file_path, page_number, round(scale, 3)
+
+
+class RenderCache:
+    """LRU cache of rendered pages bounded by total image size in bytes."""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, RenderedPage]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[RenderedPage]:
+        with self._lock:
+            rendered = self._entries.get(key)
+            if rendered is not None:
+                self._entries.move_to_end(key)
+            return rendered
+
+    def put(self, key: Hashable, rendered: RenderedPage):
+        size = len(rendered.data)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous.data)
+            self._entries[key] = rendered
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.data)
+
+    def discard_file(self, file_path: str):
+        """Drop all pages of one file, e.g. after it changed on disk."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == file_path]:
+                self._size -= len(self._entries.pop(key).data)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+
+class DocumentPool:
+    """Small LRU pool of open PDF documents.
+
+    The viewer and the folder tree share one pool, so selecting another match
+    in a file that is already open does not parse the file again. A document
+    is reopened if the file's modification time changed; the least recently
+    used document is closed when the pool is full.
+    """
+
+    def __init__(self, max_documents: int = 8):
+        self.max_documents = max_documents
+        self._documents: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, file_path: str):
+        """Return an open document for `file_path`, opening it if needed."""
+        try:
+            mtime = os.path.getmtime(file_path)
+        except OSError:
+            mtime = None
+        with self._lock:
+            entry = self._documents.get(file_path)
+            if entry is not None and entry[1] == mtime:
+                self._documents.move_to_end(file_path)
+                return entry[0]
+            if entry is not None:
+                del self._documents[file_path]
+                entry[0].close()
+            document = fitz.open(file_path)
+            self._documents[file_path] = (document, mtime)
+            while len(self._documents) > self.max_documents:
+                _, (evicted, _) = self._documents.popitem(last=False)
+                evicted.close()
+            return document
+
+    def close_all(self):
+        with self._lock:
+            for document, _ in self._documents.values():
+                document.close()
+            self._documents.clear()
+
+
+class RenderWorker:
+    """Background thread that renders pages into a `RenderCache`.
+
+    `request` asks for the page about to be shown and replaces any earlier
+    request; `prefetch` replaces the queue of pages to render when idle.
+    Pages are fitted to the given pane size like the viewer does, and
+    `on_rendered(key)` is called from the worker thread after each page.
+    The worker opens documents through its own `DocumentPool`, since a
+    PyMuPDF document must not be used by two threads at once.
+    """
+
+    def __init__(self, cache: RenderCache, on_rendered: Optional[Callable[[tuple], None]] = None,
+                 max_documents: int = 4):
+        self.cache = cache
+        self.on_rendered = on_rendered
+        self.documents = DocumentPool(max_documents)
+        self._requested: Optional[tuple] = None
+        self._prefetch: "deque[tuple]" = deque()
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="page-renderer", daemon=True)
+        self._thread.start()
+
+    def request(self, file_path: str, page_number: int, width: int, height: int):
+        with self._condition:
+            self._requested = (file_path, page_number, width, height)
+            self._condition.notify()
+
+    def prefetch(self, pages: Iterable[Tuple[str, int]], width: int, height: int):
+        """Render `pages` ((file, page number) pairs, most wanted first) when there is nothing else to do."""
+        with self._condition:
+            self._prefetch = deque((file_path, page_number, width, height) for file_path, page_number in pages)
+            self._condition.notify()
+
+    def stop(self, timeout: Optional[float] = None):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self._thread.join(timeout)
+        self.documents.close_all()
+
+    def _next_job(self) -> Optional[tuple]:
+        with self._condition:
+            while not self._stopped and self._requested is None and not self._prefetch:
+                self._condition.wait()
+            if self._stopped:
+                return None
+            if self._requested is not None:
+                job, self._requested = self._requested, None
+                return job
+            return self._prefetch.popleft()
+
+    def _run(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            file_path, page_number, width, height = job
+            try:
+                document = self.documents.get(file_path)
+                if not 0 <= page_number < document.page_count:
+                    continue
+                page = document.load_page(page_number)
+                scale = fit_scale(page.rect, width, height)
+                if scale <= 0:
+                    continue
+                key = render_key(file_path, page_number, scale)
+                if self.cache.get(key) is None:
+                    self.cache.put(key, render_page(page, scale))
+            except Exception as e:
+                print(f"Failed to render page {page_number + 1} of '{file_path}': {e}")
+                continue
+            if self.on_rendered is not None:
+                self.on_rendered(key)
@@ -0,0 +1,80 @@
+"""Order in which the PDF multifile searcher hands files to its workers.
+
+Files are discovered in path order, which says nothing about how long each
+one takes. `schedule_files` reorders them by an estimate of their cost, the
+number of pages to search:
+
+- the candidate pages from the index or corpus, when the search is narrowed,
+- otherwise the page count last recorded by the index or corpus,
+- otherwise the file size divided by the bytes per page of the files whose
+  page count is known (`DEFAULT_BYTES_PER_PAGE` if there are none).
+
+Policies (`SCHEDULES`):
+- "path": discovery order.
+- "largest": most expensive first; a big file found late no longer finishes
+  long after everything else, which shortens the whole search.
+- "smallest": cheapest first, so the first results show up sooner.
+- "recent": most recently modified first, for results in new documents first.
+
+Files under any of `priority_paths` (such as the folders selected in the GUI)
+come before all others; the policy orders each group.
+"""
+import os
+from typing import Dict, List, Optional, Sequence
+
+SCHEDULES = ("path", "largest", "smallest", "recent")
+# Assumed size of a page when no file with a known page count can calibrate it
+DEFAULT_BYTES_PER_PAGE = 100 * 1024
+
+
+def _under(pdf_file_path: str, priority_paths: Sequence[str]) -> bool:
+    return any(pdf_file_path == path or pdf_file_path.startswith(path.rstrip(os.sep) + os.sep)
+               for path in priority_paths)
+
+
+def estimate_costs(pdf_files: Sequence[str], page_counts: Dict[str, int],
+                   sizes: Dict[str, int]) -> Dict[str, float]:
+    """Estimated number of pages to search in each file."""
+    known = [(sizes[path], pages) for path, pages in page_counts.items() if path in sizes and pages]
+    known_pages = sum(pages for _, pages in known)
+    bytes_per_page = sum(size for size, _ in known) / known_pages if known_pages else DEFAULT_BYTES_PER_PAGE
+    costs = {}
+    for pdf_file_path in pdf_files:
+        if pdf_file_path in page_counts:
+            costs[pdf_file_path] = float(page_counts[pdf_file_path])
+        else:
+            costs[pdf_file_path] = sizes.get(pdf_file_path, 0) / bytes_per_page
+    return costs
+
+
+def schedule_files(pdf_files: Sequence[str], schedule: str = "largest",
+                   page_counts: Optional[Dict[str, int]] = None,
+                   priority_paths: Sequence[str] = ()) -> List[str]:
+    """Return `pdf_files` in the order they should be searched under `schedule`.
+
+    `page_counts` maps files to the number of pages known to need searching.
+    Ties keep discovery order. Raises ValueError for an unknown schedule.
+    """
+    if schedule not in SCHEDULES:
+        raise ValueError(f"Unknown schedule '{schedule}', expected one of {', '.join(SCHEDULES)}")
+    priority_paths = [os.path.abspath(path) for path in priority_paths]
+    if schedule == "path":
+        order = list(pdf_files)
+    else:
+        sizes: Dict[str, int] = {}
+        modified: Dict[str, float] = {}
+        for pdf_file_path in pdf_files:
+            try:
+                stat = os.stat(pdf_file_path)
+            except OSError:
+                continue
+            sizes[pdf_file_path] = stat.st_size
+            modified[pdf_file_path] = stat.st_mtime
+        if schedule == "recent":
+            order = sorted(pdf_files, key=lambda path: modified.get(path, 0.0), reverse=True)
+        else:
+            costs = estimate_costs(pdf_files, page_counts or {}, sizes)
+            order = sorted(pdf_files, key=costs.__getitem__, reverse=schedule == "largest")
+    if priority_paths:
+        order.sort(key=lambda path: not _under(path, priority_paths))
+    return order
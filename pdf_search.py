@@ -1,84 +1,753 @@
 """Search utilities for the PDF multifile searcher.
 
-Provides a standalone function `search_pdfs` that searches a directory tree for
-PDF files and returns a mapping of file paths to lists of `Match` objects.
-This logic was extracted from the GUI class to make it testable and reusable.
+`search_pdfs` searches the PDF files under one or more folders for one or
+more patterns and returns a mapping of file paths to `MatchList` objects.
+`iter_search_pdfs` is the streaming variant that yields each file's matches
+as soon as that file is done. Both take their settings from `SearchOptions`
+and can use a `PDFIndex`, `TextCorpus` or `QueryCache` to open fewer files
+and pages. This logic was extracted from the GUI class to make it testable
+and reusable.
 """
 import os
-from typing import Dict, List
+import re
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 import pymupdf as fitz
 try:
     # When used as a package
-    from .pdf_models import Match
+    from .pdf_models import FileStats, MatchList, SearchOptions, SearchStats
+    from .pdf_cache import Fingerprint, QueryCache, file_fingerprint, query_key
+    from .pdf_index import PDFIndex
+    from .pdf_corpus import TextCorpus
+    from .pdf_discovery import discover_pdf_files, find_duplicates
+    from .pdf_schedule import schedule_files
+    from .pdf_patterns import PatternMatcher, compile_search_regex, matched_pattern
+    from .pdf_text import PageText, WordLookup
+    from .pdf_query import (QueryNode, evaluate, near_in_words, normalized_words, parse_query,
+                            positive_terms, query_candidate_pages, query_terms)
 except Exception:
     # When executed as a standalone module
-    from pdf_models import Match
+    from pdf_models import FileStats, MatchList, SearchOptions, SearchStats
+    from pdf_cache import Fingerprint, QueryCache, file_fingerprint, query_key
+    from pdf_index import PDFIndex
+    from pdf_corpus import TextCorpus
+    from pdf_discovery import discover_pdf_files, find_duplicates
+    from pdf_schedule import schedule_files
+    from pdf_patterns import PatternMatcher, compile_search_regex, matched_pattern
+    from pdf_text import PageText, WordLookup
+    from pdf_query import (QueryNode, evaluate, near_in_words, normalized_words, parse_query,
+                           positive_terms, query_candidate_pages, query_terms)
 
+ENGINES = ("threads", "processes", "auto")
+
+# A single pattern or a list of patterns to search for in one pass
+SearchPatterns = Union[str, Sequence[str]]
+# One search folder or several, searched together
+SearchRoots = Union[str, Sequence[str]]
+
+# "auto" switches to processes once there are at least this many files per CPU;
+# below that, process start-up costs more than the GIL contention.
+_AUTO_PROCESS_FILES_PER_CPU = 2
+
+
+def pattern_list(search_pattern: SearchPatterns) -> List[str]:
+    """Return `search_pattern` as a list of non-empty patterns."""
+    if isinstance(search_pattern, str):
+        search_pattern = [search_pattern]
+    return [pattern for pattern in search_pattern if pattern.strip()]
+
+
+@contextmanager
+def _timed(stats, phase: str):
+    """Add the wall and CPU time of the `with` block to `stats` under `phase`."""
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    try:
+        yield
+    finally:
+        stats.add_phase(phase, time.perf_counter() - wall_start, time.thread_time() - cpu_start)
+
+
+def _error_reason(error: Exception) -> str:
+    return f"{type(error).__name__}: {error}" if str(error) else type(error).__name__
+
+
+def _page_hits(page, matcher: PatternMatcher, textpage) -> List[Tuple[int, fitz.Rect]]:
+    """Return (pattern_index, rect) for every hit of the matcher's patterns on a page."""
+    patterns = matcher.patterns
+    if len(patterns) == 1:
+        return [(0, rect) for rect in page.search_for(patterns[0], textpage=textpage)]
+    # Scan the extracted text once; only search for the patterns that occur in it
+    present = matcher.present(page.get_text("text", textpage=textpage))
+    hits = []
+    for pattern_index in sorted(present):
+        hits.extend((pattern_index, rect) for rect in page.search_for(patterns[pattern_index], textpage=textpage))
+    return hits
 
-def search_pdfs(working_directory: str, search_pattern: str) -> Dict[str, List[Match]]:
-    """Search all PDF files under `working_directory` for `search_pattern`.
 
-    Returns a dict mapping absolute file paths to lists of Match objects.
+def _page_text_hits(page, text_regex: re.Pattern, textpage) -> List[Tuple[int, fitz.Rect]]:
+    """Return (pattern_index, rect) for every `text_regex` hit in the page's extracted text."""
+    page_text = PageText.from_page(page, textpage)
+    hits = []
+    for found in text_regex.finditer(page_text.text):
+        if found.start() == found.end():
+            continue
+        pattern_index = matched_pattern(found)
+        hits.extend((pattern_index, rect) for rect in page_text.rects_for_span(found.start(), found.end()))
+    return hits
+
+
+def search_pdf_file(pdf_file_path: str, matcher: PatternMatcher,
+                    page_numbers: Optional[Sequence[int]] = None,
+                    max_matches: Optional[int] = None, cancel=None,
+                    text_regex: Optional[re.Pattern] = None) -> Tuple[str, MatchList]:
+    """Search one PDF for the matcher's patterns and return the matches in compact form.
+
+    Only the pages in `page_numbers` are searched if given. The search stops
+    after `max_matches` matches, or before the next page once `cancel` is set.
+    With `text_regex`, hits come from that expression over the extracted page
+    text instead of from `page.search_for`.
     """
-    import concurrent.futures
-    results: Dict[str, List[Match]] = {}
-    match_id_counter = [0]  # mutable counter for unique match IDs
-
-    # Gather all PDF file paths first
-    pdf_files = []
-    for root, dirs, files in os.walk(working_directory):
-        for filename in files:
-            if filename.lower().endswith('.pdf'):
-                pdf_files.append(os.path.join(root, filename))
-
-    def process_pdf(pdf_file_path):
-        local_results = []
+    pdf_file_path, local_results, _ = _search_pdf_file_with_stats(pdf_file_path, matcher, page_numbers,
+                                                                  max_matches, cancel, text_regex)
+    return pdf_file_path, local_results
+
+
+def _search_pdf_file_with_stats(pdf_file_path: str, matcher: PatternMatcher,
+                                page_numbers: Optional[Sequence[int]] = None,
+                                max_matches: Optional[int] = None, cancel=None,
+                                text_regex: Optional[re.Pattern] = None) -> Tuple[str, MatchList, FileStats]:
+    """`search_pdf_file` that also returns the file's `FileStats`.
+
+    This is a module level function so it can run in a process pool.
+    """
+    local_results = MatchList(matcher.patterns)
+    stats = FileStats(pdf_file_path)
+    pdf_document = _open_for_search(pdf_file_path, stats)
+    if pdf_document is None:
+        return pdf_file_path, local_results, stats
+    if page_numbers is None:
+        page_numbers = range(pdf_document.page_count)
+    for page_number in page_numbers:
+        if cancel is not None and cancel.is_set():
+            break
+        if max_matches is not None and len(local_results) >= max_matches:
+            break
+        if page_number >= pdf_document.page_count:
+            continue
+        stats.pages += 1
         try:
+            with _timed(stats, "extract"):
+                page = pdf_document[page_number]
+                # Parse the page once for the search and all context snippets
+                textpage = page.get_textpage()
+            with _timed(stats, "search"):
+                if text_regex is not None:
+                    search_results_on_current_page = _page_text_hits(page, text_regex, textpage)
+                else:
+                    search_results_on_current_page = _page_hits(page, matcher, textpage)
+        except Exception as e:
+            stats.page_errors += 1
+            if not stats.reason:
+                stats.reason = f"page {page_number + 1}: {_error_reason(e)}"
+            search_results_on_current_page = []
+        if search_results_on_current_page:
+            _add_page_matches(local_results, page, page_number, textpage, search_results_on_current_page,
+                              max_matches, stats)
+    pdf_document.close()
+    stats.matches = len(local_results)
+    return pdf_file_path, local_results, stats
+
+
+def _open_for_search(pdf_file_path: str, stats: FileStats):
+    """Open a PDF for searching; return None and mark `stats` failed if it cannot be searched."""
+    try:
+        stats.bytes_read = os.path.getsize(pdf_file_path)
+        with _timed(stats, "open"):
             pdf_document = fitz.open(pdf_file_path)
+    except Exception as e:
+        stats.status, stats.reason = "failed", _error_reason(e)
+        return None
+    if pdf_document.needs_pass:
+        pdf_document.close()
+        stats.status, stats.reason = "failed", "encrypted"
+        return None
+    stats.page_count = pdf_document.page_count
+    return pdf_document
+
+
+def _add_page_matches(local_results: MatchList, page, page_number: int, textpage,
+                      hits: List[Tuple[int, fitz.Rect]], max_matches: Optional[int], stats: FileStats):
+    """Append a page's (pattern_index, rect) hits with their context snippets."""
+    if max_matches is not None:
+        # Drop surplus hits before paying for their context text
+        hits = hits[:max_matches - len(local_results)]
+    with _timed(stats, "context"):
+        try:
+            words = WordLookup.from_page(page, textpage)
         except Exception:
-            return pdf_file_path, local_results
-        for page_number in range(pdf_document.page_count):
-            page = pdf_document[page_number]
-            try:
-                search_results_on_current_page = page.search_for(search_pattern)
-            except Exception:
-                search_results_on_current_page = []
-            if not search_results_on_current_page:
+            words = None
+        page_h = page.rect.height
+        for pattern_index, mr in hits:
+            match_height = mr.y1 - mr.y0
+            pad_y = max(5, match_height * 0.5)
+            y0 = max(0, mr.y0 - pad_y)
+            y1 = min(page_h, mr.y1 + pad_y)
+            context_location = fitz.Rect(mr.x0 - 50, y0, mr.x1 + 50, y1)
+            context_text = words.text_in(context_location) if words is not None else ""
+            local_results.append(page_number, mr, context_location, context_text, pattern_index)
+
+
+def _search_query_file_with_stats(pdf_file_path: str, query: QueryNode, scope: str = "page",
+                                  page_numbers: Optional[Sequence[int]] = None,
+                                  max_matches: Optional[int] = None,
+                                  cancel=None) -> Tuple[str, MatchList, FileStats]:
+    """Evaluate a boolean/proximity query (see `pdf_query`) on one PDF.
+
+    Each page's text is scanned once for all query terms to build the term
+    posting lists. In page scope a page is evaluated as soon as it is
+    scanned; in document scope the file is evaluated after all pages. The
+    hits of the query's non-negated terms on satisfying pages are returned.
+    This is a module level function so it can run in a process pool.
+    """
+    reported = positive_terms(query)
+    local_results = MatchList(reported)
+    stats = FileStats(pdf_file_path)
+    pdf_document = _open_for_search(pdf_file_path, stats)
+    if pdf_document is None:
+        return pdf_file_path, local_results, stats
+    terms = query_terms(query)
+    matcher = PatternMatcher(terms)
+    postings: Dict[str, set] = {term: set() for term in terms}
+    # Only the page being looked at stays parsed
+    loaded = {}
+
+    def load(page_number):
+        if page_number not in loaded:
+            loaded.clear()
+            with _timed(stats, "extract"):
+                page = pdf_document[page_number]
+                loaded[page_number] = (page, page.get_textpage())
+        return loaded[page_number]
+
+    def near(node, pages):
+        found = set()
+        for page_number in sorted(pages):
+            page, textpage = load(page_number)
+            if near_in_words(node, normalized_words(page.get_text("words", textpage=textpage))):
+                found.add(page_number)
+                if scope == "document":
+                    break
+        return found
+
+    def reported_hits(page_number):
+        page, textpage = load(page_number)
+        hits = []
+        for pattern_index, term in enumerate(reported):
+            if page_number in postings[term]:
+                hits.extend((pattern_index, rect) for rect in page.search_for(term, textpage=textpage))
+        return hits
+
+    if page_numbers is None:
+        page_numbers = range(pdf_document.page_count)
+    cancelled = False
+    for page_number in page_numbers:
+        if cancel is not None and cancel.is_set():
+            cancelled = True
+            break
+        if max_matches is not None and len(local_results) >= max_matches:
+            break
+        if page_number >= pdf_document.page_count:
+            continue
+        stats.pages += 1
+        hits = []
+        try:
+            page, textpage = load(page_number)
+            with _timed(stats, "search"):
+                present = matcher.present(page.get_text("text", textpage=textpage))
+                for term_index in present:
+                    postings[terms[term_index]].add(page_number)
+                if scope == "page" and present and evaluate(query, postings, {page_number}, near):
+                    hits = reported_hits(page_number)
+        except Exception as e:
+            stats.page_errors += 1
+            if not stats.reason:
+                stats.reason = f"page {page_number + 1}: {_error_reason(e)}"
+        if hits:
+            _add_page_matches(local_results, page, page_number, textpage, hits, max_matches, stats)
+
+    if scope == "document" and not cancelled:
+        document_postings = {term: {0} if pages else set() for term, pages in postings.items()}
+
+        def document_near(node, _):
+            return {0} if near(node, postings[node.left.text] & postings[node.right.text]) else set()
+
+        try:
+            with _timed(stats, "search"):
+                satisfied = evaluate(query, document_postings, {0}, document_near)
+            if satisfied:
+                for page_number in sorted(set().union(*(postings[term] for term in reported))):
+                    if max_matches is not None and len(local_results) >= max_matches:
+                        break
+                    with _timed(stats, "search"):
+                        hits = reported_hits(page_number)
+                    page, textpage = load(page_number)
+                    _add_page_matches(local_results, page, page_number, textpage, hits, max_matches, stats)
+        except Exception as e:
+            stats.page_errors += 1
+            if not stats.reason:
+                stats.reason = _error_reason(e)
+    pdf_document.close()
+    stats.matches = len(local_results)
+    return pdf_file_path, local_results, stats
+
+
+def _merge_shards(shards: List[Tuple[int, MatchList, FileStats]],
+                  max_matches: Optional[int]) -> Tuple[MatchList, FileStats]:
+    """Combine the (first page, matches, stats) results of a file's page ranges in page order."""
+    shards.sort(key=lambda shard: shard[0])
+    _, matches, file_stats = shards[0]
+    for _, shard_matches, shard_stats in shards[1:]:
+        matches.extend(shard_matches)
+        file_stats.merge(shard_stats)
+    if max_matches is not None:
+        matches.truncate(max_matches)
+    file_stats.matches = len(matches)
+    return matches, file_stats
+
+
+def _page_ranges(page_numbers: Optional[Sequence[int]], shard_pages: Optional[int]) -> list:
+    """Split a file's pages into the page ranges searched as separate tasks.
+
+    Without known candidate pages only the first range is returned; the rest
+    are added once the search of that range reports the page count.
+    """
+    if not shard_pages:
+        return [page_numbers]
+    if page_numbers is None:
+        return [range(shard_pages)]
+    return [page_numbers[start:start + shard_pages]
+            for start in range(0, len(page_numbers), shard_pages)] or [page_numbers]
+
+
+def choose_engine(engine: str, file_count: int) -> str:
+    """Resolve `engine` ("threads", "processes" or "auto") to a concrete engine."""
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown search engine '{engine}', expected one of {', '.join(ENGINES)}")
+    if engine != "auto":
+        return engine
+    cpu_count = os.cpu_count() or 1
+    if cpu_count > 1 and file_count >= cpu_count * _AUTO_PROCESS_FILES_PER_CPU:
+        return "processes"
+    return "threads"
+
+
+def choose_worker_count(engine: str, task_count: Optional[int], max_workers: Optional[int] = None) -> int:
+    """Pick the number of workers for `task_count` tasks (files or page ranges).
+
+    Processes default to one per CPU, threads to the `ThreadPoolExecutor`
+    default. Either way no more workers are started than there are tasks,
+    unless their number is not known yet (None), and `max_workers` caps the
+    result.
+    """
+    cpu_count = os.cpu_count() or 1
+    if engine == "processes":
+        workers = cpu_count
+    else:
+        workers = min(32, cpu_count + 4)
+    if max_workers is not None:
+        workers = min(workers, max_workers)
+    if task_count is not None:
+        workers = min(workers, task_count)
+    return max(1, workers)
+
+
+def _make_executor(engine: str, workers: int):
+    import concurrent.futures
+    if engine == "processes":
+        return concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+    return concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+
+
+def _plan_search(working_directory: SearchRoots, search_patterns: List[str], index: Optional[PDFIndex],
+                 options: SearchOptions, stats: Optional[SearchStats] = None,
+                 query: Optional[QueryNode] = None,
+                 corpus: Optional[TextCorpus] = None) -> Tuple[List[str], Dict[str, List[int]]]:
+    """Return the files to search and, for indexed files, their candidate pages."""
+    stats = stats if stats is not None else SearchStats()
+    roots = [working_directory] if isinstance(working_directory, str) else list(working_directory)
+    with _timed(stats, "discover"):
+        pdf_files = discover_pdf_files(roots, include=options.include, exclude=options.exclude,
+                                       max_depth=options.max_depth, min_size=options.min_file_size,
+                                       max_size=options.max_file_size, on_error=stats.add_unreadable_folder)
+
+    # Pages worth searching per file; files missing here are searched in full.
+    # The index only knows literal substrings, so regex searches scan everything.
+    # The corpus scans raw page text and handles every mode but queries; the
+    # index answers for the files the corpus does not know.
+    candidate_pages: Dict[str, List[int]] = {}
+    if corpus is not None and query is None:
+        with _timed(stats, "corpus"):
+            candidate_pages = corpus.candidate_pages(search_patterns, pdf_files, options)
+    if index is not None and (query is not None or not options.regex):
+        remaining = [path for path in pdf_files if path not in candidate_pages]
+        with _timed(stats, "index"):
+            if query is not None:
+                candidate_pages.update(query_candidate_pages(query, index, remaining, options.query_scope))
+            elif remaining:
+                candidate_pages.update(index.candidate_pages(search_patterns, remaining))
+    if candidate_pages:
+        discovered = len(pdf_files)
+        pdf_files = [path for path in pdf_files
+                     if path not in candidate_pages or candidate_pages[path]]
+        if discovered > len(pdf_files):
+            stats.skip("no match in index", discovered - len(pdf_files))
+    return pdf_files, candidate_pages
+
+
+def _page_counts(pdf_files: List[str], index: Optional[PDFIndex], corpus: Optional[TextCorpus],
+                 candidate_pages: Dict[str, List[int]]) -> Dict[str, int]:
+    """Pages to search in each file as far as known, for `schedule_files` and the worker count."""
+    page_counts: Dict[str, int] = {}
+    unknown = [path for path in pdf_files if path not in candidate_pages]
+    if unknown and index is not None:
+        page_counts.update(index.page_counts(unknown))
+    if unknown and corpus is not None:
+        page_counts.update(corpus.page_counts(unknown))
+    for pdf_file_path in pdf_files:
+        if pdf_file_path in candidate_pages:
+            page_counts[pdf_file_path] = len(candidate_pages[pdf_file_path])
+    return page_counts
+
+
+def _task_count(pdf_files: List[str], page_counts: Dict[str, int], shard_pages: Optional[int]) -> Optional[int]:
+    """Number of tasks `pdf_files` are split into, or None while a page count is unknown."""
+    if not shard_pages:
+        return len(pdf_files)
+    if any(pdf_file_path not in page_counts for pdf_file_path in pdf_files):
+        return None
+    return sum(max(1, -(-page_counts[pdf_file_path] // shard_pages)) for pdf_file_path in pdf_files)
+
+
+def _apply_cache(cache: QueryCache, query: tuple, pdf_files: List[str], candidate_pages: Dict[str, List[int]],
+                 stats: SearchStats):
+    """Split `pdf_files` into cached results and files still to search.
+
+    Returns (cached results, files to search, candidate pages, fingerprints,
+    cached copies). Candidate pages are narrowed to the pages that matched a
+    query this one refines; files that cannot match are dropped and cached as
+    empty. Cached copies map cached files to the unchanged file they duplicate.
+    """
+    with _timed(stats, "cache"):
+        fingerprints = {pdf_file: file_fingerprint(pdf_file) for pdf_file in pdf_files}
+        cached: Dict[str, MatchList] = {}
+        cached_copies: Dict[str, str] = {}
+        for pdf_file in pdf_files:
+            matches = cache.get(query, pdf_file, fingerprints[pdf_file])
+            if matches is not None:
+                cached[pdf_file] = matches
+                original = cache.duplicate_of(query, pdf_file, fingerprints[pdf_file], fingerprints)
+                if original:
+                    cached_copies[pdf_file] = original
+        refined_pages = cache.refine(query, {pdf_file: fingerprints[pdf_file]
+                                             for pdf_file in pdf_files if pdf_file not in cached})
+        candidate_pages = dict(candidate_pages)
+        for pdf_file, pages in refined_pages.items():
+            if pdf_file in candidate_pages:
+                pages = sorted(set(pages).intersection(candidate_pages[pdf_file]))
+            candidate_pages[pdf_file] = pages
+        remaining = []
+        refined_out = 0
+        for pdf_file in pdf_files:
+            if pdf_file in cached:
                 continue
-            for mr in search_results_on_current_page:
-                match_height = mr.y1 - mr.y0
-                page_h = page.rect.height
-                pad_y = max(5, match_height * 0.5)
-                y0 = max(0, mr.y0 - pad_y)
-                y1 = min(page_h, mr.y1 + pad_y)
-                context_location = fitz.Rect(mr.x0 - 50, y0, mr.x1 + 50, y1)
-                try:
-                    context_text = page.get_textbox(context_location)
-                except Exception:
-                    context_text = ""
-                # Thread-safe match_id assignment
-                match_id = None
-                # Use a lock to increment the counter safely
-                if hasattr(process_pdf, 'lock'):
-                    with process_pdf.lock:
-                        match_id = match_id_counter[0]
-                        match_id_counter[0] += 1
-                else:
-                    match_id = match_id_counter[0]
-                    match_id_counter[0] += 1
-                local_results.append(Match(match_id, page_number, mr, context_location, context_text))
-        pdf_document.close()
-        return pdf_file_path, local_results
+            if pdf_file in refined_pages and not candidate_pages[pdf_file]:
+                cache.put(query, pdf_file, fingerprints[pdf_file], MatchList(query[0]))
+                refined_out += 1
+                continue
+            remaining.append(pdf_file)
+    if refined_out:
+        stats.skip("no match in previous results", refined_out)
+    return cached, remaining, candidate_pages, fingerprints, cached_copies
+
+
+def iter_search_pdfs(working_directory: SearchRoots, search_pattern: SearchPatterns,
+                     index: Optional[PDFIndex] = None, options: Optional[SearchOptions] = None,
+                     first_match_id: int = 0,
+                     progress: Optional[Callable[[int, int], None]] = None,
+                     cancel=None, stats: Optional[SearchStats] = None,
+                     on_file: Optional[Callable[[FileStats], None]] = None,
+                     cache: Optional[QueryCache] = None, executor=None,
+                     corpus: Optional[TextCorpus] = None, manager=None) -> Iterator[Tuple[str, MatchList]]:
+    """Search like `search_pdfs`, yielding `(path, matches)` as each file completes.
+
+    Every searched file is yielded, with an empty list if it has no matches.
+    Match IDs are numbered from `first_match_id` in the order files complete.
+    `progress(done, total)` is called after each file. The search ends early
+    once `cancel` is set or `options.max_results` matches have been yielded;
+    closing the generator early also stops the remaining work.
+
+    `stats` is filled in as files complete; `on_file(file_stats)` is called
+    for every searched file, in the calling thread.
 
-    # Add a lock for thread-safe match_id increment
+    With a `QueryCache`, unchanged files already searched for the same query
+    are yielded first from the cache, a query that refines a cached one only
+    searches the pages that matched before, and new results are cached.
+
+    A long-lived `executor` (thread or process pool) may be passed to avoid
+    starting workers for every search; it is left running afterwards and
+    `options.engine` / `max_workers` are ignored. Workers in a shared
+    process pool can only be stopped through an event they can receive;
+    pass a `multiprocessing.Manager()` to create one per search from.
+    Without it, files they already started are finished.
+
+    A `TextCorpus` limits the files and pages opened, like the index.
+    """
+    import concurrent.futures
     import threading
-    process_pdf.lock = threading.Lock()
+    options = options or SearchOptions()
+    stats = stats if stats is not None else SearchStats()
+    search_start = time.perf_counter()
+    patterns = pattern_list(search_pattern)
+    if not patterns:
+        return
+    text_regex = None
+    query = None
+    if options.query:
+        # Several queries match if any of them does
+        query = parse_query(" OR ".join(f"({pattern})" for pattern in patterns)
+                            if len(patterns) > 1 else patterns[0])
+    elif options.uses_text_layout():
+        # Compile before starting any worker so a bad regex fails fast
+        text_regex = compile_search_regex(patterns, options.regex, options.case_sensitive, options.whole_word)
+    pdf_files, candidate_pages = _plan_search(working_directory, patterns, index, options, stats, query,
+                                              corpus)
+    max_matches = options.per_file_limit()
+    cached: Dict[str, MatchList] = {}
+    fingerprints: Dict[str, Optional[Fingerprint]] = {}
+    cached_copies: Dict[str, str] = {}
+    cache_key = None
+    if cache is not None:
+        cache_key = query_key(patterns, options)
+        cached, pdf_files, candidate_pages, fingerprints, cached_copies = _apply_cache(
+            cache, cache_key, pdf_files, candidate_pages, stats)
+    total = len(pdf_files) + len(cached)
+    if progress is not None:
+        progress(0, total)
+    # Copies of the same content are searched once: original path -> copies
+    copies: Dict[str, List[str]] = {}
+    if not options.dedupe:
+        cached_copies = {}
+    for copy_path, original in list(cached_copies.items()):
+        if original not in cached:
+            # The original is searched again; the copy follows it as before
+            del cached[copy_path], cached_copies[copy_path]
+            copies.setdefault(original, []).append(copy_path)
+    if options.dedupe and len(pdf_files) > 1:
+        with _timed(stats, "dedupe"):
+            duplicates = find_duplicates(pdf_files)
+        for duplicate, original in duplicates.items():
+            copies.setdefault(original, []).append(duplicate)
+        pdf_files = [pdf_file for pdf_file in pdf_files if pdf_file not in duplicates]
+    # A document-scope query needs the whole document in one task
+    shard_pages = options.shard_pages if query is None or options.query_scope == "page" else None
+    page_counts: Dict[str, int] = {}
+    if len(pdf_files) > 1 or shard_pages:
+        page_counts = _page_counts(pdf_files, index, corpus, candidate_pages)
+    if len(pdf_files) > 1:
+        with _timed(stats, "schedule"):
+            pdf_files = schedule_files(pdf_files, options.schedule, page_counts, options.priority_paths)
+    stats.schedule = options.schedule
+
+    match_id = first_match_id
+    done = 0
 
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        future_to_pdf = {executor.submit(process_pdf, pdf_file): pdf_file for pdf_file in pdf_files}
-        for future in concurrent.futures.as_completed(future_to_pdf):
-            pdf_file_path, matches = future.result()
-            if matches:
-                results[pdf_file_path] = matches
+    def deliver(matches: MatchList, file_stats: FileStats) -> bool:
+        """Number and count one file's matches; True once the result limit is reached."""
+        nonlocal match_id, done
+        if options.max_results is not None:
+            matches.truncate(options.max_results - (match_id - first_match_id))
+            file_stats.matches = len(matches)
+        stats.add_file(file_stats)
+        if on_file is not None:
+            on_file(file_stats)
+        matches.first_match_id = match_id
+        match_id += len(matches)
+        done += 1
+        if progress is not None:
+            progress(done, total)
+        return options.max_results is not None and match_id - first_match_id >= options.max_results
+
+    # Copies come after their originals, which they are grouped under
+    for pdf_file_path in sorted(cached, key=lambda path: path in cached_copies):
+        matches = cached[pdf_file_path]
+        if cancel is not None and cancel.is_set():
+            stats.wall_time = time.perf_counter() - search_start
+            return
+        if pdf_file_path in cached_copies:
+            file_stats = FileStats(pdf_file_path, status="duplicate", matches=len(matches),
+                                   duplicate_of=cached_copies[pdf_file_path])
+        else:
+            file_stats = FileStats(pdf_file_path, status="cached", matches=len(matches))
+        limit_reached = deliver(matches, file_stats)
+        yield pdf_file_path, matches
+        if limit_reached:
+            stats.wall_time = time.perf_counter() - search_start
+            return
+    if not pdf_files:
+        stats.wall_time = time.perf_counter() - search_start
+        return
+
+    # Workers watch a stop event of this search, set when it ends or
+    # `cancel` is set: a plain Event for threads, a manager proxy that can be
+    # pickled for processes.
+    owned_manager = None
+    owns_executor = executor is None
+    workers = options.max_workers or os.cpu_count() or 1
+    if owns_executor:
+        engine = choose_engine(options.engine, len(pdf_files))
+        # A long document split into page ranges keeps several workers busy
+        workers = choose_worker_count(engine, _task_count(pdf_files, page_counts, shard_pages),
+                                      options.max_workers)
+        if engine == "processes":
+            import multiprocessing
+            owned_manager = multiprocessing.Manager()
+            stop = owned_manager.Event()
+        else:
+            stop = threading.Event()
+        executor = _make_executor(engine, workers)
+    elif manager is not None:
+        stop = manager.Event()
+    elif isinstance(executor, concurrent.futures.ProcessPoolExecutor):
+        # Queued files are cancelled below; running ones are left to finish
+        stop = None
+    else:
+        stop = threading.Event()
+    matcher = PatternMatcher(patterns)
+    max_in_flight = options.max_in_flight or 2 * workers
+    # (path, page numbers, reports the page count) of the tasks not submitted yet
+    tasks = deque()
+    # Page ranges of each undelivered file still to come back, and those that did
+    shards_left: Dict[str, int] = {}
+    shard_results: Dict[str, list] = {}
+    for pdf_file in pdf_files:
+        ranges = _page_ranges(candidate_pages.get(pdf_file), shard_pages)
+        shards_left[pdf_file] = len(ranges)
+        probe = pdf_file not in candidate_pages
+        tasks.extend((pdf_file, page_numbers, probe) for page_numbers in ranges)
+    pending = {}
+
+    def submit_tasks():
+        while tasks and len(pending) < max_in_flight:
+            task = tasks.popleft()
+            pdf_file, page_numbers, _ = task
+            if query is not None:
+                future = executor.submit(_search_query_file_with_stats, pdf_file, query, options.query_scope,
+                                         page_numbers, max_matches, stop)
+            else:
+                future = executor.submit(_search_pdf_file_with_stats, pdf_file, matcher, page_numbers,
+                                         max_matches, stop, text_regex)
+            pending[future] = task
+
+    try:
+        submit_tasks()
+        while pending:
+            if cancel is not None and cancel.is_set():
+                return
+            completed, _ = concurrent.futures.wait(pending, timeout=0.1,
+                                                   return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in completed:
+                pdf_file_path, page_numbers, probe = pending.pop(future)
+                _, matches, file_stats = future.result()
+                if probe and shard_pages and file_stats.page_count > shard_pages and \
+                        (max_matches is None or len(matches) < max_matches):
+                    # Search the rest of a long document in parallel, ahead of the files still queued
+                    more = [(pdf_file_path, range(start, min(start + shard_pages, file_stats.page_count)), False)
+                            for start in range(shard_pages, file_stats.page_count, shard_pages)]
+                    shards_left[pdf_file_path] += len(more)
+                    tasks.extendleft(reversed(more))
+                first_page = page_numbers[0] if page_numbers else 0
+                shard_results.setdefault(pdf_file_path, []).append((first_page, matches, file_stats))
+                shards_left[pdf_file_path] -= 1
+                if shards_left[pdf_file_path]:
+                    continue
+                del shards_left[pdf_file_path]
+                matches, file_stats = _merge_shards(shard_results.pop(pdf_file_path), max_matches)
+                cacheable = cache is not None and file_stats.status == "scanned" and not file_stats.page_errors
+                complete = max_matches is None or len(matches) < max_matches
+                if cacheable:
+                    # `stop` is only set once the search ends, so this result is whole
+                    cache.put(cache_key, pdf_file_path, fingerprints[pdf_file_path], matches, complete)
+                limit_reached = deliver(matches, file_stats)
+                # Copied before the caller gets the original and might change it
+                copy_results = [(copy_path, matches.copy()) for copy_path in copies.get(pdf_file_path, ())]
+                yield pdf_file_path, matches
+                if limit_reached:
+                    return
+                for copy_path, copy_matches in copy_results:
+                    if cacheable:
+                        cache.put(cache_key, copy_path, fingerprints[copy_path], copy_matches, complete,
+                                  (pdf_file_path, fingerprints[pdf_file_path]))
+                    copy_stats = FileStats(copy_path, status="duplicate" if file_stats.status == "scanned"
+                                           else file_stats.status, reason=file_stats.reason,
+                                           page_count=file_stats.page_count, matches=len(copy_matches),
+                                           duplicate_of=pdf_file_path)
+                    limit_reached = deliver(copy_matches, copy_stats)
+                    yield copy_path, copy_matches
+                    if limit_reached:
+                        return
+            submit_tasks()
+    finally:
+        if stop is not None:
+            stop.set()
+        if owns_executor:
+            executor.shutdown(wait=True, cancel_futures=True)
+        else:
+            for future in pending:
+                future.cancel()
+        if owned_manager is not None:
+            owned_manager.shutdown()
+        if done < total:
+            stats.skip("search stopped", total - done)
+        stats.wall_time = time.perf_counter() - search_start
+
+
+def search_pdfs(working_directory: SearchRoots, search_pattern: SearchPatterns,
+                index: Optional[PDFIndex] = None, options: Optional[SearchOptions] = None,
+                cancel=None, stats: Optional[SearchStats] = None,
+                on_file: Optional[Callable[[FileStats], None]] = None,
+                cache: Optional[QueryCache] = None,
+                corpus: Optional[TextCorpus] = None) -> Dict[str, MatchList]:
+    """Search all PDF files under `working_directory` for `search_pattern`.
+
+    `working_directory` may be a list of folders; they are discovered in one
+    pass, each file is searched once even if the folders overlap, and all
+    files share one worker pool.
+
+    `options` selects the engine (a thread pool, a process pool, or "auto" to
+    choose by corpus size), the worker count and the result limits. Setting
+    `cancel` stops the search and returns what was found so far. Pass a
+    `SearchStats` as `stats` to have it filled in, and `on_file` to be called
+    with each file's `FileStats` (see `iter_search_pdfs`). A `QueryCache`
+    reuses and narrows earlier results, and a `TextCorpus` finds the pages
+    to open by scanning extracted text.
+
+    Returns a dict mapping absolute file paths to `MatchList`s, which can be
+    used like lists of Match objects.
+    """
+    found = {pdf_file_path: matches
+             for pdf_file_path, matches in iter_search_pdfs(working_directory, search_pattern, index,
+                                                            options, cancel=cancel, stats=stats,
+                                                            on_file=on_file, cache=cache, corpus=corpus)
+             if matches}
 
+    # Renumber in path order so match IDs are the same on every run
+    results: Dict[str, MatchList] = {}
+    match_id = 0
+    for pdf_file_path in sorted(found):
+        found[pdf_file_path].first_match_id = match_id
+        match_id += len(found[pdf_file_path])
+        results[pdf_file_path] = found[pdf_file_path]
     return results
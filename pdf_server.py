@@ -0,0 +1,484 @@
+#!/usr/bin/env python3
+"""Long-running search server for the PDF multifile searcher.
+
+The server keeps everything that makes a search fast between searches: one
+worker pool, the full-text index and the query result cache (which can be
+shared by everyone searching the same folders). The GUI and scripts talk to
+it over a small HTTP JSON API:
+
+    POST /search                  {"folders": [...], "patterns": [...], "options": {...}}
+                                  streams JSON Lines events:
+                                  {"event": "started", "search_id": ...}
+                                  {"event": "progress", "done": n, "total": n}
+                                  {"event": "file", "file": path, "first_match_id": n,
+                                   "patterns": [...], "matches": [...]}
+                                  {"event": "done", "reason": ..., "stats": {...}}
+    POST /searches/<id>/cancel    stop a running search
+    GET  /searches/<id>           state and statistics of a recent search
+    GET  /stats                   server statistics
+    POST /reindex                 {"folders": [...], "use_hash": false}
+
+`options` holds `SearchOptions` fields. If the server was started with a
+token, every request must send it in the `X-Auth-Token` header. Run it with
+
+    python3 pdf_server.py --index ~/.pdf_multifile_searcher_index.sqlite
+
+and point the GUI at it with `url` in the `[Server]` configuration section.
+`SearchClient` is the Python client.
+"""
+import argparse
+import concurrent.futures
+import dataclasses
+import hmac
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+import urllib.request
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+try:
+    # When used as a package
+    from .pdf_models import FileStats, MatchList, SearchOptions, SearchStats
+    from .pdf_search import iter_search_pdfs
+    from .pdf_index import PDFIndex
+    from .pdf_corpus import TextCorpus
+    from .pdf_cache import QueryCache
+except Exception:
+    # When executed as a script (no package context)
+    from pdf_models import FileStats, MatchList, SearchOptions, SearchStats
+    from pdf_search import iter_search_pdfs
+    from pdf_index import PDFIndex
+    from pdf_corpus import TextCorpus
+    from pdf_cache import QueryCache
+
+DEFAULT_PORT = 8765
+# Seconds between checks of a client's cancel event while it waits for events
+CANCEL_POLL_INTERVAL = 0.1
+# Finished searches kept for GET /searches/<id>
+RECENT_SEARCHES = 20
+_OPTION_FIELDS = {option.name for option in dataclasses.fields(SearchOptions)}
+
+
+def options_from_dict(values: dict) -> SearchOptions:
+    """Build `SearchOptions` from JSON values; raises ValueError for unknown fields."""
+    unknown = set(values) - _OPTION_FIELDS
+    if unknown:
+        raise ValueError(f"Unknown search options: {', '.join(sorted(unknown))}")
+    values = dict(values)
+    for name in ("include", "exclude", "priority_paths"):
+        if name in values:
+            values[name] = tuple(values[name])
+    return SearchOptions(**values)
+
+
+def matches_to_records(matches: MatchList) -> List[dict]:
+    return [{'page_number': match.page_number,
+             'location': list(match.location),
+             'context_location': list(match.context_location),
+             'context': match.context,
+             'pattern_index': matches.patterns.index(match.pattern)}
+            for match in matches]
+
+
+def matches_from_records(patterns: Sequence[str], first_match_id: int, records: List[dict]) -> MatchList:
+    matches = MatchList(patterns, first_match_id)
+    for record in records:
+        matches.append(record['page_number'], record['location'], record['context_location'],
+                       record['context'], record['pattern_index'])
+    return matches
+
+
+def stats_from_dict(values: dict) -> SearchStats:
+    """Rebuild the `SearchStats` sent by the server (slowest files keep only their totals)."""
+    stats = SearchStats()
+    for name in ("files_scanned", "files_cached", "files_duplicate", "files_skipped", "files_failed", "pages",
+                 "matches", "bytes_read", "page_errors", "wall_time", "skip_reasons", "phases", "schedule"):
+        if name in values:
+            setattr(stats, name, values[name])
+    stats.failures = [tuple(failure) for failure in values.get("failures", [])]
+    stats.unreadable_folders = [tuple(folder) for folder in values.get("unreadable_folders", [])]
+    stats.slowest = [FileStats(slowest["path"], pages=slowest["pages"], matches=slowest["matches"],
+                               phases={"total": [slowest["wall_time"], slowest["cpu_time"]]})
+                     for slowest in values.get("slowest", [])]
+    return stats
+
+
+class _Search:
+    """A search started through the API."""
+
+    def __init__(self):
+        self.search_id = uuid.uuid4().hex
+        self.cancel = threading.Event()
+        self.stats = SearchStats()
+        self.state = "running"
+        self.started = time.time()
+
+
+class SearchServer:
+    """The search engine state shared by all requests."""
+
+    def __init__(self, index_path: Optional[str] = None, cache: Optional[QueryCache] = None,
+                 cache_path: Optional[str] = None, engine: str = "threads", max_workers: Optional[int] = None,
+                 corpus_path: Optional[str] = None):
+        self.index = PDFIndex(index_path) if index_path else None
+        self.corpus_path = corpus_path
+        self.corpus = None
+        if corpus_path:
+            if self.index is not None:
+                self.corpus = TextCorpus.build(self.index, corpus_path)
+            else:
+                self.corpus = TextCorpus(corpus_path)
+        self.cache = cache if cache is not None else QueryCache()
+        self.cache_path = cache_path
+        # Hands out a stop event per search that workers in the process pool can receive
+        self._manager = None
+        if engine == "processes":
+            self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=max_workers)
+            self._manager = multiprocessing.Manager()
+        else:
+            self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        self.engine = engine
+        self.started = time.time()
+        self.searches_run = 0
+        self._searches: "OrderedDict[str, _Search]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def run_search(self, folders: Sequence[str], patterns: Sequence[str], options: SearchOptions,
+                   emit: Callable[[dict], None]) -> _Search:
+        """Run one search, passing every event to `emit`; a failing `emit` cancels the search."""
+        search = _Search()
+        with self._lock:
+            self._searches[search.search_id] = search
+            self.searches_run += 1
+            while len(self._searches) > RECENT_SEARCHES:
+                oldest = next(iter(self._searches.values()))
+                if oldest.state == "running":
+                    break
+                self._searches.popitem(last=False)
+
+        def progress(done, total):
+            emit({'event': 'progress', 'done': done, 'total': total})
+
+        # Files whose content duplicates an already reported file
+        duplicate_of: Dict[str, str] = {}
+
+        def on_file(file_stats):
+            if file_stats.duplicate_of:
+                duplicate_of[file_stats.path] = file_stats.duplicate_of
+
+        with self._lock:
+            # A reindex may replace the corpus; this one stays open until the search ends
+            corpus = self.corpus.acquire() if self.corpus is not None else None
+        match_count = 0
+        try:
+            emit({'event': 'started', 'search_id': search.search_id})
+            for file_path, matches in iter_search_pdfs(folders, patterns, index=self.index, options=options,
+                                                       progress=progress, cancel=search.cancel,
+                                                       stats=search.stats, cache=self.cache,
+                                                       executor=self.executor, corpus=corpus,
+                                                       on_file=on_file, manager=self._manager):
+                match_count += len(matches)
+                if matches:
+                    emit({'event': 'file', 'file': file_path, 'first_match_id': matches.first_match_id,
+                          'patterns': matches.patterns, 'matches': matches_to_records(matches),
+                          'duplicate_of': duplicate_of.get(file_path, "")})
+            if search.cancel.is_set():
+                search.state = "cancelled"
+            elif options.max_results is not None and match_count >= options.max_results:
+                search.state = "limit"
+            else:
+                search.state = "done"
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away
+            search.cancel.set()
+            search.state = "cancelled"
+            return search
+        except Exception as e:
+            search.state = "error"
+            emit({'event': 'error', 'message': str(e)})
+            return search
+        finally:
+            if corpus is not None:
+                corpus.release()
+        emit({'event': 'done', 'reason': search.state, 'stats': search.stats.to_dict()})
+        return search
+
+    def search(self, search_id: str) -> Optional[_Search]:
+        with self._lock:
+            return self._searches.get(search_id)
+
+    def server_stats(self) -> dict:
+        with self._lock:
+            active = sum(1 for search in self._searches.values() if search.state == "running")
+        return {'uptime': time.time() - self.started, 'engine': self.engine,
+                'searches_run': self.searches_run, 'active_searches': active,
+                'cache_bytes': self.cache.size, 'cache_max_bytes': self.cache.max_bytes,
+                'index': self.index.index_path if self.index is not None else None,
+                'corpus': self.corpus_path}
+
+    def reindex(self, folders: Sequence[str], use_hash: bool = False) -> dict:
+        if self.index is None:
+            raise ValueError("The server was started without an index")
+        update = self.index.update(folders, use_hash=use_hash)
+        if self.corpus is not None and update.modified:
+            corpus = TextCorpus.build(self.index, self.corpus_path)
+            with self._lock:
+                previous, self.corpus = self.corpus, corpus
+            # Searches still scanning the old corpus keep its mapping until they finish
+            previous.retire()
+        return dataclasses.asdict(update)
+
+    def close(self):
+        with self._lock:
+            for search in self._searches.values():
+                search.cancel.set()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        if self._manager is not None:
+            self._manager.shutdown()
+        if self.cache_path:
+            try:
+                self.cache.save(self.cache_path)
+            except OSError as e:
+                print(f"Failed to save the query cache: {e}")
+        if self.index is not None:
+            self.index.close()
+        if self.corpus is not None:
+            self.corpus.retire()
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    # Set on the handler subclass created by make_http_server
+    search_server: SearchServer = None
+    token: Optional[str] = None
+
+    def log_message(self, format, *args):
+        # Keep the console quiet; errors are reported in the responses
+        pass
+
+    def _send_json(self, status: int, body: dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _authorized(self) -> bool:
+        if self.token and not hmac.compare_digest(self.headers.get("X-Auth-Token", ""), self.token):
+            self._send_json(401, {'error': 'missing or wrong X-Auth-Token'})
+            return False
+        return True
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(body, dict):
+            raise ValueError("The request body must be a JSON object")
+        return body
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        parts = self.path.strip("/").split("/")
+        if parts == ["stats"]:
+            self._send_json(200, self.search_server.server_stats())
+        elif len(parts) == 2 and parts[0] == "searches":
+            search = self.search_server.search(parts[1])
+            if search is None:
+                self._send_json(404, {'error': 'unknown search'})
+            else:
+                self._send_json(200, {'search_id': search.search_id, 'state': search.state,
+                                      'started': search.started, 'stats': search.stats.to_dict()})
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        parts = self.path.strip("/").split("/")
+        try:
+            body = self._read_json()
+            if parts == ["search"]:
+                self._stream_search(body)
+            elif len(parts) == 3 and parts[0] == "searches" and parts[2] == "cancel":
+                search = self.search_server.search(parts[1])
+                if search is None:
+                    self._send_json(404, {'error': 'unknown search'})
+                else:
+                    search.cancel.set()
+                    self._send_json(200, {'search_id': search.search_id, 'state': search.state})
+            elif parts == ["reindex"]:
+                update = self.search_server.reindex(body.get("folders", []), bool(body.get("use_hash")))
+                self._send_json(200, update)
+            else:
+                self._send_json(404, {'error': 'not found'})
+        except (ValueError, TypeError, KeyError) as e:
+            self._send_json(400, {'error': str(e)})
+
+    def _stream_search(self, body: dict):
+        folders = body["folders"]
+        patterns = body["patterns"]
+        if isinstance(folders, str):
+            folders = [folders]
+        options = options_from_dict(body.get("options", {}))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+
+        def emit(event):
+            self.wfile.write(json.dumps(event).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+        self.search_server.run_search(folders, patterns, options, emit)
+
+
+def make_http_server(search_server: SearchServer, host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+                     token: Optional[str] = None) -> ThreadingHTTPServer:
+    handler = type("RequestHandler", (_RequestHandler,), {'search_server': search_server, 'token': token})
+    http_server = ThreadingHTTPServer((host, port), handler)
+    http_server.daemon_threads = True
+    return http_server
+
+
+class SearchClient:
+    """Client for a running `pdf_server`; `search` mirrors `pdf_search.iter_search_pdfs`."""
+
+    def __init__(self, url: str, token: Optional[str] = None, timeout: float = 30.0):
+        self.url = url.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str, body: Optional[dict] = None, timeout: Optional[float] = None):
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        request = urllib.request.Request(self.url + path, data=data, method=method)
+        request.add_header("Content-Type", "application/json")
+        if self.token:
+            request.add_header("X-Auth-Token", self.token)
+        return urllib.request.urlopen(request, timeout=timeout)
+
+    def _call(self, method: str, path: str, body: Optional[dict] = None) -> dict:
+        with self._request(method, path, body, self.timeout) as response:
+            return json.loads(response.read())
+
+    @staticmethod
+    def _read_events(response, events: "queue.Queue"):
+        """Put every line of `response` into `events`, then None, or the exception that ended it."""
+        try:
+            for line in response:
+                events.put(line)
+            events.put(None)
+        except Exception as e:
+            events.put(e)
+
+    def search(self, folders: Sequence[str], patterns: Sequence[str], options: Optional[SearchOptions] = None,
+               progress: Optional[Callable[[int, int], None]] = None, cancel=None,
+               stats: Optional[SearchStats] = None,
+               on_file: Optional[Callable[[FileStats], None]] = None) -> Iterator[Tuple[str, MatchList]]:
+        """Yield `(path, matches)` for every file with matches as the server finds them.
+
+        Setting `cancel` cancels the search on the server. `stats` is filled
+        in from the server's statistics when the search ends, and `on_file`
+        is called before each file is yielded with a `FileStats` holding its
+        match count and `duplicate_of`. Raises RuntimeError if the search
+        fails on the server.
+        """
+        options = options or SearchOptions()
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        body = {'folders': list(folders), 'patterns': list(patterns), 'options': dataclasses.asdict(options)}
+        search_id = None
+        # No read timeout: a single large file can take a while without events.
+        # The response is read in another thread, so `cancel` is noticed meanwhile.
+        events: "queue.Queue" = queue.Queue()
+        with self._request("POST", "/search", body) as response:
+            threading.Thread(target=self._read_events, args=(response, events), daemon=True).start()
+            while True:
+                try:
+                    line = events.get(timeout=CANCEL_POLL_INTERVAL)
+                except queue.Empty:
+                    line = ""
+                if cancel is not None and cancel.is_set() and search_id is not None:
+                    self.cancel(search_id)
+                    search_id = None
+                if line is None:
+                    return
+                if isinstance(line, Exception):
+                    raise line
+                if not line:
+                    continue
+                event = json.loads(line)
+                kind = event["event"]
+                if kind == "started":
+                    search_id = event["search_id"]
+                elif kind == "progress":
+                    if progress is not None:
+                        progress(event["done"], event["total"])
+                elif kind == "file":
+                    if on_file is not None:
+                        duplicate_of = event.get("duplicate_of", "")
+                        on_file(FileStats(event["file"], status="duplicate" if duplicate_of else "scanned",
+                                          matches=len(event["matches"]), duplicate_of=duplicate_of))
+                    yield event["file"], matches_from_records(event["patterns"], event["first_match_id"],
+                                                              event["matches"])
+                elif kind == "done":
+                    if stats is not None:
+                        received = stats_from_dict(event["stats"])
+                        for field in dataclasses.fields(SearchStats):
+                            setattr(stats, field.name, getattr(received, field.name))
+                    return
+                elif kind == "error":
+                    raise RuntimeError(event["message"])
+
+    def cancel(self, search_id: str) -> dict:
+        return self._call("POST", f"/searches/{search_id}/cancel", {})
+
+    def search_status(self, search_id: str) -> dict:
+        return self._call("GET", f"/searches/{search_id}")
+
+    def stats(self) -> dict:
+        return self._call("GET", "/stats")
+
+    def reindex(self, folders: Sequence[str], use_hash: bool = False) -> dict:
+        return self._call("POST", "/reindex", {'folders': list(folders), 'use_hash': use_hash})
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='PDF multifile search - search server')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='Address to listen on; use 0.0.0.0 only on trusted networks')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='Port to listen on')
+    parser.add_argument('--token', default=os.environ.get('PDF_SEARCH_TOKEN'),
+                        help='Shared secret clients must send (default: $PDF_SEARCH_TOKEN)')
+    parser.add_argument('--index', help='Full-text index to consult and update')
+    parser.add_argument('--corpus', help='Memory-mapped page-text corpus to scan; rebuilt from the index '
+                                         'at startup and after every reindex when --index is given')
+    parser.add_argument('--cache-file', help='Load the query cache from and save it to this file')
+    parser.add_argument('--cache-mb', type=int, default=256, help='Size of the query cache in MiB')
+    parser.add_argument('--engine', choices=('threads', 'processes'), default='threads', help='Worker pool type')
+    parser.add_argument('--workers', type=int, help='Number of search workers')
+    args = parser.parse_args(argv)
+
+    cache_bytes = args.cache_mb * 1024 * 1024
+    cache = QueryCache.load(args.cache_file, cache_bytes) if args.cache_file else QueryCache(cache_bytes)
+    search_server = SearchServer(args.index, cache, args.cache_file, args.engine, args.workers,
+                                 args.corpus)
+    http_server = make_http_server(search_server, args.host, args.port, args.token)
+    print(f"Serving PDF search on http://{args.host}:{http_server.server_address[1]}", file=sys.stderr)
+    try:
+        http_server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        http_server.server_close()
+        search_server.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""Character-level page text for the PDF multifile searcher.
+
+`PageText` flattens a page's text into one string and remembers the bounding
+box and line of every character, so a match found by a regular expression
+over the string can be mapped back to rectangles on the page. `WordLookup`
+answers "which words lie in this rectangle" for context snippets.
+"""
+from typing import List, Optional, Tuple
+import pymupdf as fitz
+
+# (x0, y0, x1, y1)
+Box = Tuple[float, float, float, float]
+
+
+class PageText:
+    """The text of one page with a bounding box for every character.
+
+    Lines are joined with "\\n"; those separators have no box. `char_lines`
+    holds the line number of every character so a span can be split into one
+    rectangle per line, as `page.search_for` does.
+    """
+
+    def __init__(self, text: str, char_boxes: List[Optional[Box]], char_lines: List[int]):
+        self.text = text
+        self.char_boxes = char_boxes
+        self.char_lines = char_lines
+
+    @classmethod
+    def from_page(cls, page, textpage=None) -> "PageText":
+        """Build the character layout of a page, reusing `textpage` if given."""
+        pieces: List[str] = []
+        char_boxes: List[Optional[Box]] = []
+        char_lines: List[int] = []
+        line_number = 0
+        layout = page.get_text("rawdict", textpage=textpage)
+        for block in layout.get("blocks", []):
+            for line in block.get("lines", []):
+                if pieces:
+                    pieces.append("\n")
+                    char_boxes.append(None)
+                    char_lines.append(line_number)
+                    line_number += 1
+                for span in line.get("spans", []):
+                    for char in span.get("chars", []):
+                        pieces.append(char["c"])
+                        char_boxes.append(tuple(char["bbox"]))
+                        char_lines.append(line_number)
+        return cls("".join(pieces), char_boxes, char_lines)
+
+    def rects_for_span(self, start: int, end: int) -> List[fitz.Rect]:
+        """Return one rectangle per line covered by the characters in [start, end)."""
+        rects: List[fitz.Rect] = []
+        current_line = None
+        for position in range(start, end):
+            box = self.char_boxes[position]
+            if box is None:
+                continue
+            if self.char_lines[position] != current_line:
+                current_line = self.char_lines[position]
+                rects.append(fitz.Rect(box))
+            else:
+                rects[-1] |= box
+        return rects
+
+
+class WordLookup:
+    """Spatial lookup of a page's words for building context snippets.
+
+    Words from `page.get_text("words")` are bucketed by vertical position, so
+    finding the words inside a context rectangle only looks at the few rows it
+    covers instead of re-walking the page layout like `page.get_textbox`.
+    """
+
+    def __init__(self, words: list, bucket_height: float = 20.0):
+        self.bucket_height = bucket_height
+        self._buckets = {}
+        for order, word in enumerate(words):
+            x0, y0, x1, y1, text = word[:5]
+            # Keep (block, line) so the snippet keeps its line breaks
+            line_key = (word[5], word[6]) if len(word) > 6 else (0, int(y0))
+            entry = (order, x0, y0, x1, y1, text, line_key)
+            for bucket in range(int(y0 // bucket_height), int(y1 // bucket_height) + 1):
+                self._buckets.setdefault(bucket, []).append(entry)
+
+    @classmethod
+    def from_page(cls, page, textpage=None) -> "WordLookup":
+        return cls(page.get_text("words", textpage=textpage))
+
+    def text_in(self, rect) -> str:
+        """Return the words intersecting `rect`, one output line per text line."""
+        x0, y0, x1, y1 = rect
+        found = {}
+        for bucket in range(int(y0 // self.bucket_height), int(y1 // self.bucket_height) + 1):
+            for entry in self._buckets.get(bucket, ()):
+                _, wx0, wy0, wx1, wy1, _, _ = entry
+                if wx0 < x1 and wx1 > x0 and wy0 < y1 and wy1 > y0:
+                    found[entry[0]] = entry
+        lines = []
+        current_line_key = None
+        for order in sorted(found):
+            entry = found[order]
+            if entry[6] != current_line_key:
+                current_line_key = entry[6]
+                lines.append([])
+            lines[-1].append(entry[5])
+        return "\n".join(" ".join(words) for words in lines)
@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_file_generator import generate_corpus  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def corpus_info(tmp_path_factory):
+    """A small synthetic corpus in nested folders, with some image-only pages."""
+    return generate_corpus(str(tmp_path_factory.mktemp("corpus")), file_count=12, pages_per_file=4,
+                           words_per_page=120, hit_rate=0.3, image_page_rate=0.1, depth=1, fanout=2, seed=1)
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""Search benchmarks for the PDF multifile searcher.
+
+Generates (or reuses) a synthetic corpus with `pdf_file_generator.generate_corpus`,
+runs the search once per engine (threads, processes, index, corpus, server)
+and reports, per engine:
+
+- files/s and pages/s over the whole search,
+- time to the first file with matches,
+- the time to build the index or corpus, and the phase timings the search
+  records in `SearchStats.phases` (discovery, opening, text extraction,
+  matching...; worker phases are summed over the workers),
+- peak resident memory of the run.
+
+Every run happens in a fresh process, so its peak memory is its own and not
+that of the runs before it.
+
+Each engine runs once per `--schedule` policy (see `pdf_schedule`), so the
+time to the first result and the total time of the policies can be compared.
+All runs must return identical matches; any difference is reported and
+makes the benchmark exit with status 1. For example:
+
+    python3 test/pdf_benchmark.py --files 500 --pages 10 --hit-rate 0.05
+    python3 test/pdf_benchmark.py --corpus /tmp/corpus --keep --engine threads --json
+    python3 test/pdf_benchmark.py --engine threads --schedule largest --schedule smallest --schedule path
+"""
+import argparse
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass, field, replace
+from typing import Dict, List, Optional
+
+TEST_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TEST_DIRECTORY))
+
+import pymupdf as fitz
+from pdf_file_generator import DEFAULT_HIT_TERM, generate_corpus
+from pdf_discovery import discover_pdf_files
+from pdf_index import PDFIndex
+from pdf_corpus import TextCorpus
+from pdf_models import SearchOptions, SearchStats
+from pdf_schedule import SCHEDULES
+from pdf_search import iter_search_pdfs
+from pdf_server import SearchClient, SearchServer, make_http_server
+
+# Search engines plus the thread engine with a freshly built "index" or text
+# "corpus", and through a local search "server"
+BENCHMARK_ENGINES = ("threads", "processes", "index", "corpus", "server")
+
+
+@dataclass
+class BenchmarkResult:
+    engine: str
+    schedule: str
+    files: int
+    pages: int
+    matches: int
+    seconds: float
+    first_result_seconds: Optional[float]
+    index_build_seconds: Optional[float] = None
+    # Wall seconds of each phase recorded by the search
+    phases: Dict[str, float] = field(default_factory=dict)
+    peak_rss_mb: Optional[float] = None
+
+    @property
+    def files_per_second(self) -> float:
+        return self.files / self.seconds if self.seconds else 0.0
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.pages / self.seconds if self.seconds else 0.0
+
+    def to_dict(self) -> dict:
+        record = asdict(self)
+        record["files_per_second"] = self.files_per_second
+        record["pages_per_second"] = self.pages_per_second
+        return record
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident memory of this process or of its largest finished worker, in MiB."""
+    try:
+        import resource
+    except ImportError:
+        # Not available on Windows
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def match_signature(results) -> List[tuple]:
+    """Engine-independent description of a search result, for comparisons."""
+    signature = []
+    for file_path, matches in results.items():
+        for match in matches:
+            location = tuple(round(value, 1) for value in match.location)
+            signature.append((file_path, match.page_number, match.pattern, location, match.context))
+    return sorted(signature)
+
+
+def run_engine(engine: str, corpus: str, patterns: List[str], options: SearchOptions,
+               file_count: int, page_count: int, index_path: str):
+    """Search `corpus` with one engine; return (BenchmarkResult, match signature).
+
+    Meant to run in a process of its own, see `run_isolated`.
+    """
+    index_build_seconds = None
+    index = None
+    text_corpus = None
+    search_server = None
+    http_server = None
+    if engine in ("index", "corpus"):
+        if os.path.exists(index_path):
+            os.remove(index_path)
+        index = PDFIndex(index_path)
+        start = time.perf_counter()
+        index.update([corpus])
+        if engine == "corpus":
+            text_corpus = TextCorpus.build(index, index_path + ".corpus")
+            index.close()
+            index = None
+        index_build_seconds = time.perf_counter() - start
+        options = replace(options, engine="threads")
+    elif engine == "server":
+        options = replace(options, engine="threads")
+        search_server = SearchServer(max_workers=options.max_workers)
+        http_server = make_http_server(search_server, port=0)
+        threading.Thread(target=http_server.serve_forever, daemon=True).start()
+    else:
+        options = replace(options, engine=engine)
+
+    results = {}
+    first_result_seconds = None
+    stats = SearchStats()
+    start = time.perf_counter()
+    try:
+        if http_server is not None:
+            client = SearchClient(f"http://127.0.0.1:{http_server.server_address[1]}")
+            found = client.search([corpus], patterns, options, stats=stats)
+        else:
+            found = iter_search_pdfs([corpus], patterns, index=index, options=options, stats=stats,
+                                     corpus=text_corpus)
+        for file_path, matches in found:
+            if matches:
+                if first_result_seconds is None:
+                    first_result_seconds = time.perf_counter() - start
+                results[file_path] = matches
+    finally:
+        if index is not None:
+            index.close()
+        if text_corpus is not None:
+            text_corpus.close()
+            os.remove(index_path + ".corpus")
+        if http_server is not None:
+            http_server.shutdown()
+            http_server.server_close()
+            search_server.close()
+    seconds = time.perf_counter() - start
+
+    result = BenchmarkResult(engine=engine, schedule=stats.schedule or options.schedule, files=file_count,
+                             pages=page_count, matches=sum(len(matches) for matches in results.values()),
+                             seconds=seconds, first_result_seconds=first_result_seconds,
+                             index_build_seconds=index_build_seconds,
+                             phases={name: wall for name, (wall, _) in stats.phases.items()},
+                             peak_rss_mb=peak_rss_mb())
+    return result, match_signature(results)
+
+
+def run_isolated(*args):
+    """Call `run_engine` in a new process, so memory and warm caches do not carry over between runs."""
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(run_engine, *args).result()
+
+
+def _format_seconds(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.3f}"
+
+
+def print_table(results: List[BenchmarkResult]):
+    header = ("engine", "schedule", "files", "pages", "matches", "files/s", "pages/s", "first(s)", "search(s)",
+              "index(s)", "peak MiB", "phases(s)")
+    rows = [header]
+    for result in results:
+        rows.append((result.engine, result.schedule, str(result.files), str(result.pages), str(result.matches),
+                     f"{result.files_per_second:.1f}", f"{result.pages_per_second:.1f}",
+                     _format_seconds(result.first_result_seconds), _format_seconds(result.seconds),
+                     _format_seconds(result.index_build_seconds),
+                     "-" if result.peak_rss_mb is None else f"{result.peak_rss_mb:.0f}",
+                     " ".join(f"{name} {wall:.3f}" for name, wall in result.phases.items())))
+    widths = [max(len(row[column]) for row in rows) for column in range(len(header))]
+    for row in rows:
+        # The phases are left-aligned in the last column
+        print("  ".join(value.rjust(width) for value, width in zip(row[:-1], widths)) + "  " + row[-1])
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='PDF multifile search - benchmarks')
+    parser.add_argument('--corpus', help='Corpus folder; generated if it does not exist '
+                                         '(default: a temporary folder)')
+    parser.add_argument('--keep', action='store_true', help='Keep a generated temporary corpus')
+    parser.add_argument('--files', type=int, default=200, help='Number of files to generate')
+    parser.add_argument('--pages', type=int, default=5, help='Pages per generated file')
+    parser.add_argument('--words', type=int, default=300, help='Words per generated page')
+    parser.add_argument('--hit-rate', type=float, default=0.1, help='Fraction of pages containing the hit term')
+    parser.add_argument('--image-pages', type=float, default=0.0, help='Fraction of image-only (scanned) pages')
+    parser.add_argument('--depth', type=int, default=0, help='Levels of nested folders')
+    parser.add_argument('--fanout', type=int, default=3, help='Subfolders per folder')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed of the generated corpus')
+    parser.add_argument('-p', '--pattern', action='append',
+                        help=f'Pattern to search for; repeatable (default: {DEFAULT_HIT_TERM})')
+    parser.add_argument('--engine', action='append', choices=BENCHMARK_ENGINES,
+                        help='Engine to benchmark; repeatable (default: all)')
+    parser.add_argument('--schedule', action='append', choices=SCHEDULES,
+                        help=f'File order to benchmark; repeatable (default: {SearchOptions.schedule})')
+    parser.add_argument('--workers', type=int, help='Maximum number of search workers')
+    parser.add_argument('--regex', action='store_true', help='Treat patterns as regular expressions')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    patterns = args.pattern or [DEFAULT_HIT_TERM]
+    engines = args.engine or list(BENCHMARK_ENGINES)
+    schedules = args.schedule or [SearchOptions.schedule]
+    options = SearchOptions(max_workers=args.workers, regex=args.regex)
+
+    work_directory = tempfile.mkdtemp(prefix="pdf_benchmark_")
+    corpus = args.corpus or os.path.join(work_directory, "corpus")
+    try:
+        if not os.path.isdir(corpus):
+            start = time.perf_counter()
+            info = generate_corpus(corpus, file_count=args.files, pages_per_file=args.pages,
+                                   words_per_page=args.words, hit_rate=args.hit_rate,
+                                   image_page_rate=args.image_pages, depth=args.depth, fanout=args.fanout,
+                                   seed=args.seed)
+            print(f"Generated {len(info.files)} files, {info.page_count} pages "
+                  f"({len(info.hit_pages)} with hits) in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+        pdf_files = discover_pdf_files([corpus])
+        page_count = 0
+        for pdf_file in pdf_files:
+            with fitz.open(pdf_file) as doc:
+                page_count += doc.page_count
+
+        results = []
+        reference = None
+        consistent = True
+        for engine in engines:
+            for schedule in schedules:
+                result, signature = run_isolated(engine, corpus, patterns, replace(options, schedule=schedule),
+                                                 len(pdf_files), page_count,
+                                                 os.path.join(work_directory, "index.sqlite"))
+                results.append(result)
+                run = f"{engine}/{schedule}"
+                if reference is None:
+                    reference = (run, signature)
+                elif signature != reference[1]:
+                    consistent = False
+                    print(f"Run '{run}' returned {len(signature)} matches that differ from "
+                          f"the {len(reference[1])} of '{reference[0]}'", file=sys.stderr)
+
+        if args.json:
+            print(json.dumps({"consistent": consistent, "results": [result.to_dict() for result in results]},
+                             indent=2))
+        else:
+            print_table(results)
+            print("All runs returned identical matches" if consistent else "ENGINE RESULTS DIFFER")
+        return 0 if consistent else 1
+    finally:
+        index_path = os.path.join(work_directory, "index.sqlite")
+        if os.path.exists(index_path):
+            os.remove(index_path)
+        if args.keep and not args.corpus:
+            print(f"Corpus kept in {corpus}", file=sys.stderr)
+        else:
+            shutil.rmtree(work_directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,54 +1,141 @@
-import fitz  # PyMuPDF
-
-long_texts = \
-    ["""
-    In the distant realm of Zephyria, where the crystalline rivers sang melodies to the emerald forests, a peculiar event unfolded beneath the azure sky. Luminescent creatures known as Ethereal Wisps danced in a mesmerizing display, weaving trails of iridescence through the air. The Whispering Willows, ancient sentinels of the land, swayed in harmony, sharing secrets carried by the winds for centuries.
-    Meanwhile, on the outskirts of the Enchanted Glade, a curious inventor named Elara tinkered with arcane contraptions that hummed with latent magic. Elara, with her copper goggles gleaming, sought to unveil the mysteries of a forgotten celestial alignment. Legends spoke of a cosmic conjunction that could unlock the hidden powers of the Starlight Nexus, an ethereal nexus rumored to grant unimaginable wisdom.
-    As dusk settled, casting a kaleidoscope of hues across the horizon, a lone bard named Seraphina emerged from the Shadowed Vale. Seraphina carried a lute carved from the wood of the Eldertree, a relic believed to resonate with the pulse of the earth itself. Her melodic tunes had the power to mend broken spirits and stir ancient memories.
-    The town of Astral Haven bustled with activity as its residents prepared for the impending Celestial Gala, an event held once every millennium. The grandiose gala was rumored to be the key to unlocking the dormant energies within the Starlight Nexus. Elders passed down tales of a chosen one, destined to navigate the celestial labyrinth and awaken the nexus's latent potential.
-    Unbeknownst to the inhabitants of Zephyria, an enigmatic figure named Orion observed from the Astral Observatory, cloaked in the cosmic glow of constellations. Orion, a keeper of cosmic balance, sensed a disturbance in the celestial energies. Whispers of an ancient prophecy echoed through the astral winds, foretelling a convergence that could shape the destiny of Zephyria.
-    As the first stars began to twinkle in the indigo sky, Elara, Seraphina, and Orion found their fates entwined in the celestial dance, bound by threads of destiny that shimmered like stardust. The journey to unravel the secrets of the Starlight Nexus had begun, and the pages of Zephyria's untold story unfurled with each passing moment.
-    """
-    , """Page 1:
-    Lorem ipsum dolor sit amet, consectetur adipiscing elit. Integer nec odio. Praesent libero. Sed cursus ante dapibus diam. Sed nisi.
-    Nulla quis sem at nibh elementum imperdiet. Duis sagittis ipsum. Praesent mauris. Fusce nec tellus sed augue semper porta.
-    Mauris massa. Vestibulum lacinia arcu eget nulla. Class aptent taciti sociosqu ad litora torquent per conubia nostra, per inceptos himenaeos.
-    Curabitur sodales ligula in libero. Sed dignissim lacinia nunc. Curabitur tortor.
-    Page 2:
-    In hac habitasse platea dictumst. Integer sagittis neque a tortor. Integer aliquam velit ac mauris. Integer in mauris eu nibh euismod gravida.
-    Duis ac tellus et risus vulputate vehicula. Donec lobortis risus a elit. Etiam tempor. Ut ullamcorper, ligula eu tempor congue, eros est euismod turpis,
-    id tincidunt sapien risus a quam. Maecenas fermentum consequat mi. Donec fermentum. Pellentesque malesuada nulla a mi. Duis sapien sem,
-    aliquet nec, commodo eget, consequat quis, neque.
-    Page 3:
-    Aliquam faucibus, elit ut dictum aliquet, felis nisl adipiscing sapien, sed malesuada diam lacus eget erat. Cras mollis scelerisque nunc.
-    Nullam arcu. Aliquam consequat. Curabitur augue lorem, dapibus quis, laoreet et, pretium ac, nisi. Aenean magna nisl, mollis quis, molestie eu,
-    feugiat in, orci. In hac habitasse platea dictumst. Ut ac justo sit amet dolor ornare cursus. Curabitur blandit mollis lacus.
-    """
-    , """y"""
-    ]
-
-def generate_pdf(file_path, num_pages):
-    # Create a PDF document
-    doc = fitz.open()
-
-    # Add a page
-    page = doc.new_page()
-
-    tw = fitz.TextWriter(page.rect)
-    tw.append(pos=(50,50), text=long_texts[0], fontsize=11)
-    tw.write_text(page)
-
-    # Save the document to the specified output path
-    doc.save(file_path)
-
-    # Close the document
-    doc.close()
-
-# Generate PDF with one page
-generate_pdf('file1.pdf', 1)
-
-# Generate PDF with three pages
-#generate_pdf('file2.pdf', 3)
-
-# Generate PDF with five pages
-#generate_pdf('file3.pdf', 5)
\ No newline at end of file
+"""Test PDF generators.
+
+`generate_pdf` writes a small sample file. `generate_corpus` writes a
+synthetic corpus of any size for benchmarks (see pdf_benchmark.py): file
+count, pages per file, words per page, how often the hit term occurs,
+image-only ("scanned") pages and nested folders are all configurable, and the
+same seed always produces the same corpus.
+"""
+import os
+import random
+from dataclasses import dataclass, field
+from typing import List
+import pymupdf as fitz
+
+long_texts = \
+    ["""
+    In the distant realm of Zephyria, where the crystalline rivers sang melodies to the emerald forests, a peculiar event unfolded beneath the azure sky. Luminescent creatures known as Ethereal Wisps danced in a mesmerizing display, weaving trails of iridescence through the air. The Whispering Willows, ancient sentinels of the land, swayed in harmony, sharing secrets carried by the winds for centuries.
+    Meanwhile, on the outskirts of the Enchanted Glade, a curious inventor named Elara tinkered with arcane contraptions that hummed with latent magic. Elara, with her copper goggles gleaming, sought to unveil the mysteries of a forgotten celestial alignment. Legends spoke of a cosmic conjunction that could unlock the hidden powers of the Starlight Nexus, an ethereal nexus rumored to grant unimaginable wisdom.
+    As dusk settled, casting a kaleidoscope of hues across the horizon, a lone bard named Seraphina emerged from the Shadowed Vale. Seraphina carried a lute carved from the wood of the Eldertree, a relic believed to resonate with the pulse of the earth itself. Her melodic tunes had the power to mend broken spirits and stir ancient memories.
+    The town of Astral Haven bustled with activity as its residents prepared for the impending Celestial Gala, an event held once every millennium. The grandiose gala was rumored to be the key to unlocking the dormant energies within the Starlight Nexus. Elders passed down tales of a chosen one, destined to navigate the celestial labyrinth and awaken the nexus's latent potential.
+    Unbeknownst to the inhabitants of Zephyria, an enigmatic figure named Orion observed from the Astral Observatory, cloaked in the cosmic glow of constellations. Orion, a keeper of cosmic balance, sensed a disturbance in the celestial energies. Whispers of an ancient prophecy echoed through the astral winds, foretelling a convergence that could shape the destiny of Zephyria.
+    As the first stars began to twinkle in the indigo sky, Elara, Seraphina, and Orion found their fates entwined in the celestial dance, bound by threads of destiny that shimmered like stardust. The journey to unravel the secrets of the Starlight Nexus had begun, and the pages of Zephyria's untold story unfurled with each passing moment.
+    """
+    , """Page 1:
+    Lorem ipsum dolor sit amet, consectetur adipiscing elit. Integer nec odio. Praesent libero. Sed cursus ante dapibus diam. Sed nisi.
+    Nulla quis sem at nibh elementum imperdiet. Duis sagittis ipsum. Praesent mauris. Fusce nec tellus sed augue semper porta.
+    Mauris massa. Vestibulum lacinia arcu eget nulla. Class aptent taciti sociosqu ad litora torquent per conubia nostra, per inceptos himenaeos.
+    Curabitur sodales ligula in libero. Sed dignissim lacinia nunc. Curabitur tortor.
+    Page 2:
+    In hac habitasse platea dictumst. Integer sagittis neque a tortor. Integer aliquam velit ac mauris. Integer in mauris eu nibh euismod gravida.
+    Duis ac tellus et risus vulputate vehicula. Donec lobortis risus a elit. Etiam tempor. Ut ullamcorper, ligula eu tempor congue, eros est euismod turpis,
+    id tincidunt sapien risus a quam. Maecenas fermentum consequat mi. Donec fermentum. Pellentesque malesuada nulla a mi. Duis sapien sem,
+    aliquet nec, commodo eget, consequat quis, neque.
+    Page 3:
+    Aliquam faucibus, elit ut dictum aliquet, felis nisl adipiscing sapien, sed malesuada diam lacus eget erat. Cras mollis scelerisque nunc.
+    Nullam arcu. Aliquam consequat. Curabitur augue lorem, dapibus quis, laoreet et, pretium ac, nisi. Aenean magna nisl, mollis quis, molestie eu,
+    feugiat in, orci. In hac habitasse platea dictumst. Ut ac justo sit amet dolor ornare cursus. Curabitur blandit mollis lacus.
+    """
+    , """y"""
+    ]
+
+def generate_pdf(file_path, num_pages):
+    # Create a PDF document
+    doc = fitz.open()
+
+    # Add a page
+    page = doc.new_page()
+
+    tw = fitz.TextWriter(page.rect)
+    tw.append(pos=(50,50), text=long_texts[0], fontsize=11)
+    tw.write_text(page)
+
+    # Save the document to the specified output path
+    doc.save(file_path)
+
+    # Close the document
+    doc.close()
+
+
+DEFAULT_HIT_TERM = "zanzibar"
+
+
+@dataclass
+class CorpusInfo:
+    """What `generate_corpus` wrote."""
+    directory: str
+    files: List[str] = field(default_factory=list)
+    page_count: int = 0
+    text_page_count: int = 0
+    # Pages that contain the hit term, as (file path, page number)
+    hit_pages: List[tuple] = field(default_factory=list)
+
+
+def _corpus_folders(directory, depth, fanout):
+    folders = [directory]
+    level = [directory]
+    for _ in range(depth):
+        level = [os.path.join(parent, f"folder_{index}") for parent in level for index in range(fanout)]
+        folders.extend(level)
+    return folders
+
+
+def _page_text(rng, vocabulary, words_per_page, hit_term):
+    words = [rng.choice(vocabulary) for _ in range(words_per_page)]
+    if hit_term:
+        # Near the top, so it is never cut off when the text overflows the page
+        words[rng.randrange(min(len(words), 50))] = hit_term
+    return " ".join(words)
+
+
+def generate_corpus(directory, file_count=100, pages_per_file=5, words_per_page=300, hit_rate=0.1,
+                    image_page_rate=0.0, depth=0, fanout=3, hit_term=DEFAULT_HIT_TERM, seed=0) -> CorpusInfo:
+    """Write a synthetic PDF corpus under `directory` and describe it.
+
+    Each text page has `words_per_page` words drawn from the sample texts; a
+    page contains `hit_term` once with probability `hit_rate`. A page is
+    image-only (no text layer) with probability `image_page_rate`. Files are
+    spread round-robin over a folder tree `depth` levels deep with `fanout`
+    subfolders per folder.
+    """
+    rng = random.Random(seed)
+    vocabulary = sorted({word.strip(".,:;") for text in long_texts for word in text.split()} - {""})
+    vocabulary = [word for word in vocabulary if word.lower() != hit_term.lower()]
+    folders = _corpus_folders(directory, depth, fanout)
+    for folder in folders:
+        os.makedirs(folder, exist_ok=True)
+
+    info = CorpusInfo(directory)
+    for file_index in range(file_count):
+        file_path = os.path.join(folders[file_index % len(folders)], f"file_{file_index:06d}.pdf")
+        doc = fitz.open()
+        for page_number in range(pages_per_file):
+            page = doc.new_page()
+            if rng.random() < image_page_rate:
+                # A "scanned" page: one image and no text layer
+                pixmap = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 64, 64), False)
+                pixmap.clear_with(rng.randrange(256))
+                page.insert_image(page.rect, pixmap=pixmap)
+                continue
+            is_hit = rng.random() < hit_rate
+            text = _page_text(rng, vocabulary, words_per_page, hit_term if is_hit else None)
+            page.insert_textbox(page.rect + (50, 50, -50, -50), text, fontsize=9)
+            info.text_page_count += 1
+            if is_hit:
+                info.hit_pages.append((file_path, page_number))
+        doc.save(file_path)
+        doc.close()
+        info.files.append(file_path)
+        info.page_count += pages_per_file
+    return info
+
+
+if __name__ == "__main__":
+    # Generate PDF with one page
+    generate_pdf('file1.pdf', 1)
+
+    # Generate PDF with three pages
+    #generate_pdf('file2.pdf', 3)
+
+    # Generate PDF with five pages
+    #generate_pdf('file3.pdf', 5)
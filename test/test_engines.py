@@ -0,0 +1,139 @@
+"""Every engine and search mode must find exactly what a plain sequential search finds."""
+import os
+import shutil
+import threading
+from dataclasses import replace
+
+import pymupdf as fitz
+import pytest
+
+from pdf_cache import QueryCache
+from pdf_corpus import TextCorpus
+from pdf_file_generator import DEFAULT_HIT_TERM, generate_corpus
+from pdf_index import PDFIndex
+from pdf_models import SearchOptions
+from pdf_search import search_pdfs
+from pdf_server import SearchClient, SearchServer, make_http_server
+
+MODES = {
+    "literal": ([DEFAULT_HIT_TERM], SearchOptions()),
+    "several patterns": ([DEFAULT_HIT_TERM, "celestial nexus", "Orion"], SearchOptions()),
+    "regex": ([r"zan\w+", r"(\w)\1ing"], SearchOptions(regex=True)),
+    "case sensitive": (["Orion", "orion"], SearchOptions(case_sensitive=True)),
+    "whole word": (["nexus"], SearchOptions(whole_word=True)),
+    "query": ([f"{DEFAULT_HIT_TERM} OR (Elara AND NOT Orion)"], SearchOptions(query=True)),
+    "near query": (["Elara NEAR/8 Orion"], SearchOptions(query=True)),
+    "document query": ([f"{DEFAULT_HIT_TERM} AND Seraphina"], SearchOptions(query=True, query_scope="document")),
+    "match limits": ([DEFAULT_HIT_TERM, "the"], SearchOptions(max_matches_per_file=3)),
+}
+# The reference: one worker, files in path order, one task per file, no shortcuts
+SEQUENTIAL = dict(engine="threads", max_workers=1, shard_pages=None, dedupe=False, schedule="path")
+
+
+@pytest.fixture(scope="module")
+def engine_corpus(tmp_path_factory):
+    """A corpus with a long document, image-only pages and a copy of one file."""
+    directory = str(tmp_path_factory.mktemp("engines"))
+    info = generate_corpus(directory, file_count=10, pages_per_file=6, words_per_page=150, hit_rate=0.3,
+                           image_page_rate=0.1, depth=1, fanout=2, seed=7)
+    generate_corpus(os.path.join(directory, "long"), file_count=1, pages_per_file=40, words_per_page=150,
+                    hit_rate=0.3, seed=8)
+    shutil.copy(info.files[0], os.path.join(directory, "copy_of_first.pdf"))
+    return directory
+
+
+def signature(results):
+    """Engine-independent description of a search result."""
+    return sorted((file_path, match.page_number, match.pattern, tuple(round(value, 1) for value in match.location),
+                   match.context)
+                  for file_path, matches in results.items() for match in matches)
+
+
+def sequential(directory, patterns, options):
+    return signature(search_pdfs(directory, patterns, options=replace(options, **SEQUENTIAL)))
+
+
+@pytest.fixture(scope="module")
+def index_and_corpus(engine_corpus, tmp_path_factory):
+    work = tmp_path_factory.mktemp("index")
+    index = PDFIndex(str(work / "index.sqlite"))
+    index.update([engine_corpus])
+    text_corpus = TextCorpus.build(index, str(work / "corpus.bin"))
+    yield index, text_corpus
+    text_corpus.close()
+    index.close()
+
+
+@pytest.fixture(scope="module", params=["threads", "processes"])
+def search_client(request):
+    search_server = SearchServer(engine=request.param, max_workers=2)
+    http_server = make_http_server(search_server, port=0)
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+    yield SearchClient(f"http://127.0.0.1:{http_server.server_address[1]}")
+    http_server.shutdown()
+    http_server.server_close()
+    search_server.close()
+
+
+def test_literal_reference_matches_search_for(engine_corpus):
+    """The reference itself agrees with a loop over `page.search_for`."""
+    expected = []
+    for folder, _, names in os.walk(engine_corpus):
+        for name in names:
+            with fitz.open(os.path.join(folder, name)) as doc:
+                for page in doc:
+                    expected.extend((os.path.join(folder, name), page.number,
+                                     tuple(round(value, 1) for value in rect))
+                                    for rect in page.search_for(DEFAULT_HIT_TERM))
+    found = [(path, page, location) for path, page, _, location, _ in
+             sequential(engine_corpus, [DEFAULT_HIT_TERM], SearchOptions())]
+    assert found == sorted(expected) and found
+
+
+ENGINES = {
+    "threads": dict(engine="threads", max_workers=4),
+    "processes": dict(engine="processes", max_workers=2),
+    "sharded": dict(engine="threads", max_workers=4, shard_pages=4, max_in_flight=3),
+    "sharded processes": dict(engine="processes", max_workers=2, shard_pages=7),
+    "smallest first": dict(schedule="smallest", max_workers=3),
+}
+
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("engine", ENGINES)
+def test_engines(engine_corpus, mode, engine):
+    patterns, options = MODES[mode]
+    results = search_pdfs(engine_corpus, patterns, options=replace(options, **ENGINES[engine]))
+    assert signature(results) == sequential(engine_corpus, patterns, options)
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_index_and_corpus(engine_corpus, index_and_corpus, mode):
+    patterns, options = MODES[mode]
+    index, text_corpus = index_and_corpus
+    expected = sequential(engine_corpus, patterns, options)
+    assert signature(search_pdfs(engine_corpus, patterns, index=index, options=options)) == expected
+    assert signature(search_pdfs(engine_corpus, patterns, options=options, corpus=text_corpus)) == expected
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_cache(engine_corpus, mode):
+    patterns, options = MODES[mode]
+    expected = sequential(engine_corpus, patterns, options)
+    cache = QueryCache()
+    assert signature(search_pdfs(engine_corpus, patterns, options=options, cache=cache)) == expected
+    assert signature(search_pdfs(engine_corpus, patterns, options=options, cache=cache)) == expected
+
+
+def test_cache_refines_a_previous_query(engine_corpus):
+    cache = QueryCache()
+    search_pdfs(engine_corpus, "the", cache=cache)
+    refined = search_pdfs(engine_corpus, "the celestial", cache=cache)
+    assert signature(refined) == sequential(engine_corpus, ["the celestial"], SearchOptions())
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_server(engine_corpus, search_client, mode):
+    patterns, options = MODES[mode]
+    results = dict(search_client.search([engine_corpus], patterns, options))
+    assert signature(results) == sequential(engine_corpus, patterns, options)
@@ -0,0 +1,28 @@
+import os
+import shutil
+
+from pdf_cli import EXIT_ERROR, EXIT_MATCH, EXIT_NO_MATCH, main
+
+TEST_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_folder_a")
+
+
+def test_exit_status_follows_grep(tmp_path, capsys):
+    assert main(["-f", TEST_FOLDER, "-p", "Zephyria"]) == EXIT_MATCH
+    assert main(["-f", TEST_FOLDER, "-p", "no such words anywhere"]) == EXIT_NO_MATCH
+    capsys.readouterr()
+
+    missing = str(tmp_path / "missing")
+    assert main(["-f", missing, "-p", "Zephyria"]) == EXIT_ERROR
+    assert missing in capsys.readouterr().err
+
+
+def test_unreadable_files_are_errors(tmp_path, capsys):
+    for name in os.listdir(TEST_FOLDER):
+        if name.endswith(".pdf"):
+            shutil.copy(os.path.join(TEST_FOLDER, name), str(tmp_path))
+    broken = tmp_path / "broken.pdf"
+    broken.write_bytes(b"not a pdf")
+    assert main(["-f", str(tmp_path), "-p", "Zephyria", "--format", "tsv"]) == EXIT_ERROR
+    captured = capsys.readouterr()
+    assert "Zephyria" in captured.out
+    assert str(broken) in captured.err
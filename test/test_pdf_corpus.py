@@ -0,0 +1,34 @@
+import pytest
+
+from pdf_corpus import TextCorpus
+from pdf_file_generator import DEFAULT_HIT_TERM
+from pdf_index import PDFIndex
+from pdf_models import SearchOptions
+
+
+@pytest.fixture
+def text_corpus(corpus_info, tmp_path):
+    with PDFIndex(str(tmp_path / "index.sqlite")) as index:
+        index.update([corpus_info.directory])
+        corpus = TextCorpus.build(index, str(tmp_path / "corpus.bin"))
+    yield corpus
+    corpus.close()
+
+
+def test_candidate_pages_hold_every_hit(corpus_info, text_corpus):
+    candidates = text_corpus.candidate_pages([DEFAULT_HIT_TERM], corpus_info.files, SearchOptions())
+    assert set(candidates) == set(corpus_info.files)
+    for file_path, page_number in corpus_info.hit_pages:
+        assert page_number in candidates[file_path]
+    assert text_corpus.page_counts(corpus_info.files[:2]) == {path: 4 for path in corpus_info.files[:2]}
+
+
+def test_retired_corpus_closes_after_the_last_search(corpus_info, text_corpus):
+    text_corpus.acquire()
+    text_corpus.acquire()
+    text_corpus.retire()
+    text_corpus.release()
+    # Still usable by the remaining search
+    assert text_corpus.candidate_pages([DEFAULT_HIT_TERM], corpus_info.files, SearchOptions())
+    text_corpus.release()
+    assert text_corpus._map is None
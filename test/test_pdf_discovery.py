@@ -0,0 +1,63 @@
+import os
+import shutil
+
+import pdf_discovery
+from pdf_discovery import discover_pdf_files, find_duplicates
+
+
+def write(path, content=b"%PDF-1.4 test"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+def test_overlapping_roots_and_filters(tmp_path):
+    write(tmp_path / "a.pdf")
+    write(tmp_path / "notes.txt")
+    write(tmp_path / "sub" / "b.PDF")
+    write(tmp_path / "sub" / "deeper" / "c.pdf")
+    roots = [str(tmp_path), str(tmp_path / "sub")]
+    assert discover_pdf_files(roots) == sorted(
+        str(tmp_path / name) for name in ("a.pdf", "sub/b.PDF", "sub/deeper/c.pdf"))
+    assert discover_pdf_files([str(tmp_path)], max_depth=0) == [str(tmp_path / "a.pdf")]
+    assert discover_pdf_files([str(tmp_path)], exclude=["deeper"]) == [str(tmp_path / "a.pdf"),
+                                                                       str(tmp_path / "sub/b.PDF")]
+
+
+def test_files_without_inode_numbers_are_kept_apart(tmp_path, monkeypatch):
+    # DirEntry.stat() and os.stat report inode 0 on some Windows file systems
+    write(tmp_path / "a.pdf")
+    write(tmp_path / "sub" / "b.pdf")
+
+    class NoInode:
+        def __init__(self, stat):
+            self.stat = stat
+
+        def __getattr__(self, name):
+            return 0 if name == "st_ino" else getattr(self.stat, name)
+
+    real_stat = os.stat
+    monkeypatch.setattr(pdf_discovery.os, "stat", lambda path, *args, **kwargs: NoInode(real_stat(path)))
+    assert pdf_discovery._identity(str(tmp_path / "a.pdf"), NoInode(real_stat(tmp_path / "a.pdf"))) != \
+        pdf_discovery._identity(str(tmp_path / "sub" / "b.pdf"), NoInode(real_stat(tmp_path / "sub" / "b.pdf")))
+    assert len(discover_pdf_files([str(tmp_path)])) == 2
+
+
+def test_unreadable_roots_are_reported(tmp_path):
+    write(tmp_path / "a.pdf")
+    errors = []
+    missing = str(tmp_path / "missing")
+    found = discover_pdf_files([missing, str(tmp_path / "a.pdf"), str(tmp_path)],
+                               on_error=lambda path, reason: errors.append(path))
+    assert found == [str(tmp_path / "a.pdf")]
+    # A file given as a root cannot be listed either
+    assert sorted(errors) == sorted([missing, str(tmp_path / "a.pdf")])
+
+
+def test_find_duplicates(tmp_path):
+    write(tmp_path / "a.pdf", b"x" * 200000)
+    shutil.copy(tmp_path / "a.pdf", tmp_path / "b.pdf")
+    write(tmp_path / "c.pdf", b"x" * 199999 + b"y")
+    write(tmp_path / "d.pdf", b"small")
+    paths = [str(tmp_path / name) for name in ("a.pdf", "b.pdf", "c.pdf", "d.pdf")]
+    assert find_duplicates(paths) == {paths[1]: paths[0]}
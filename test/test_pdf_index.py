@@ -0,0 +1,121 @@
+import os
+import shutil
+import sqlite3
+import threading
+
+import pymupdf as fitz
+
+from pdf_file_generator import DEFAULT_HIT_TERM, generate_corpus
+from pdf_index import IndexWatcher, PDFIndex
+
+
+def test_update_and_candidate_pages(corpus_info, tmp_path):
+    with PDFIndex(str(tmp_path / "index.sqlite")) as index:
+        summary = index.update([corpus_info.directory])
+        assert sorted(summary.added) == sorted(corpus_info.files)
+        assert index.update([corpus_info.directory]).unchanged == len(corpus_info.files)
+        candidates = index.candidate_pages(DEFAULT_HIT_TERM, corpus_info.files)
+        hits = {}
+        for file_path, page_number in corpus_info.hit_pages:
+            hits.setdefault(file_path, []).append(page_number)
+        assert {path: pages for path, pages in candidates.items() if pages} == hits
+        assert index.page_counts(corpus_info.files) == {path: 4 for path in corpus_info.files}
+
+
+def test_index_with_word_boxes_is_rebuilt(corpus_info, tmp_path):
+    index_path = str(tmp_path / "old.sqlite")
+    with sqlite3.connect(index_path) as connection:
+        connection.execute("CREATE TABLE files (id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL,"
+                           " size INTEGER NOT NULL, mtime REAL NOT NULL, page_count INTEGER NOT NULL,"
+                           " content_hash TEXT)")
+        connection.execute("CREATE TABLE pages (id INTEGER PRIMARY KEY, file_id INTEGER NOT NULL,"
+                           " page_number INTEGER NOT NULL, words TEXT NOT NULL)")
+        stat = os.stat(corpus_info.files[0])
+        connection.execute("INSERT INTO files VALUES (1, ?, ?, ?, 1, NULL)",
+                           (corpus_info.files[0], stat.st_size, stat.st_mtime))
+        connection.execute("INSERT INTO pages VALUES (1, 1, 0, '[]')")
+    connection.close()
+    with PDFIndex(index_path) as index:
+        assert index.page_counts(corpus_info.files) == {}
+        assert len(index.update([corpus_info.directory]).added) == len(corpus_info.files)
+
+
+def write_pdf(path, text, mtime_offset=0):
+    """Replace `path` with a one-page PDF showing `text`, with its mtime moved by `mtime_offset` seconds."""
+    with fitz.open() as doc:
+        doc.new_page().insert_text((72, 72), text)
+        doc.save(path)
+    if mtime_offset:
+        stat = os.stat(path)
+        os.utime(path, (stat.st_atime, stat.st_mtime + mtime_offset))
+
+
+def indexed_paths(index):
+    return [path for path, _, _, _ in index.iter_files()]
+
+
+def test_update_handles_changed_removed_and_touched_files(tmp_path):
+    info = generate_corpus(str(tmp_path / "pdfs"), file_count=3, pages_per_file=2, words_per_page=40, seed=2)
+    changed, removed, touched = info.files
+    with PDFIndex(str(tmp_path / "index.sqlite")) as index:
+        assert sorted(index.update([info.directory], use_hash=True).added) == sorted(info.files)
+
+        write_pdf(changed, "Quokka sighting", mtime_offset=10)
+        os.remove(removed)
+        # New timestamp, same content
+        stat = os.stat(touched)
+        os.utime(touched, (stat.st_atime, stat.st_mtime + 10))
+        summary = index.update([info.directory], use_hash=True)
+        assert summary.changed == [changed]
+        assert summary.removed == [removed]
+        assert summary.added == [] and summary.failed == []
+        assert summary.unchanged == 1
+
+        assert indexed_paths(index) == sorted([changed, touched])
+        assert index.page_counts(info.files) == {changed: 1, touched: 2}
+        assert index.candidate_pages("quokka", [changed, touched]) == {changed: [0], touched: []}
+        assert index.is_current(touched)
+        assert index.update([info.directory], use_hash=True).unchanged == 2
+
+        # Without hashes a new timestamp means extracting the file again
+        stat = os.stat(touched)
+        os.utime(touched, (stat.st_atime, stat.st_mtime + 10))
+        assert index.update([info.directory]).changed == [touched]
+
+
+def test_files_outside_the_updated_folders_are_kept(tmp_path):
+    first = generate_corpus(str(tmp_path / "first"), file_count=1, pages_per_file=1, words_per_page=20, seed=3)
+    second = generate_corpus(str(tmp_path / "second"), file_count=1, pages_per_file=1, words_per_page=20, seed=4)
+    with PDFIndex(str(tmp_path / "index.sqlite")) as index:
+        index.update([first.directory, second.directory])
+        shutil.rmtree(second.directory)
+        assert index.update([first.directory]).removed == []
+        assert indexed_paths(index) == sorted(first.files + second.files)
+        assert index.update([first.directory, second.directory]).removed == second.files
+
+
+def test_index_watcher_picks_up_new_files(tmp_path):
+    info = generate_corpus(str(tmp_path / "pdfs"), file_count=1, pages_per_file=1, words_per_page=20, seed=5)
+    updates = []
+    updated = threading.Event()
+
+    def on_update(summary):
+        updates.append(summary)
+        updated.set()
+
+    with PDFIndex(str(tmp_path / "index.sqlite")) as index:
+        watcher = IndexWatcher(index, [info.directory], interval=0.05, on_update=on_update)
+        watcher.start()
+        try:
+            assert updated.wait(10)
+            assert updates[0].added == info.files
+            updated.clear()
+            new_file = os.path.join(info.directory, "new.pdf")
+            # Written elsewhere first, so the watcher never sees a partial file
+            write_pdf(str(tmp_path / "new.pdf"), "Quokka")
+            os.replace(str(tmp_path / "new.pdf"), new_file)
+            assert updated.wait(10)
+            assert updates[-1].added == [new_file]
+        finally:
+            watcher.stop(timeout=10)
+        assert index.candidate_pages("quokka", [new_file]) == {new_file: [0]}
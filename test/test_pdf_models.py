@@ -0,0 +1,89 @@
+import pickle
+import threading
+
+import pymupdf as fitz
+
+from pdf_models import FileStats, Match, MatchList, SearchStats
+
+
+def make_matches():
+    matches = MatchList(["alpha", "beta"], first_match_id=10)
+    matches.append(0, fitz.Rect(1, 2, 3, 4), fitz.Rect(0, 0, 50, 20), "the alpha", 0)
+    matches.append(2, (5, 6, 7, 8), (0, 30, 50, 40), "a beta", 1)
+    matches.append(2, (9, 10, 11, 12), (0, 30, 50, 40), "the alpha", 0)
+    return matches
+
+
+def test_index_returns_match_views():
+    matches = make_matches()
+    first = matches[0]
+    assert isinstance(first, Match)
+    assert first.match_id == 10
+    assert first.page_number == 0
+    assert first.location == fitz.Rect(1, 2, 3, 4)
+    assert first.context_location == fitz.Rect(0, 0, 50, 20)
+    assert first.context == "the alpha"
+    assert first.pattern == "alpha"
+    last = matches[-1]
+    assert last.match_id == 12
+    assert last.location == fitz.Rect(9, 10, 11, 12)
+
+
+def test_slice_and_iterate():
+    matches = make_matches()
+    assert [match.match_id for match in matches[1:]] == [11, 12]
+    assert [match.pattern for match in matches] == ["alpha", "beta", "alpha"]
+    assert [tuple(match.location) for match in matches] == [(1, 2, 3, 4), (5, 6, 7, 8), (9, 10, 11, 12)]
+    assert list(matches.page_numbers()) == [0, 2, 2]
+
+
+def test_extend_truncate_copy_and_pickle():
+    matches = make_matches()
+    combined = MatchList(matches.patterns)
+    combined.extend(matches)
+    combined.extend(matches)
+    assert len(combined) == 6
+    assert combined[4].location == fitz.Rect(5, 6, 7, 8)
+    copied = combined.copy()
+    combined.truncate(2)
+    assert len(combined) == 2 and len(copied) == 6
+    restored = pickle.loads(pickle.dumps(copied))
+    assert [match.to_dict() for match in restored] == [match.to_dict() for match in copied]
+
+
+def test_on_page_only_builds_that_page():
+    matches = make_matches()
+    assert [match.match_id for match in matches.on_page(2)] == [11, 12]
+    assert matches.on_page(1) == []
+
+
+def test_search_stats_can_be_read_while_files_are_added():
+    stats = SearchStats()
+    errors = []
+
+    def add_files(worker):
+        for number in range(2000):
+            file_stats = FileStats(f"{worker}-{number}.pdf", pages=1, matches=1,
+                                   phases={f"phase {number % 50}": [0.001, 0.001]})
+            stats.add_file(file_stats)
+            stats.skip(f"reason {number % 30}")
+
+    def read():
+        try:
+            while any(thread.is_alive() for thread in writers):
+                stats.summary()
+                stats.to_dict()
+                stats.add_phase("gui", 0.0, 0.0)
+        except Exception as e:
+            errors.append(e)
+
+    writers = [threading.Thread(target=add_files, args=(worker,)) for worker in range(4)]
+    reader = threading.Thread(target=read)
+    for thread in writers:
+        thread.start()
+    reader.start()
+    for thread in writers + [reader]:
+        thread.join()
+    assert errors == []
+    assert stats.files_scanned == 8000 and stats.files_skipped == 8000
+    assert len(stats.slowest) == stats.slowest_count
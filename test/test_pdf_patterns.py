@@ -0,0 +1,48 @@
+import re
+
+import pytest
+
+from pdf_patterns import PatternMatcher, compile_search_regex, matched_pattern, required_literals
+
+
+def hits(patterns, text, **modes):
+    regex = compile_search_regex(patterns, **modes)
+    return [(matched_pattern(found), found.group()) for found in regex.finditer(text)]
+
+
+def test_literal_patterns_report_their_index():
+    assert hits(["beta", "alpha  gamma"], "Alpha\ngamma and beta") == [(1, "Alpha\ngamma"), (0, "beta")]
+
+
+def test_numbered_backreferences_are_renumbered():
+    assert hits([r"(\w)\1"], "abba", regex=True) == [(0, "bb")]
+    assert hits([r"(x)(y)", r"(\w)\1", r"(?:(a)|b)(?(1)c|d)"], "xy zz ac bd", regex=True) == \
+        [(0, "xy"), (1, "zz"), (2, "ac"), (2, "bd")]
+    # Octal escapes and escapes in character classes are characters, not references
+    assert hits(["q", r"[\1]\101"], "\x01A", regex=True) == [(1, "\x01A")]
+
+
+def test_group_names():
+    assert hits([r"(?P<p0>a)(?P=p0)", r"(?P<year>\d{4})"], "aa 2024", regex=True) == [(0, "aa"), (1, "2024")]
+    with pytest.raises(re.error, match="more than one pattern"):
+        compile_search_regex([r"(?P<year>\d)", r"(?P<year>x)"], regex=True)
+    with pytest.raises(re.error, match="reserved"):
+        compile_search_regex([r"(?P<_p1>a)"], regex=True)
+    with pytest.raises(re.error):
+        compile_search_regex(["(unclosed"], regex=True)
+
+
+def test_whole_word_and_case():
+    assert hits(["cat"], "cat concat Cat", whole_word=True) == [(0, "cat"), (0, "Cat")]
+    assert hits(["Cat"], "cat Cat", case_sensitive=True) == [(0, "Cat")]
+
+
+def test_pattern_matcher_finds_all_patterns():
+    matcher = PatternMatcher(["he", "she", "hers"])
+    assert matcher.present("USHERS") == {0, 1, 2}
+
+
+def test_required_literals():
+    assert required_literals("Foo  bar") == [["foo"], ["bar"]]
+    assert required_literals(r"ab(cd|ef)g+", regex=True) == [["ab"], ["cd", "ef"], ["g"]]
+    assert required_literals(r"\d+", regex=True) == []
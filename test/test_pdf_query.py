@@ -0,0 +1,91 @@
+import pytest
+
+from pdf_query import (And, Near, Not, Or, QuerySyntaxError, Term, evaluate, near_in_words, parse_query,
+                       positive_terms)
+
+
+def words_of(text):
+    return text.lower().split()
+
+
+def pages_matching(query, pages):
+    """Evaluate `query` over page texts with substring postings, like a search of each page."""
+    node = parse_query(query)
+    postings = {}
+
+    def collect(node):
+        if isinstance(node, Term):
+            postings[node.text] = {number for number, text in enumerate(pages) if node.text.lower() in text.lower()}
+        elif isinstance(node, Near):
+            collect(node.left)
+            collect(node.right)
+        elif isinstance(node, Not):
+            collect(node.child)
+        else:
+            for child in node.children:
+                collect(child)
+    collect(node)
+
+    def near(near_node, candidates):
+        return {number for number in candidates if near_in_words(near_node, words_of(pages[number]))}
+
+    return evaluate(node, postings, set(range(len(pages))), near)
+
+
+def test_precedence():
+    assert parse_query("a OR b AND NOT c") == Or((Term("a"), And((Term("b"), Not(Term("c"))))))
+    assert parse_query("a b OR c") == Or((And((Term("a"), Term("b"))), Term("c")))
+    assert parse_query("a NEAR/3 b c") == And((Near(Term("a"), Term("b"), 3), Term("c")))
+    assert parse_query("a and b or not c") == Or((And((Term("a"), Term("b"))), Not(Term("c"))))
+
+
+def test_parentheses():
+    assert parse_query("(a OR b) c") == And((Or((Term("a"), Term("b"))), Term("c")))
+    assert parse_query("a NOT (b OR c)") == And((Term("a"), Not(Or((Term("b"), Term("c"))))))
+    assert parse_query("((a))") == Term("a")
+
+
+def test_quoted_phrases():
+    assert parse_query('"purchase order" OR receipt') == Or((Term("purchase order"), Term("receipt")))
+    # Operators inside quotes are plain words
+    assert parse_query('"this AND that"') == Term("this AND that")
+    assert positive_terms(parse_query('"a b" NOT c')) == ["a b"]
+
+
+def test_near_distance():
+    assert parse_query("a NEAR b") == Near(Term("a"), Term("b"), 10)
+    assert parse_query("a near/2 b").distance == 2
+    words = words_of("contract one two three termination")
+    assert near_in_words(Near(Term("contract"), Term("termination"), 3), words)
+    assert not near_in_words(Near(Term("contract"), Term("termination"), 2), words)
+    # Order does not matter, and terms may be phrases
+    assert near_in_words(Near(Term("termination"), Term("contract one"), 3), words)
+    assert not near_in_words(Near(Term("contract"), Term("missing"), 10), words)
+
+
+def test_near_phrases_match_on_token_boundaries():
+    assert not near_in_words(Near(Term("cat dog"), Term("end"), 10), words_of("concatenate dogma end"))
+    assert near_in_words(Near(Term("cat dog"), Term("end"), 10), words_of("tomcat doghouse end"))
+    assert near_in_words(Near(Term("big red dog"), Term("end"), 10), words_of("a big red dog end"))
+    assert not near_in_words(Near(Term("big red dog"), Term("end"), 10), words_of("a big reddish dog end"))
+    # A single token is a substring, like page.search_for
+    assert near_in_words(Near(Term("cat"), Term("end"), 10), words_of("concatenate end"))
+
+
+@pytest.mark.parametrize("query", ["", "   ", "(a", "a)", '"a', '""', "a AND", "OR a", "NOT a",
+                                   "a NEAR (b OR c)", "NOT a NEAR b", "a ( )"])
+def test_malformed_queries(query):
+    with pytest.raises(QuerySyntaxError):
+        parse_query(query)
+
+
+def test_evaluation():
+    pages = ["invoice paid", "invoice draft", "receipt paid", "contract a b c termination", "nothing"]
+    assert pages_matching("invoice AND paid", pages) == {0}
+    assert pages_matching("invoice NOT draft", pages) == {0}
+    assert pages_matching("invoice OR receipt", pages) == {0, 1, 2}
+    assert pages_matching("(invoice OR receipt) paid", pages) == {0, 2}
+    assert pages_matching("paid OR invoice draft", pages) == {0, 1, 2}
+    assert pages_matching('"invoice paid" OR nothing', pages) == {0, 4}
+    assert pages_matching("contract NEAR/3 termination", pages) == {3}
+    assert pages_matching("contract NEAR/2 termination", pages) == set()
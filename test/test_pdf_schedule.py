@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from pdf_schedule import DEFAULT_BYTES_PER_PAGE, estimate_costs, schedule_files
+
+
+def write(path, size, mtime=None):
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return str(path)
+
+
+def test_largest_cost_first(tmp_path):
+    small = write(tmp_path / "small.pdf", 1000)
+    large = write(tmp_path / "large.pdf", 1000)
+    medium = write(tmp_path / "medium.pdf", 1000)
+    page_counts = {small: 2, large: 40, medium: 10}
+    files = [small, large, medium]
+    assert schedule_files(files, "largest", page_counts) == [large, medium, small]
+    assert schedule_files(files, "smallest", page_counts) == [small, medium, large]
+    assert schedule_files(files, "path", page_counts) == files
+
+
+def test_unknown_page_counts_are_estimated_from_size(tmp_path):
+    # 10 known pages in 10 kB calibrate 1 kB per page
+    known = write(tmp_path / "known.pdf", 10000)
+    big = write(tmp_path / "big.pdf", 50000)
+    tiny = write(tmp_path / "tiny.pdf", 500)
+    costs = estimate_costs([known, big, tiny], {known: 10}, {known: 10000, big: 50000, tiny: 500})
+    assert costs == {known: 10.0, big: 50.0, tiny: 0.5}
+    assert schedule_files([tiny, known, big], "largest", {known: 10}) == [big, known, tiny]
+
+    # Without any known page count the default page size is assumed
+    costs = estimate_costs([big], {}, {big: 50000})
+    assert costs[big] == 50000 / DEFAULT_BYTES_PER_PAGE
+
+
+def test_unreadable_files_cost_nothing(tmp_path):
+    present = write(tmp_path / "present.pdf", 5000, mtime=1000)
+    missing = str(tmp_path / "missing.pdf")
+    assert estimate_costs([missing], {}, {}) == {missing: 0.0}
+    # A file that cannot be read fails at once, so it is searched last, or first for quick results
+    assert schedule_files([missing, present], "largest") == [present, missing]
+    assert schedule_files([present, missing], "smallest") == [missing, present]
+    assert schedule_files([missing, present], "recent") == [present, missing]
+
+
+def test_ties_priority_and_unknown_schedules(tmp_path):
+    first = write(tmp_path / "a.pdf", 1000, mtime=1000)
+    second = write(tmp_path / "b.pdf", 1000, mtime=2000)
+    os.mkdir(tmp_path / "selected")
+    selected = write(tmp_path / "selected" / "c.pdf", 10, mtime=500)
+    assert schedule_files([first, second], "largest") == [first, second]
+    assert schedule_files([first, second, selected], "recent") == [second, first, selected]
+    assert schedule_files([first, second, selected], "largest",
+                          priority_paths=[str(tmp_path / "selected")]) == [selected, first, second]
+    # A folder whose name only starts with the priority folder's is not under it
+    os.mkdir(tmp_path / "selected_other")
+    other = write(tmp_path / "selected_other" / "d.pdf", 5000)
+    assert schedule_files([other, selected], "largest", priority_paths=[str(tmp_path / "selected")]) == \
+        [selected, other]
+    with pytest.raises(ValueError):
+        schedule_files([first], "random")
@@ -0,0 +1,85 @@
+import concurrent.futures
+import multiprocessing
+import os
+import shutil
+import threading
+
+from pdf_cache import QueryCache
+from pdf_file_generator import DEFAULT_HIT_TERM, generate_corpus
+from pdf_index import PDFIndex
+from pdf_models import SearchOptions, SearchStats
+import pdf_search
+from pdf_search import iter_search_pdfs, search_pdfs
+
+
+def test_searches_in_a_shared_process_pool_get_their_own_stop_event(corpus_info):
+    with concurrent.futures.ProcessPoolExecutor(max_workers=2) as executor, multiprocessing.Manager() as manager:
+        cancel = threading.Event()
+        for _ in range(2):
+            stats = SearchStats()
+            results = list(iter_search_pdfs(corpus_info.directory, DEFAULT_HIT_TERM, executor=executor,
+                                            stats=stats, cancel=cancel, manager=manager))
+            # Ending a search must not stop the next one
+            assert sum(len(matches) for _, matches in results) == len(corpus_info.hit_pages)
+            assert stats.pages > 0
+        assert not cancel.is_set()
+
+        cancel.set()
+        stats = SearchStats()
+        results = list(iter_search_pdfs(corpus_info.directory, DEFAULT_HIT_TERM, executor=executor, stats=stats,
+                                        cancel=cancel, manager=manager))
+        assert results == [] and stats.files_skipped == len(corpus_info.files)
+
+
+def test_cached_copies_stay_grouped_under_their_original(tmp_path):
+    info = generate_corpus(str(tmp_path), file_count=3, pages_per_file=2, words_per_page=60, hit_rate=1.0, seed=3)
+    copy_path = os.path.join(str(tmp_path), "zz_copy.pdf")
+    shutil.copy(info.files[0], copy_path)
+    cache = QueryCache()
+    for status in ("scanned", "cached"):
+        stats = SearchStats()
+        outcomes = {}
+        order = []
+        for path, matches in iter_search_pdfs(str(tmp_path), DEFAULT_HIT_TERM, stats=stats, cache=cache,
+                                              on_file=lambda file_stats: outcomes.update(
+                                                  {file_stats.path: (file_stats.status, file_stats.duplicate_of)})):
+            order.append(path)
+        assert outcomes[copy_path] == ("duplicate", info.files[0])
+        assert outcomes[info.files[0]] == (status, "")
+        assert order.index(info.files[0]) < order.index(copy_path)
+        assert stats.files_duplicate == 1
+
+    # Once the original changes, the copy is no longer reported as one
+    shutil.copy(info.files[1], info.files[0])
+    outcomes = {}
+    list(iter_search_pdfs(str(tmp_path), DEFAULT_HIT_TERM, cache=cache,
+                          on_file=lambda file_stats: outcomes.update({file_stats.path: file_stats.status})))
+    assert outcomes[copy_path] == "cached"
+
+
+def test_a_single_sharded_file_uses_several_workers(tmp_path, monkeypatch):
+    generate_corpus(str(tmp_path / "pdfs"), file_count=1, pages_per_file=40, words_per_page=60, hit_rate=0.3,
+                    seed=4)
+    make_executor = pdf_search._make_executor
+    workers = []
+
+    def spy(engine, worker_count):
+        workers.append(worker_count)
+        return make_executor(engine, worker_count)
+
+    monkeypatch.setattr(pdf_search, "_make_executor", spy)
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+    directory = str(tmp_path / "pdfs")
+    whole = search_pdfs(directory, DEFAULT_HIT_TERM, options=SearchOptions(engine="threads", shard_pages=None))
+    sharded = search_pdfs(directory, DEFAULT_HIT_TERM, options=SearchOptions(engine="threads", shard_pages=4))
+    assert workers == [1, 8]
+    assert {path: [match.to_dict() for match in matches] for path, matches in sharded.items()} == \
+        {path: [match.to_dict() for match in matches] for path, matches in whole.items()}
+
+    # With the pages to search known from the index, one worker per page range at most
+    index = PDFIndex(str(tmp_path / "index.sqlite"))
+    index.update([directory])
+    candidate_pages = index.candidate_pages([DEFAULT_HIT_TERM], list(whole))
+    search_pdfs(directory, DEFAULT_HIT_TERM, index=index, options=SearchOptions(engine="threads", shard_pages=4))
+    index.close()
+    assert workers[-1] == min(8, -(-len(next(iter(candidate_pages.values()))) // 4))
@@ -0,0 +1,40 @@
+import threading
+import time
+
+from pdf_models import SearchStats
+from pdf_server import SearchClient, _Search, make_http_server
+
+
+class SlowSearchServer:
+    """Starts a search and sends nothing more until it is cancelled."""
+
+    def __init__(self):
+        self.running = _Search()
+
+    def run_search(self, folders, patterns, options, emit):
+        emit({'event': 'started', 'search_id': self.running.search_id})
+        self.running.cancel.wait(10)
+        self.running.state = "cancelled"
+        emit({'event': 'done', 'reason': self.running.state, 'stats': SearchStats().to_dict()})
+        return self.running
+
+    def search(self, search_id):
+        return self.running if search_id == self.running.search_id else None
+
+
+def test_cancel_reaches_a_server_that_sends_no_events():
+    search_server = SlowSearchServer()
+    http_server = make_http_server(search_server, port=0)
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+    try:
+        client = SearchClient(f"http://127.0.0.1:{http_server.server_address[1]}")
+        cancel = threading.Event()
+        threading.Timer(0.2, cancel.set).start()
+        start = time.perf_counter()
+        stats = SearchStats()
+        assert list(client.search(["/tmp"], ["x"], cancel=cancel, stats=stats)) == []
+        assert time.perf_counter() - start < 5
+        assert search_server.running.cancel.is_set()
+    finally:
+        http_server.shutdown()
+        http_server.server_close()